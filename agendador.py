@@ -0,0 +1,296 @@
+"""
+Agendador de tarefas do servidor, compartilhado por todas as sessões do Streamlit.
+
+Limita o trabalho pesado (leitura dos PDFs, relatórios) a AGENDADOR_WORKERS tarefas
+simultâneas, com fila justa entre sessões: a cada vaga livre, a próxima tarefa vem da
+sessão seguinte no rodízio, e não da que enviou mais arquivos. Cada tarefa tem uma chave
+(ex.: SHA-256 do PDF); enviar de novo uma chave em andamento (rerun, outra sessão com o
+mesmo arquivo) devolve a mesma tarefa em vez de iniciar outro processamento.
+
+A posição na fila e o tempo estimado vêm da média móvel dos segundos por unidade de
+custo (ex.: páginas) das tarefas já concluídas de cada tipo.
+
+    AGENDADOR_WORKERS   tarefas simultâneas e processos do pool (padrão: nº de núcleos)
+"""
+import os
+import time
+import queue
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+
+from medicao import perfil
+
+AGENDADOR_WORKERS = int(os.environ.get("AGENDADOR_WORKERS", "0")) or multiprocessing.cpu_count()
+# Tarefas concluídas mantidas para os reruns que chegarem depois do término
+TAREFAS_CONCLUIDAS_MAX = 16
+# Segundos por unidade de custo assumidos antes da primeira tarefa de cada tipo
+SEGUNDOS_POR_UNIDADE_INICIAL = {"extracao": 0.2, "relatorio": 1.0}
+# Peso da última tarefa na média móvel dos segundos por unidade
+PESO_MEDIA_MOVEL = 0.3
+
+NA_FILA = "na fila"
+EXECUTANDO = "executando"
+CONCLUIDA = "concluída"
+ERRO = "erro"
+CANCELADA = "cancelada"
+
+
+class Tarefa:
+    """
+    Uma tarefa do agendador. 'funcao(tarefa)' roda em uma das threads do agendador e pode
+    informar o andamento em tarefa.progresso (0 a 1) e guardar resultados parciais em
+    tarefa.parciais. Ao terminar, tarefa.parciais passa a None (o resultado fica só em
+    tarefa.resultado); quem precisa de todos os parciais guarda a lista logo após submeter.
+    'sessoes' são as sessões que aguardam a tarefa; 'fila' é a fila do rodízio em que ela entrou.
+    """
+
+    def __init__(self, chave, sessao, funcao, tipo, custo, fila=None):
+        self.chave = chave
+        self.sessoes = {sessao}
+        self.fila = sessao if fila is None else fila
+        self.funcao = funcao
+        self.tipo = tipo
+        self.custo = max(float(custo), 1.0)
+        self.estado = NA_FILA
+        self.progresso = 0.0
+        self.parciais = []
+        self.resultado = None
+        self.erro = None
+        self.criada_em = time.monotonic()
+        self.iniciada_em = None
+        self.concluida_em = None
+        self._evento = threading.Event()
+
+    def aguardar(self, timeout=None):
+        """Espera o término (concluída, erro ou cancelada); retorna False se o tempo acabar antes."""
+        return self._evento.wait(timeout)
+
+    @property
+    def terminada(self):
+        return self._evento.is_set()
+
+    @property
+    def espera(self):
+        """Segundos na fila (até o início ou até agora)."""
+        return (self.iniciada_em or time.monotonic()) - self.criada_em
+
+    @property
+    def duracao(self):
+        """Segundos em execução (até o término ou até agora); None se ainda não começou."""
+        if self.iniciada_em is None:
+            return None
+        return (self.concluida_em or time.monotonic()) - self.iniciada_em
+
+
+def _repassar_itens(funcao_geradora, args, fila, nome_perfil=None):
+    """Executado em outro processo: coloca na fila cada item gerado por funcao_geradora(*args)."""
+    with perfil(nome_perfil) if nome_perfil else nullcontext():
+        for item in funcao_geradora(*args):
+            fila.put(item)
+
+
+class Agendador:
+    """
+    Fila justa entre sessões + 'workers' threads que executam as tarefas. O trabalho que
+    precisa de outro núcleo (leitura dos PDFs) vai para o pool de processos compartilhado
+    por gerar_em_processo, do mesmo tamanho, então o servidor nunca ocupa mais que
+    'workers' núcleos com tarefas, qualquer que seja o número de sessões. Para isso a função
+    executada no pool não deve abrir pools próprios (ex.: extracao.extrair_contracheque_em_uma_vaga,
+    com o OCR no mesmo processo).
+    """
+
+    def __init__(self, workers=AGENDADOR_WORKERS):
+        self.workers = max(1, workers)
+        self._cond = threading.Condition()
+        self._filas = OrderedDict()  # fila (sessão) -> deque de tarefas (ordem do rodízio)
+        self._tarefas = {}  # chave -> tarefa na fila ou em execução
+        self._executando = []
+        self._concluidas = OrderedDict()  # chave -> tarefa concluída (reruns tardios)
+        self._segundos_por_unidade = dict(SEGUNDOS_POR_UNIDADE_INICIAL)
+        self._threads = []
+        # Pool e gerenciador criados no primeiro uso, fora de _cond (iniciar leva segundos)
+        self._trava_processos = threading.Lock()
+        self._processos = None
+        self._gerenciador = None
+        self.concluidas = 0
+        self.anexadas = 0
+
+    ###########################################################################
+    # ENVIO E CANCELAMENTO
+    ###########################################################################
+    def submeter(self, chave, sessao, funcao, tipo="extracao", custo=1.0, fila=None):
+        """
+        Coloca funcao(tarefa) na fila da sessão e retorna a Tarefa. Se a chave já está na
+        fila, em execução ou concluída há pouco, retorna essa tarefa (a sessão passa a aguardá-la).
+        'fila' agrupa no rodízio sessões do mesmo cliente (padrão: a própria sessão).
+        """
+        with self._cond:
+            tarefa = self._tarefas.get(chave) or self._concluidas.get(chave)
+            if tarefa is not None:
+                tarefa.sessoes.add(sessao)
+                self.anexadas += 1
+                return tarefa
+            tarefa = Tarefa(chave, sessao, funcao, tipo, custo, fila)
+            self._tarefas[chave] = tarefa
+            self._filas.setdefault(tarefa.fila, deque()).append(tarefa)
+            self._iniciar_threads()
+            self._cond.notify()
+            return tarefa
+
+    def cancelar(self, chave, sessao):
+        """
+        A sessão deixa de aguardar a tarefa. Se ninguém mais a aguarda e ela ainda está na fila,
+        sai da fila; em execução, termina normalmente (o resultado fica para um próximo envio).
+        """
+        with self._cond:
+            tarefa = self._tarefas.get(chave)
+            if tarefa is None:
+                return
+            tarefa.sessoes.discard(sessao)
+            if tarefa.sessoes or tarefa.estado != NA_FILA:
+                return
+            fila = self._filas.get(tarefa.fila)
+            if fila is not None and tarefa in fila:
+                fila.remove(tarefa)
+                if not fila:
+                    del self._filas[tarefa.fila]
+            del self._tarefas[chave]
+            tarefa.estado = CANCELADA
+            tarefa._evento.set()
+
+    ###########################################################################
+    # POSIÇÃO NA FILA E TEMPO ESTIMADO
+    ###########################################################################
+    def _ordem_fila(self):
+        """Tarefas na fila na ordem em que serão iniciadas (rodízio entre as sessões)."""
+        filas = [list(f) for f in self._filas.values()]
+        ordem = []
+        rodada = 0
+        while any(rodada < len(f) for f in filas):
+            ordem.extend(f[rodada] for f in filas if rodada < len(f))
+            rodada += 1
+        return ordem
+
+    def _estimativa(self, tarefa):
+        return tarefa.custo * self._segundos_por_unidade.get(tarefa.tipo, 1.0)
+
+    def posicao(self, tarefa):
+        """Posição da tarefa na fila (1 = próxima a iniciar); 0 se já começou ou terminou."""
+        with self._cond:
+            if tarefa.estado != NA_FILA:
+                return 0
+            ordem = self._ordem_fila()
+            return ordem.index(tarefa) + 1 if tarefa in ordem else 0
+
+    def eta(self, tarefa):
+        """
+        Segundos estimados até o término da tarefa: restante das tarefas em execução e das que
+        estão à frente na fila, distribuídas pelas vagas, mais a duração estimada da própria tarefa.
+        """
+        with self._cond:
+            if tarefa.terminada:
+                return 0.0
+            if tarefa.estado == EXECUTANDO:
+                return self._estimativa(tarefa) * (1 - tarefa.progresso)
+            vagas = sorted(self._estimativa(t) * (1 - t.progresso) for t in self._executando)
+            vagas = ([0.0] * (self.workers - len(vagas)) + vagas)[:self.workers] or [0.0]
+            for anterior in self._ordem_fila():
+                inicio = min(vagas)
+                if anterior is tarefa:
+                    return inicio + self._estimativa(tarefa)
+                vagas[vagas.index(inicio)] = inicio + self._estimativa(anterior)
+            return self._estimativa(tarefa)
+
+    def estatisticas(self):
+        """Tarefas em execução, na fila, concluídas e envios anexados a uma tarefa existente."""
+        with self._cond:
+            return {
+                "executando": len(self._executando),
+                "na_fila": sum(len(f) for f in self._filas.values()),
+                "sessoes_na_fila": len(self._filas),
+                "concluidas": self.concluidas,
+                "anexadas": self.anexadas,
+                "workers": self.workers
+            }
+
+    ###########################################################################
+    # EXECUÇÃO
+    ###########################################################################
+    def _iniciar_threads(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._trabalhar, name=f"agendador-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _proxima(self):
+        """Primeira tarefa da sessão da vez; a sessão vai para o fim do rodízio."""
+        sessao, fila = next(iter(self._filas.items()))
+        tarefa = fila.popleft()
+        del self._filas[sessao]
+        if fila:
+            self._filas[sessao] = fila
+        return tarefa
+
+    def _trabalhar(self):
+        while True:
+            with self._cond:
+                while not self._filas:
+                    self._cond.wait()
+                tarefa = self._proxima()
+                tarefa.estado = EXECUTANDO
+                tarefa.iniciada_em = time.monotonic()
+                self._executando.append(tarefa)
+            try:
+                tarefa.resultado = tarefa.funcao(tarefa)
+                tarefa.estado = CONCLUIDA
+            except Exception as e:
+                tarefa.erro = e
+                tarefa.estado = ERRO
+            tarefa.concluida_em = time.monotonic()
+            self._finalizar(tarefa)
+
+    def _finalizar(self, tarefa):
+        tarefa.funcao = None  # libera o que a função carregava (ex.: bytes do PDF)
+        # Os lotes por página já estão no resultado: a tarefa concluída guardada para os reruns
+        # não mantém uma segunda cópia
+        tarefa.parciais = None
+        with self._cond:
+            self._executando.remove(tarefa)
+            self._tarefas.pop(tarefa.chave, None)
+            if tarefa.estado == CONCLUIDA:
+                self.concluidas += 1
+                media = self._segundos_por_unidade.get(tarefa.tipo, tarefa.duracao / tarefa.custo)
+                self._segundos_por_unidade[tarefa.tipo] = (
+                    (1 - PESO_MEDIA_MOVEL) * media + PESO_MEDIA_MOVEL * tarefa.duracao / tarefa.custo
+                )
+                self._concluidas[tarefa.chave] = tarefa
+                while len(self._concluidas) > TAREFAS_CONCLUIDAS_MAX:
+                    self._concluidas.popitem(last=False)
+        tarefa._evento.set()
+
+    def gerar_em_processo(self, funcao_geradora, *args, nome_perfil=None):
+        """
+        Executa funcao_geradora(*args) no pool de processos compartilhado e repassa os itens
+        gerados à medida que chegam. Exceções do outro processo são relançadas aqui.
+        """
+        with self._trava_processos:
+            if self._processos is None:
+                contexto = multiprocessing.get_context("spawn")
+                self._gerenciador = contexto.Manager()
+                self._processos = ProcessPoolExecutor(max_workers=self.workers, mp_context=contexto)
+            gerenciador, processos = self._gerenciador, self._processos
+        fila = gerenciador.Queue()
+        futuro = processos.submit(_repassar_itens, funcao_geradora, args, fila, nome_perfil)
+        while True:
+            try:
+                yield fila.get(timeout=0.2)
+            except queue.Empty:
+                if futuro.done():
+                    futuro.result()
+                    # Itens colocados entre a última espera e o término do processo
+                    while not fila.empty():
+                        yield fila.get()
+                    return
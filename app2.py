@@ -1,24 +1,55 @@
 import streamlit as st
-import pdfplumber
-import re
 import os
 import tempfile
+import time
+import threading
+import numpy as np
 import pandas as pd
-from datetime import datetime
-from io import BytesIO
+from collections import Counter, OrderedDict
 import base64
-
-# Bibliotecas para DOCX
-from docx import Document
-from docx.shared import Pt, Inches, RGBColor
-from docx.enum.section import WD_ORIENT
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-
-# Bibliotecas para fuzzy matching
-from rapidfuzz import process, fuzz
-
-# Bibliotecas para PDF (relatórios)
-from fpdf import FPDF
+import hashlib
+import functools
+import uuid
+from datetime import date
+
+# Extração dos contracheques (pdfplumber)
+from extracao import (
+    hash_conteudo,
+    extrair_contracheque_em_uma_vaga,
+    montar_df_competencias,
+    montar_df_dados,
+    montar_df_informacoes,
+    juntar_lotes,
+    ORIGEM_OCR,
+    ORIGEM_SEM_TEXTO
+)
+
+# Glossário e relatórios
+from glossario import (
+    ler_glossario,
+    pontuar_descontos,
+    filtrar_por_similaridade,
+    CacheRubricas,
+    IndiceGlossario,
+    COL_CATEGORIA
+)
+from casos import ArmazemCasos
+from medicao import Medicoes, DEBUG_ATIVO, PERFIL_ATIVO, PERFIS_PATH
+from agendador import Agendador, CANCELADA, ERRO
+from leitores import contar_paginas
+from relatorios import (
+    formatar_centavos_brl,
+    df_to_docx_bytes,
+    pdf_basico_bytes,
+    pdf_descontos_finais_bytes,
+    xlsx_bytes,
+    preparar_df_descontos,
+    ordenar_descontos_finais,
+    calcular_resumo,
+    banco_da_descricao,
+    resumo_para_exibicao,
+    texto_nao_prescrito
+)
 
 ###############################################################################
 # CONFIGURAÇÕES E ESTADO
@@ -27,15 +58,52 @@ st.set_page_config(page_title="Analista de Contracheques do INSS", layout="cente
 
 LOGO_PATH = "MP.png"  # Ajuste conforme o local do seu arquivo de logomarca
 GLOSSARY_PATH = "Rubricas.txt"  # Ajuste conforme o local do seu arquivo de glossário
+TARIFAS_PATH = "Tarifas.txt"  # Glossário de tarifas, seguros e associações
+
+# Glossários nomeados (categoria -> arquivo) usados no filtro de descontos
+GLOSSARIOS_APP = {
+    "Cartão/RMC": GLOSSARY_PATH,
+    "Tarifas/Seguros": TARIFAS_PATH
+}
+
+# Limites do cache de extração (compartilhado entre as sessões do servidor)
+CACHE_EXTRACAO_MAX_ITENS = 16
+CACHE_EXTRACAO_MAX_BYTES = 512 * 1024 * 1024
+
+# Intervalo (segundos) entre atualizações da posição na fila e do progresso das tarefas
+INTERVALO_ACOMPANHAMENTO = 0.5
+# Intervalo mínimo (segundos) entre atualizações da tabela parcial durante a extração
+INTERVALO_ATUALIZACAO_TABELA = 1.0
+
+# Relatórios (bytes) mantidos em memória por sessão
+ARTEFATOS_MAX_POR_SESSAO = 8
+MIME_PDF = "application/pdf"
+MIME_DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+MIME_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
+# Descrições por página na lista única de descontos
+ITENS_POR_PAGINA_LISTA = 25
+
+# Colunas internas ocultadas nas tabelas da tela (centavos: uso nos cálculos)
+COLUNAS_OCULTAS = {"Centavos": None}
+
+# Estado da sessão: um único DataFrame de informações (compartilhado com o cache de extração)
+# e, para as etapas seguintes, apenas as pontuações por descrição e os índices das linhas
 _fallback_state = {
     "df_informacoes": None,
-    "df_descontos": None,
-    "df_descontos_gloss": None,
-    "df_descontos_gloss_sel": None,
+    "pontuacoes_descontos": None,  # SIMILARIDADE, RUBRICA GLOSSÁRIO e CATEGORIA por descrição única
+    "idx_descontos_gloss": None,  # índices (em df_informacoes) dos descontos que passaram no filtro
+    "idx_descontos_sel": None,  # índices dos descontos confirmados na lista única
+    "descricoes_marcadas": None,  # descrições marcadas na lista única (entre páginas e buscas)
+    "versao_lista_descontos": 0,  # muda a cada marcação em bloco (recria a tabela editável)
     "nome_extraido": "",
     "nb_extraido": "",
-    "valor_recebido": ""  # Fica vazio por padrão
+    "valor_recebido": "",  # Fica vazio por padrão
+    "extracao_cancelada": None,
+    "artefatos": None,
+    "medicoes": None,  # tempos por etapa (DEBUG_DESEMPENHO)
+    "sessao_id": None,  # identifica a sessão na fila do agendador e nas medições
+    "caso_atual": None  # (NB, SHA-256 do PDF) do caso em análise no armazém de casos
 }
 
 
@@ -55,471 +123,541 @@ def set_state_value(key, value):
         _fallback_state[key] = value
 
 
-###############################################################################
-# FUNÇÕES AUXILIARES (LOGO, GLOSSÁRIO, FORMATOS)
-###############################################################################
-def get_image_base64(file_path):
-    """Carrega uma imagem e retorna sua representação em base64."""
-    if not os.path.exists(file_path):
-        return ""
-    with open(file_path, "rb") as img_file:
-        return base64.b64encode(img_file.read()).decode()
-
-
-def carregar_glossario(path):
-    """Carrega o arquivo de glossário (Rubricas.txt) e retorna como lista de strings."""
+def state_items():
+    """Pares (chave, valor) do estado."""
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read().splitlines()
-    except Exception as e:
-        st.error(f"Erro ao carregar glossário: {e}")
-        return []
+        return list(st.session_state.items())
+    except Exception:
+        return list(_fallback_state.items())
 
 
-def inserir_totais_na_coluna(df, col_valor):
+###############################################################################
+# CACHE DE EXTRAÇÃO (CHAVE = SHA-256 DO PDF)
+###############################################################################
+class CacheExtracao:
     """
-    Insere linhas ao final da coluna col_valor com:
-       - A = Valor Total (R$)
-       - B = Valor Recebido – Autor (a)
-       - Indébito (A-B)
-       - Indébito em dobro (R$)
-
-    *Utiliza o valor de 'valor_recebido' no estado para B.
+    Cache LRU dos resultados de extração, limitado por quantidade de itens
+    e por tamanho total (bytes). Mantém contadores de acertos e falhas.
     """
-    if col_valor not in df.columns:
-        return df
 
-    def _to_float(x):
-        try:
-            return float(str(x).replace(',', '.').strip())
-        except:
-            return 0.0
+    def __init__(self, max_itens=CACHE_EXTRACAO_MAX_ITENS, max_bytes=CACHE_EXTRACAO_MAX_BYTES):
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self._itens = OrderedDict()  # chave -> (valor, tamanho)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, chave):
+        """Retorna o valor em cache (ou None) e o marca como usado recentemente."""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return item[0]
+
+    def guardar(self, chave, valor, tamanho):
+        """Armazena o valor e descarta os itens menos usados até caber nos limites."""
+        if tamanho > self.max_bytes:
+            return
+        with self._lock:
+            if chave in self._itens:
+                self._bytes -= self._itens.pop(chave)[1]
+            self._itens[chave] = (valor, tamanho)
+            self._bytes += tamanho
+            while len(self._itens) > self.max_itens or self._bytes > self.max_bytes:
+                _, (_, tam_antigo) = self._itens.popitem(last=False)
+                self._bytes -= tam_antigo
+
+    def estatisticas(self):
+        """Retorna um dicionário com itens, bytes, acertos, falhas e taxa de acerto."""
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                "itens": len(self._itens),
+                "bytes": self._bytes,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": (self.acertos / total) if total else 0.0
+            }
+
+
+@st.cache_resource
+def obter_cache_extracao():
+    """Instância única do cache de extração, compartilhada por todas as sessões."""
+    return CacheExtracao()
+
+
+@st.cache_resource
+def obter_cache_rubricas():
+    """Cache persistente (SQLite) das pontuações do glossário, compartilhado pelas sessões."""
+    return CacheRubricas()
+
+
+@st.cache_resource
+def obter_armazem_casos():
+    """Armazém local (Parquet) dos casos processados, compartilhado pelas sessões."""
+    return ArmazemCasos()
+
+
+@st.cache_resource
+def obter_agendador():
+    """Agendador único do servidor: fila justa entre as sessões e vagas limitadas (AGENDADOR_WORKERS)."""
+    return Agendador()
+
+
+def id_da_sessao():
+    """Identificador curto desta sessão (fila do agendador e log das medições)."""
+    sessao = get_state_value("sessao_id")
+    if sessao is None:
+        sessao = uuid.uuid4().hex[:8]
+        set_state_value("sessao_id", sessao)
+    return sessao
+
+
+def tamanho_em_memoria(valor):
+    """Estima o tamanho (bytes) de DataFrames, arrays, bytes/texto e dicionários desses valores."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, (pd.Series, pd.Index)):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, (bytes, str)):
+        return len(valor)
+    if isinstance(valor, dict):
+        return sum(tamanho_em_memoria(v) for v in valor.values())
+    return 0
+
+
+def tamanho_resultado_extracao(resultado):
+    """Estima o tamanho (bytes) de um resultado de extração para o limite do cache."""
+    return tamanho_em_memoria(resultado)
 
-    soma = df[col_valor].apply(_to_float).sum()
-    if soma == 0:
-        return df
 
-    df_novo = df.copy()
+###############################################################################
+# RELATÓRIOS SOB DEMANDA (CACHE POR SESSÃO, EM MEMÓRIA)
+###############################################################################
+def hash_dataframe(df):
+    """SHA-256 do conteúdo (colunas, índice e valores) de um DataFrame."""
+    h = hashlib.sha256("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
 
-    # Recupera o valor (string) e converte para float (para o cálculo)
-    valor_recebido_str = get_state_value("valor_recebido") or "0"
-    try:
-        valor_recebido_num = float(str(valor_recebido_str).replace(",", ".").strip())
-    except:
-        valor_recebido_num = 0.0
-
-    indebito = soma - valor_recebido_num
-    indebito_dobro = 2 * indebito
-
-    def en_us_format(number: float) -> str:
-        return f"{number:,.2f}"
-
-    # A = soma (formatado)
-    A_str = en_us_format(soma)
-    # B = valor recebido digitado (exatamente como string)
-    B_str = valor_recebido_str
-    indebito_str = en_us_format(indebito)
-    indebito_dobro_str = en_us_format(indebito_dobro)
-
-    # Insere as 4 linhas especiais no DataFrame
-    df_novo = pd.concat([
-        df_novo,
-        pd.DataFrame({col_valor: [A_str], "DESCRIÇÃO": ["A = Valor Total (R$)"]})
-    ], ignore_index=True)
-    df_novo = pd.concat([
-        df_novo,
-        pd.DataFrame({col_valor: [B_str], "DESCRIÇÃO": ["B = Valor Recebido - Autor (a)"]})
-    ], ignore_index=True)
-    df_novo = pd.concat([
-        df_novo,
-        pd.DataFrame({col_valor: [indebito_str], "DESCRIÇÃO": ["Indébito (A-B)"]})
-    ], ignore_index=True)
-    df_novo = pd.concat([
-        df_novo,
-        pd.DataFrame({col_valor: [indebito_dobro_str], "DESCRIÇÃO": ["Indébito em dobro (R$)"]})
-    ], ignore_index=True)
-
-    # Limpa demais colunas nas linhas especiais
-    mask_especial = df_novo["DESCRIÇÃO"].isin([
-        "A = Valor Total (R$)",
-        "B = Valor Recebido - Autor (a)",
-        "Indébito (A-B)",
-        "Indébito em dobro (R$)"
-    ])
-    for c in df_novo.columns:
-        if c not in ["DESCRIÇÃO", col_valor]:
-            df_novo.loc[mask_especial, c] = ""
-
-    return df_novo
-
-
-def formatar_valor_brl(valor):
-    """Converte string no formato US '999.99' para '999,99'."""
-    try:
-        f = float(str(valor).replace(",", "").replace(".", "")) / 100
-        return f"{f:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    except:
-        return str(valor)
 
+def artefatos_da_sessao():
+    """Dicionário LRU (chave -> bytes) dos relatórios já gerados nesta sessão."""
+    artefatos = get_state_value("artefatos")
+    if artefatos is None:
+        artefatos = OrderedDict()
+        set_state_value("artefatos", artefatos)
+    return artefatos
 
-def df_to_docx_bytes(dados: pd.DataFrame, titulo: str,
-                     inserir_totais=False, col_valor_soma="DESCONTOS") -> bytes:
-    """
-    Converte DataFrame em um arquivo DOCX (bytes) com layout paisagem.
-    Pode inserir linhas de total e demais itens se inserir_totais=True.
-    """
-    if inserir_totais:
-        dados = inserir_totais_na_coluna(dados.copy(), col_valor_soma)
-
-    # (3.1) Ajustar a numeração do NB (retirar vírgulas, substituir por pontos)
-    # Exemplo: "137,939,448-9" => "137.939.448-9"
-    import re
-    titulo_fixed = titulo
-    # Extrai a parte do NB, se existir, e troca vírgulas por ponto
-    # Supondo que o título seja algo como: "Descontos Finais (Cronológico) - NOME - 137,939,448-9"
-    match_nb = re.search(r"-(.*?)$", titulo)  # pega o final a partir do último hífen
-    if match_nb:
-        nb_dirty = match_nb.group(1)
-        # Remove espaços extras
-        nb_dirty_strip = nb_dirty.strip()
-        # Substitui vírgulas por pontos
-        nb_clean = nb_dirty_strip.replace(",", ".")
-        # Constrói o novo título
-        titulo_fixed = titulo.replace(nb_dirty_strip, nb_clean)
-
-    document = Document()
-    for section in document.sections:
-        section.orientation = WD_ORIENT.LANDSCAPE
-        new_width, new_height = section.page_height, section.page_width
-        section.page_width = new_width
-        section.page_height = new_height
-
-    titulo_heading = document.add_heading(titulo_fixed, level=1)
-    titulo_heading.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-    if dados.empty:
-        p = document.add_paragraph("DataFrame vazio - nenhum dado para exibir.")
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        buf = BytesIO()
-        document.save(buf)
-        return buf.getvalue()
-
-    colunas = dados.columns.tolist()
-    table = document.add_table(rows=1, cols=len(colunas))
-    table.style = 'Table Grid'
-    hdr_cells = table.rows[0].cells
-
-    for i, col_name in enumerate(colunas):
-        hdr_cells[i].text = str(col_name)
-        for paragraph in hdr_cells[i].paragraphs:
-            for run in paragraph.runs:
-                run.font.bold = True
-
-    width_map = {}
-    if "COD" in colunas:
-        width_map["COD"] = 20
-    if "DESCRIÇÃO" in colunas:
-        width_map["DESCRIÇÃO"] = 130
-    if "DESCONTOS" in colunas:
-        width_map["DESCONTOS"] = 40
-    if "DATA" in colunas:
-        width_map["DATA"] = 30
-    if "PÁGINA" in colunas:
-        width_map["PÁGINA"] = 20
-
-    for _, row in dados.iterrows():
-        descricao = str(row.get("DESCRIÇÃO", ""))
-        is_especial = descricao in [
-            "A = Valor Total (R$)",
-            "B = Valor Recebido - Autor (a)",
-            "Indébito (A-B)",
-            "Indébito em dobro (R$)"
-        ]
-
-        # (3.2) Ajustar casas decimais nas linhas especiais (exatamente como PDF).
-        # Já foi feito na inserir_totais_na_coluna => ex: "1,608.90" => "1,608.90"
-        # E depois iremos converter "." => "," em "ajustar_valores_docx" para exibição.
-        row_cells = table.add_row().cells
-        for i, col_name in enumerate(colunas):
-            valor = str(row[col_name])
-            paragraph = row_cells[i].paragraphs[0]
-            run = paragraph.add_run(valor)
-            if col_name.upper() == "DESCRIÇÃO":
-                paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
-            else:
-                paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            run.font.size = Pt(9)
-            if is_especial:
-                run.font.bold = True
-                run.font.size = Pt(11)
-                run.font.color.rgb = RGBColor(255, 0, 0)
-
-        from docx.shared import Inches
-        for i, col_name in enumerate(colunas):
-            mm = width_map.get(col_name, 25)
-            table.columns[i].width = Inches(mm / 25.4)
-
-    buf = BytesIO()
-    document.save(buf)
-    return buf.getvalue()
-
-
-def ajustar_valores_docx(file_input_bytes: bytes) -> bytes:
-    """
-    Varre o DOCX gerado e converte qualquer valor 999.99 para 999,99
-    (substituindo '.' por ',' no contexto de valores financeiros).
-    """
-    from docx import Document
-    import re
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as tmp_in:
-        tmp_in.write(file_input_bytes)
-        tmp_in.flush()
-        input_path = tmp_in.name
-
-    output_path = input_path.replace(".docx", "_corrigido.docx")
-    doc = Document(input_path)
-    pattern = re.compile(r'([\d,]+\.\d{2})')
-    for para in doc.paragraphs:
-        found = pattern.findall(para.text)
-        if found:
-            for val_us in found:
-                val_br = formatar_valor_brl(val_us)
-                para.text = para.text.replace(val_us, val_br)
-    doc.save(output_path)
-
-    with open(output_path, "rb") as f:
-        final_bytes = f.read()
-    os.remove(input_path)
-    os.remove(output_path)
-    return final_bytes
-
-
-def cruzar_descontos_com_rubricas(df_descontos, glossary, threshold=85):
+
+def medicoes_da_sessao():
+    """Medições de tempo por etapa desta sessão (só registram com DEBUG_DESEMPENHO ativo)."""
+    medicoes = get_state_value("medicoes")
+    if medicoes is None:
+        medicoes = Medicoes({"sessao": id_da_sessao()})
+        set_state_value("medicoes", medicoes)
+    return medicoes
+
+
+def obter_artefato(chave, gerar):
     """
-    Filtra linhas cujo texto em 'DESCRIÇÃO' combine (fuzzy matching)
-    com itens do glossário acima de 'threshold' (0 a 100).
+    Retorna os bytes do relatório identificado por 'chave' (hash dos dados, parâmetros, formato),
+    chamando gerar() só na primeira vez, em uma vaga do agendador (sessões que pedem o mesmo
+    relatório ao mesmo tempo recebem a mesma geração). Nada é gravado em disco.
     """
-    if df_descontos.empty or not glossary:
-        return pd.DataFrame()
+    artefatos = artefatos_da_sessao()
+    if chave in artefatos:
+        artefatos.move_to_end(chave)
+        return artefatos[chave]
+    with medicoes_da_sessao().etapa(f"relatorio.{chave[-1]}"):
+        tarefa = obter_agendador().submeter(chave, id_da_sessao(), lambda tarefa: gerar(), tipo="relatorio")
+        dados = aguardar_tarefa(tarefa, "Relatório")
+    artefatos[chave] = dados
+    while len(artefatos) > ARTEFATOS_MAX_POR_SESSAO:
+        artefatos.popitem(last=False)
+    return dados
 
-    unique_desc = df_descontos["DESCRIÇÃO"].unique()
-    mapping = {}
-    for desc in unique_desc:
-        result = process.extractOne(desc, glossary, scorer=fuzz.ratio)
-        mapping[desc] = (result is not None and result[1] >= threshold)
 
-    mask = df_descontos["DESCRIÇÃO"].map(mapping)
-    return df_descontos[mask]
+def artefato_disponivel(chave):
+    """Indica se o relatório já foi gerado nesta sessão."""
+    return chave in artefatos_da_sessao()
 
 
 ###############################################################################
-# FUNÇÕES COM pdfplumber (EXTRAÇÃO DE NOME, NB, COMPETÊNCIAS)
+# DESCONTOS (PONTUAÇÕES POR DESCRIÇÃO E SELEÇÕES POR ÍNDICE)
 ###############################################################################
-def extrair_nome_e_nit_corrigido(pdf_path):
+def pontuar_descricoes(df_informacoes, glossary):
+    """Pontuações do glossário de cada descrição única de desconto (índice = DESCRIÇÃO)."""
+    descricoes = pd.unique(preparar_df_descontos(df_informacoes)["DESCRIÇÃO"].astype(str))
+    df_unicas = pd.DataFrame({"DESCRIÇÃO": descricoes})
+    return pontuar_descontos(df_unicas, glossary, obter_cache_rubricas()).set_index("DESCRIÇÃO")
+
+
+def descontos_da_sessao(indices=None):
     """
-    Extrai NB e Nome do PDF, a partir da primeira página.
-    Exemplo de regex esperado:
-      NB: 123.456.789-0
-      Nome: JOAO DA SILVA
-    Caso não encontre, retorna "N/D".
+    Monta os descontos (colunas de preparar_df_descontos + pontuações) das linhas 'indices'
+    do DataFrame de informações; sem 'indices', de todas as linhas. A sessão guarda só os índices.
     """
-    nome = "N/D"
-    nb = "N/D"
-    with pdfplumber.open(pdf_path) as pdf:
-        if len(pdf.pages) > 0:
-            text = pdf.pages[0].extract_text() or ""
-            # Extração do NB (supondo que "NB:" ou "NIT:" => adaptado)
-            nb_match = re.search(r"NB:\s*([\d\.\-]+)", text)
-            if nb_match:
-                nb = nb_match.group(1).strip()
-            # Extração do Nome
-            nome_match = re.search(r"Nome:\s*([A-Z\s]+)", text)
-            if nome_match:
-                nome = nome_match.group(1).strip().split("\n")[0]
-    return nome, nb
-
-
-def extrair_competencias_filtradas_por_contexto(pdf_path):
+    df_informacoes = get_state_value("df_informacoes")
+    base = df_informacoes if indices is None else df_informacoes.loc[indices]
+    df_descontos = preparar_df_descontos(base)
+    pontuacoes = get_state_value("pontuacoes_descontos")
+    if pontuacoes is not None:
+        descricoes = df_descontos["DESCRIÇÃO"].astype(str)
+        for coluna in pontuacoes.columns:
+            df_descontos[coluna] = descricoes.map(pontuacoes[coluna])
+    return df_descontos
+
+
+def lista_unica_descontos(df_sel):
     """
-    Extrai competências (MM/AAAA) se estiverem em linhas próximas
-    à palavra "Competência" que aparece ao lado de "Período".
+    Uma linha por descrição (ordem alfabética) com a quantidade de descontos (um único
+    value_counts), a categoria do glossário e o banco identificado na descrição.
     """
-    competencias_extraidas = []
-    padrao_competencia = re.compile(r"\b(0[1-9]|1[0-2])\/(\d{4})\b")
-
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            text = page.extract_text()
-            if not text:
-                continue
-            linhas = text.split("\n")
-            for i, linha in enumerate(linhas):
-                if "Competência" in linha and "Período" in linha:
-                    for j in range(1, 4):
-                        if i + j < len(linhas):
-                            matches = padrao_competencia.findall(linhas[i + j])
-                            for (mes, ano) in matches:
-                                competencias_extraidas.append(f"{mes}/{ano}")
-
-    competencias_unicas = sorted(set(competencias_extraidas), key=lambda x: datetime.strptime(x, "%m/%Y"))
-    df_competencias_filtradas = pd.DataFrame(competencias_unicas, columns=["Data Competência"])
-    df_competencias_filtradas["Nome Competência"] = [f"Competência {i + 1}" for i in
-                                                     range(len(df_competencias_filtradas))]
-    return df_competencias_filtradas
-
-
-def extrair_dados_contracheques_plumber(pdf_path):
+    contagem = df_sel["DESCRIÇÃO"].astype(str).value_counts(sort=False)
+    df_lista = pd.DataFrame({"DESCRIÇÃO": contagem.index, "Qtd": contagem.to_numpy()})
+    df_lista = df_lista.sort_values("DESCRIÇÃO", ignore_index=True)
+    pontuacoes = get_state_value("pontuacoes_descontos")
+    if pontuacoes is not None and COL_CATEGORIA in pontuacoes.columns:
+        df_lista[COL_CATEGORIA] = df_lista["DESCRIÇÃO"].map(pontuacoes[COL_CATEGORIA]).fillna("")
+    else:
+        df_lista[COL_CATEGORIA] = ""
+    df_lista["Banco"] = df_lista["DESCRIÇÃO"].map(banco_da_descricao)
+    return df_lista
+
+
+def descricoes_marcadas():
+    """Conjunto (na sessão) das descrições marcadas na lista única de descontos."""
+    marcadas = get_state_value("descricoes_marcadas")
+    if marcadas is None:
+        marcadas = set()
+        set_state_value("descricoes_marcadas", marcadas)
+    return marcadas
+
+
+def selecionar_descricoes(df_sel):
     """
-    Extrai dados essenciais do contracheque usando pdfplumber:
-      - Código, Descrição Rubrica, Valor, Data (Competência), Página.
-    Inicia extração após achar linha com:
-      "Data de Início do Pagamento (DIP): dd/mm/aaaa MR: R$ <valores>"
-    Ignora linhas com "Data de Nascimento".
+    Lista única de descontos com busca, filtro por categoria/banco, marcação em bloco dos
+    itens filtrados e paginação. Só a página atual é desenhada (uma tabela editável),
+    então o tempo de tela não cresce com o número de rubricas. Retorna as descrições marcadas.
     """
-    dados_extracao = []
-    iniciar_extracao = False
-    padrao_DIP = re.compile(r"Data de Início do Pagamento \(DIP\): \d{2}/\d{2}/\d{4} MR: R\$ [\d.,]+")
-
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            page_number = page.page_number
-            text = page.extract_text()
-            if not text:
-                continue
-            linhas_filtradas = []
-
-            for linha in text.split("\n"):
-                if not iniciar_extracao:
-                    if padrao_DIP.match(linha):
-                        iniciar_extracao = True
-                        continue
-                    else:
-                        continue
-
-                if "Data de Nascimento" in linha:
-                    continue
-
-                linhas_filtradas.append(linha)
-
-            competencia_match = re.search(r"Competência\s*(\d{2}/\d{4})", "\n".join(linhas_filtradas))
-            competencia = competencia_match.group(1) if competencia_match else "N/A"
-
-            rubrica_detectada = False
-            for linha in linhas_filtradas:
-                if "RUBRICA" in linha.upper():
-                    dados_extracao.append({
-                        "Código": "Rubrica",
-                        "Descrição Rubrica": "Descrição Rubrica",
-                        "Valor": "Valor",
-                        "Data": competencia,
-                        "Página": page_number
-                    })
-                    rubrica_detectada = True
-                    continue
-
-                parts = linha.split()
-                if len(parts) >= 3 and parts[0].isdigit():
-                    if rubrica_detectada:
-                        rubrica_detectada = False
-                    codigo = parts[0]
-                    descricao = " ".join(parts[1:-1]).replace("R$", "").strip()
-                    valor = parts[-1]
-                    dados_extracao.append({
-                        "Código": codigo,
-                        "Descrição Rubrica": descricao,
-                        "Valor": valor,
-                        "Data": competencia,
-                        "Página": page_number
-                    })
-
-    df = pd.DataFrame(dados_extracao)
-    current_segment = 0
-    intervalos = []
-    for _, row in df.iterrows():
-        if row["Código"] == "Rubrica":
-            current_segment += 1
-            intervalos.append("")
+    df_lista = lista_unica_descontos(df_sel)
+    marcadas = descricoes_marcadas()
+
+    col_busca, col_categoria, col_banco = st.columns([2, 1, 1])
+    with col_busca:
+        busca = st.text_input("Buscar descrição", key="busca_lista_descontos")
+    with col_categoria:
+        categorias = sorted(set(df_lista[COL_CATEGORIA]) - {""})
+        categoria = st.selectbox("Categoria", ["Todas"] + categorias, key="categoria_lista_descontos")
+    with col_banco:
+        banco = st.selectbox("Banco", ["Todos"] + sorted(set(df_lista["Banco"])), key="banco_lista_descontos")
+
+    filtro = pd.Series(True, index=df_lista.index)
+    if busca.strip():
+        filtro &= df_lista["DESCRIÇÃO"].str.contains(busca.strip(), case=False, regex=False)
+    if categoria != "Todas":
+        filtro &= df_lista[COL_CATEGORIA] == categoria
+    if banco != "Todos":
+        filtro &= df_lista["Banco"] == banco
+    df_filtrada = df_lista[filtro]
+
+    col_marcar, col_desmarcar = st.columns(2)
+    with col_marcar:
+        marcar = st.button(f"Marcar todos os filtrados ({len(df_filtrada)})")
+    with col_desmarcar:
+        desmarcar = st.button("Desmarcar todos os filtrados")
+    if marcar or desmarcar:
+        if marcar:
+            marcadas.update(df_filtrada["DESCRIÇÃO"])
         else:
-            intervalos.append(f"Competência {current_segment}" if current_segment > 0 else "")
+            marcadas.difference_update(df_filtrada["DESCRIÇÃO"])
+        set_state_value("versao_lista_descontos", get_state_value("versao_lista_descontos") + 1)
+
+    total_paginas = max(1, -(-len(df_filtrada) // ITENS_POR_PAGINA_LISTA))
+    pagina = 1
+    if total_paginas > 1:
+        if (get_state_value("pagina_lista_descontos") or 1) > total_paginas:
+            set_state_value("pagina_lista_descontos", total_paginas)
+        pagina = st.number_input("Página", 1, total_paginas, 1, key="pagina_lista_descontos")
+    inicio = (pagina - 1) * ITENS_POR_PAGINA_LISTA
+    df_pagina = df_filtrada.iloc[inicio:inicio + ITENS_POR_PAGINA_LISTA]
+
+    # A chave muda com a página, os filtros e as marcações em bloco: cada tabela parte do conjunto marcado
+    chave_editor = hash((get_state_value("versao_lista_descontos"), pagina, busca, categoria, banco))
+    editado = st.data_editor(
+        df_pagina.assign(Incluir=df_pagina["DESCRIÇÃO"].isin(marcadas))[
+            ["Incluir", "DESCRIÇÃO", "Qtd", COL_CATEGORIA, "Banco"]],
+        key=f"editor_lista_descontos_{chave_editor}",
+        disabled=["DESCRIÇÃO", "Qtd", COL_CATEGORIA, "Banco"],
+        hide_index=True,
+        use_container_width=True
+    )
+    for descricao, incluir in zip(editado["DESCRIÇÃO"], editado["Incluir"]):
+        if incluir:
+            marcadas.add(descricao)
+        else:
+            marcadas.discard(descricao)
 
-    df["Intervalos"] = intervalos
-    return df
+    st.caption(
+        f"{len(marcadas & set(df_lista['DESCRIÇÃO']))} de {len(df_lista)} descrição(ões) marcada(s) - "
+        f"página {pagina} de {total_paginas}"
+    )
+    return marcadas
 
 
-def criar_informacoes_com_datas(df_rubricas, df_competencias):
+def memoria_da_sessao():
     """
-    Associa cada linha do DataFrame de Rubricas às datas extraídas (df_competencias),
-    de acordo com a coluna 'Intervalos' => "Competência X".
+    Bytes ocupados pelo estado desta sessão, separando o DataFrame de informações
+    (compartilhado com o cache de extração) do restante. Retorna (próprio, base).
     """
-    df_info = df_rubricas.copy()
-    for idx, row in df_info.iterrows():
-        intervalo = row.get("Intervalos", "")
-        match = re.search(r"Competência\s+(\d+)", intervalo)
-        if match:
-            num_comp = int(match.group(1))
-            if 0 <= num_comp - 1 < len(df_competencias):
-                data_comp = df_competencias.loc[num_comp - 1, "Data Competência"]
-                df_info.at[idx, "Data"] = data_comp
-    return df_info
+    proprio, base = 0, 0
+    for chave, valor in state_items():
+        if chave == "df_informacoes":
+            base += tamanho_em_memoria(valor)
+        else:
+            proprio += tamanho_em_memoria(valor)
+    return proprio, base
+
+
+def exibir_painel_depuracao():
+    """Painel de depuração (DEBUG_DESEMPENHO): tempos por etapa e páginas mais lentas."""
+    medicoes = medicoes_da_sessao()
+    with st.sidebar.expander("Depuração (desempenho)", expanded=False):
+        if st.button("Limpar medições"):
+            medicoes.limpar()
+        st.caption("Tempos por etapa (segundos)")
+        st.dataframe(medicoes.por_etapa(), hide_index=True, use_container_width=True)
+        st.caption("Páginas mais lentas (texto + segmentação)")
+        st.dataframe(medicoes.paginas_mais_lentas(), hide_index=True, use_container_width=True)
+        if PERFIL_ATIVO:
+            st.caption(f"Perfis (cProfile) gravados em: {os.path.abspath(PERFIS_PATH)}")
+
+
+def exibir_memoria_da_sessao():
+    """Medidor de memória da sessão na barra lateral (dimensionamento do servidor)."""
+    proprio, base = memoria_da_sessao()
+    st.sidebar.metric("Memória da sessão", f"{proprio / 2 ** 20:.2f} MB")
+    st.sidebar.caption(f"Informações extraídas (compartilhadas): {base / 2 ** 20:.2f} MB")
 
 
 ###############################################################################
-# CLASSE PDFBASICO PARA O RELATÓRIO BÁSICO
+# FUNÇÕES AUXILIARES (LOGO, GLOSSÁRIO, FORMATOS)
 ###############################################################################
-class PDFBasico(FPDF):
-    """
-    Ajusta cabeçalho do relatório, incluindo 'Contracheque ISS - nome + NB'.
-    """
+def get_image_base64(file_path):
+    """Carrega uma imagem e retorna sua representação em base64."""
+    if not os.path.exists(file_path):
+        return ""
+    with open(file_path, "rb") as img_file:
+        return base64.b64encode(img_file.read()).decode()
+
+
+def carregar_glossario(path):
+    """Carrega o arquivo de glossário (Rubricas.txt) e retorna como lista de strings."""
+    try:
+        return ler_glossario(path)
+    except Exception as e:
+        st.error(f"Erro ao carregar glossário: {e}")
+        return []
+
 
-    def __init__(self, nome_user, nb_user, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.nome_user = nome_user
-        self.nb_user = nb_user
+def carregar_indice_glossario():
+    """Monta o índice compilado com todos os glossários de GLOSSARIOS_APP."""
+    return IndiceGlossario({
+        categoria: carregar_glossario(path) for categoria, path in GLOSSARIOS_APP.items()
+    })
 
-    def header(self):
-        self.set_font('Arial', 'B', 12)
-        titulo = f"Contracheque ISS - {self.nome_user} - {self.nb_user}"
-        self.cell(0, 10, titulo, border=False, ln=True, align='C')
-        self.ln(10)
 
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.cell(0, 10, f'Página {self.page_no()}', border=False, ln=False, align='C')
+###############################################################################
+# EXTRAÇÃO NO AGENDADOR E ACOMPANHAMENTO (STREAMLIT)
+###############################################################################
+def extrair_pdf_agendado(tarefa, agendador, conteudo_pdf, chave_pdf, cache_extracao, armazem):
+    """
+    Executado por uma vaga do agendador: extrai o PDF em um processo do pool compartilhado,
+    guardando cada lote em tarefa.parciais, salva o caso e guarda o resultado no cache de
+    extração. Retorna {"nome", "nb", "df_informacoes", "paginas_ocr", "paginas_sem_texto"};
+    df_informacoes é None (e nada é salvo) se o PDF não tiver informações.
+    """
+    origens = Counter()
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+        tmp_file.write(conteudo_pdf)
+        tmp_file_path = tmp_file.name
+    try:
+        # Com DEBUG_DESEMPENHO=perfil, o processamento deste arquivo é gravado em um .prof
+        for lote in agendador.gerar_em_processo(extrair_contracheque_em_uma_vaga, tmp_file_path,
+                                                nome_perfil=chave_pdf[:12]):
+            tarefa.parciais.append(lote)
+            origens[lote["origem"]] += 1
+            tarefa.progresso = lote["pagina"] / lote["total_paginas"]
+    finally:
+        os.unlink(tmp_file_path)
+
+    nome, nb, df_competencias, df_dados = juntar_lotes(tarefa.parciais)
+    resultado = {"nome": nome, "nb": nb, "df_informacoes": None,
+                 "paginas_ocr": origens[ORIGEM_OCR], "paginas_sem_texto": origens[ORIGEM_SEM_TEXTO]}
+    if df_dados is None or df_dados.empty:
+        return resultado
+    # Associa rubricas às datas (competências)
+    resultado["df_informacoes"] = montar_df_informacoes(df_dados, df_competencias)
+    # Caso salvo (Parquet) para retomar a análise sem reprocessar o PDF
+    armazem.salvar(chave_pdf, nome, nb, df_competencias, df_dados)
+    cache_extracao.guardar(chave_pdf, resultado, tamanho_resultado_extracao(resultado))
+    return resultado
+
+
+def formatar_eta(segundos):
+    """45 -> "~45 s"; 150 -> "~2 min 30 s"."""
+    minutos, segundos = divmod(int(round(segundos)), 60)
+    return f"~{minutos} min {segundos} s" if minutos else f"~{segundos} s"
+
+
+def texto_na_fila(agendador, tarefa):
+    """Posição na fila do servidor e término estimado de uma tarefa que ainda não começou."""
+    return (f"Na fila do servidor: posição {agendador.posicao(tarefa)} "
+            f"(término estimado em {formatar_eta(agendador.eta(tarefa))})")
+
+
+def aguardar_tarefa(tarefa, descricao):
+    """
+    Espera uma tarefa do agendador exibindo a posição na fila, e retorna o resultado
+    (relança o erro da tarefa).
+    """
+    agendador = obter_agendador()
+    aviso = st.empty()
+    while not tarefa.aguardar(INTERVALO_ACOMPANHAMENTO):
+        if tarefa.iniciada_em is None:
+            aviso.info(f"{descricao}: {texto_na_fila(agendador, tarefa)}")
+        else:
+            aviso.info(f"{descricao}: gerando...")
+    aviso.empty()
+    if tarefa.estado == ERRO:
+        raise tarefa.erro
+    return tarefa.resultado
 
 
-def salvar_em_pdf_basico(dados, file_name, nome_user, nb_user):
+def acompanhar_extracao(tarefa, tabela_parcial):
     """
-    Gera um PDF simples com colunas: ["Código", "Descrição Rubrica", "Valor", "Data", "Página"].
-    Usa a classe PDFBasico com cabeçalho personalizado (nome + NB).
+    Acompanha a extração agendada até o término: posição na fila e término estimado enquanto
+    aguarda uma vaga, depois a barra de progresso por página com o tempo restante e a tabela
+    parcial (no máximo a cada INTERVALO_ATUALIZACAO_TABELA segundos).
+    Retorna o resultado da tarefa (relança o erro da tarefa).
     """
-    headers = ["Código", "Descrição Rubrica", "Valor", "Data", "Página"]
-    col_widths = {
-        "Código": 30,
-        "Descrição Rubrica": 130,
-        "Valor": 40,
-        "Data": 40,
-        "Página": 40
-    }
-
-    pdf = PDFBasico(nome_user=nome_user, nb_user=nb_user, orientation='L', format='A4')
-    pdf.add_page()
-    pdf.set_font("Arial", size=10)
-    pdf.set_fill_color(200, 220, 255)
-
-    # Cabeçalho das colunas
-    for title in headers:
-        pdf.cell(col_widths[title], 10, title, border=1, align='C', fill=True)
-    pdf.ln()
-
-    # Dados
-    for _, row in dados.iterrows():
-        for col in headers:
-            text = str(row.get(col, ""))
-            pdf.cell(col_widths[col], 10, text, border=1, align='C')
-        pdf.ln()
-
-    pdf.output(file_name)
+    agendador = obter_agendador()
+    barra = st.progress(0.0, text="Aguardando vaga no servidor...")
+    ultima_atualizacao = time.monotonic()
+    linhas_exibidas = 0
+
+    while not tarefa.aguardar(INTERVALO_ACOMPANHAMENTO):
+        if tarefa.iniciada_em is None:
+            barra.progress(0.0, text=texto_na_fila(agendador, tarefa))
+            continue
+        lotes = list(tarefa.parciais or [])
+        if not lotes:
+            barra.progress(0.0, text="Extraindo páginas do PDF...")
+            continue
+        ultimo = lotes[-1]
+        barra.progress(
+            tarefa.progresso,
+            text=f"Página {ultimo['pagina']} de {ultimo['total_paginas']}"
+                 + (" (OCR)" if ultimo["origem"] == ORIGEM_OCR else "")
+                 + f" - restam {formatar_eta(agendador.eta(tarefa))}"
+        )
+        registros = [r for lote in lotes for r in lote["registros"]]
+        if (len(registros) > linhas_exibidas
+                and time.monotonic() - ultima_atualizacao >= INTERVALO_ATUALIZACAO_TABELA):
+            competencias = [c for lote in lotes for c in lote["competencias"]]
+            df_parcial = montar_df_informacoes(montar_df_dados(registros), montar_df_competencias(competencias))
+            tabela_parcial.dataframe(df_parcial, use_container_width=True, column_config=COLUNAS_OCULTAS)
+            linhas_exibidas = len(registros)
+            ultima_atualizacao = time.monotonic()
+
+    barra.empty()
+    if tarefa.estado == ERRO:
+        raise tarefa.erro
+    paginas_ocr = tarefa.resultado["paginas_ocr"]
+    paginas_sem_texto = tarefa.resultado["paginas_sem_texto"]
+    if paginas_ocr:
+        st.info(f"{paginas_ocr} página(s) escaneada(s) lida(s) por OCR; confira os valores extraídos.")
+    if paginas_sem_texto:
+        st.warning(f"{paginas_sem_texto} página(s) sem texto (escaneadas) não foram lidas: "
+                   "o OCR (Tesseract) não está disponível neste servidor.")
+    return tarefa.resultado
+
+
+###############################################################################
+# CASOS SALVOS (ARMAZÉM PARQUET)
+###############################################################################
+def descartar_analise_anterior():
+    """Descarta pontuações e seleções do arquivo (ou caso) anterior."""
+    set_state_value("pontuacoes_descontos", None)
+    set_state_value("idx_descontos_gloss", None)
+    set_state_value("idx_descontos_sel", None)
+    set_state_value("descricoes_marcadas", None)
+
+
+def abrir_caso_salvo(meta):
+    """Carrega um caso do armazém no estado da sessão (sem reprocessar o PDF)."""
+    caso = obter_armazem_casos().carregar(meta["nb"], meta["sha256"])
+    if caso is None:
+        st.sidebar.error("Caso não encontrado.")
+        return
+    descartar_analise_anterior()
+    df_informacoes = montar_df_informacoes(caso["df_dados"], caso["df_competencias"])
+    set_state_value("df_informacoes", df_informacoes)
+    set_state_value("nome_extraido", caso["nome"])
+    set_state_value("nb_extraido", caso["nb"])
+    set_state_value("caso_atual", (caso["nb"], caso["sha256"]))
+    if caso["df_selecionados"] is not None:
+        # A seleção salva (por descrição) volta como lista filtrada e como seleção confirmada
+        set_state_value("pontuacoes_descontos", pontuar_descricoes(df_informacoes, carregar_indice_glossario()))
+        df_descontos = preparar_df_descontos(df_informacoes)
+        selecionadas = set(caso["df_selecionados"]["DESCRIÇÃO"].astype(str))
+        indices = df_descontos.index[df_descontos["DESCRIÇÃO"].astype(str).isin(selecionadas)].to_numpy()
+        set_state_value("idx_descontos_gloss", indices)
+        set_state_value("idx_descontos_sel", indices)
+    set_state_value("valor_recebido_input", caso.get("valor_recebido") or "0")
+
+
+def selecionar_caso_salvo():
+    """Lista os casos salvos na barra lateral e abre o escolhido."""
+    casos = obter_armazem_casos().listar()
+    st.sidebar.markdown("## Casos salvos")
+    if not casos:
+        st.sidebar.caption("Nenhum caso salvo.")
+        return
+    rotulos = [
+        f"{c['nome']} - {c['nb']} ({c['salvo_em'][:16].replace('T', ' ')}, {c['sha256'][:8]})" for c in casos
+    ]
+    escolhido = st.sidebar.selectbox("Retomar análise", rotulos)
+    if st.sidebar.button("Abrir caso"):
+        abrir_caso_salvo(casos[rotulos.index(escolhido)])
+
+
+def salvar_selecao_do_caso(df_selecionados=None, valor_recebido=None):
+    """Atualiza no armazém a seleção e/ou o valor recebido do caso em análise."""
+    caso_atual = get_state_value("caso_atual")
+    if caso_atual is not None:
+        obter_armazem_casos().atualizar_selecao(*caso_atual, df_selecionados, valor_recebido)
+
+
+def exibir_download_informacoes(chave_pdf, df_informacoes, nome_user, nb_user):
+    """Botão do PDF das informações com datas: gerado só quando pedido e guardado na sessão."""
+    chave_pdf_info = (chave_pdf, None, "pdf_informacoes")
+    if artefato_disponivel(chave_pdf_info) or st.button("Gerar PDF (Informações com Datas)"):
+        st.download_button(
+            "Baixar Informações com Datas (PDF)",
+            data=obter_artefato(chave_pdf_info, lambda: pdf_basico_bytes(df_informacoes, nome_user, nb_user)),
+            file_name=f"Contracheque {nome_user}_{nb_user}.pdf",
+            mime=MIME_PDF
+        )
 
 
 ###############################################################################
@@ -545,52 +683,92 @@ def main():
     )
 
     if uploaded_file is not None:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            tmp_file_path = tmp_file.name
-        try:
-            # Extrair Nome e NB
-            nome_final, nb_final = extrair_nome_e_nit_corrigido(tmp_file_path)
-            set_state_value("nome_extraido", nome_final)
-            set_state_value("nb_extraido", nb_final)
-
-            # Extrair competências
-            df_competencias = extrair_competencias_filtradas_por_contexto(tmp_file_path)
-            # Extrair dados do contracheque
-            df_final = extrair_dados_contracheques_plumber(tmp_file_path)
-            if df_final is None or df_final.empty:
-                st.warning("Não foram encontradas informações no PDF.")
+        conteudo_pdf = uploaded_file.getvalue()
+        chave_pdf = hash_conteudo(conteudo_pdf)
+        cache_extracao = obter_cache_extracao()
+        resultado = cache_extracao.obter(chave_pdf)
+
+        st.subheader("Informações extraídas com datas")
+
+        if resultado is None:
+            if get_state_value("extracao_cancelada") == chave_pdf:
+                st.warning("Processamento cancelado.")
+                if st.button("Reprocessar PDF"):
+                    set_state_value("extracao_cancelada", None)
+                    st.rerun()
                 return
 
-            # Associa rubricas às datas (competências)
-            df_informacoes = criar_informacoes_com_datas(df_final, df_competencias)
-            df_informacoes = df_informacoes[df_informacoes["Código"] != "Rubrica"]
-            if "Intervalos" in df_informacoes.columns:
-                df_informacoes.drop(columns=["Intervalos"], inplace=True)
-
-            st.subheader("Informações extraídas com datas")
-            st.dataframe(df_informacoes, use_container_width=True)
-
-            nome_user = get_state_value("nome_extraido") or "ND"
-            nb_user = get_state_value("nb_extraido") or "ND"
-
-            # (1) Retirar o texto "ISS_" do nome do PDF
-            base_pdf_name = f"Contracheque {nome_user}_{nb_user}.pdf"
-            pdf_info_path = os.path.join(tempfile.gettempdir(), base_pdf_name)
-            salvar_em_pdf_basico(df_informacoes, pdf_info_path, nome_user, nb_user)
-
-            with open(pdf_info_path, "rb") as pdf_file:
-                st.download_button(
-                    "Baixar Informações com Datas (PDF)",
-                    data=pdf_file,
-                    file_name=base_pdf_name,
-                    mime="application/pdf"
-                )
-
-            set_state_value("df_informacoes", df_informacoes)
-
-        finally:
-            os.unlink(tmp_file_path)
+            # A extração roda em uma vaga do agendador do servidor; um rerun (ou outra sessão
+            # com o mesmo arquivo) acompanha a mesma tarefa em vez de processar o PDF de novo
+            agendador = obter_agendador()
+            tarefa = agendador.submeter(
+                chave_pdf, id_da_sessao(),
+                functools.partial(extrair_pdf_agendado, agendador=agendador, conteudo_pdf=conteudo_pdf,
+                                  chave_pdf=chave_pdf, cache_extracao=cache_extracao,
+                                  armazem=obter_armazem_casos()),
+                tipo="extracao", custo=contar_paginas(conteudo_pdf)
+            )
+            # Lotes por página, para as medições: a tarefa libera tarefa.parciais ao terminar
+            parciais = tarefa.parciais
+            if parciais is None:
+                parciais = []
+
+            # Clicar em "Cancelar" interrompe o acompanhamento (rerun do Streamlit) e tira a
+            # tarefa da fila se nenhuma outra sessão a aguarda
+            area_cancelar = st.empty()
+            if area_cancelar.button("Cancelar processamento"):
+                agendador.cancelar(chave_pdf, id_da_sessao())
+                set_state_value("extracao_cancelada", chave_pdf)
+                st.rerun()
+            tabela_parcial = st.empty()
+
+            medicoes = medicoes_da_sessao()
+            resultado = acompanhar_extracao(tarefa, tabela_parcial)
+            area_cancelar.empty()
+            if tarefa.estado == CANCELADA:
+                st.warning("Processamento cancelado.")
+                return
+            medicoes.registrar("agendador.espera", tarefa.espera, arquivo=chave_pdf[:12])
+            medicoes.registrar("extracao", tarefa.duracao, arquivo=chave_pdf[:12])
+            for lote in parciais:
+                medicoes.registrar_lote(lote)
+            if resultado["df_informacoes"] is None:
+                st.warning("Não foram encontradas informações no PDF.")
+                return
+            tabela_parcial.dataframe(resultado["df_informacoes"], use_container_width=True,
+                                     column_config=COLUNAS_OCULTAS)
+        else:
+            st.dataframe(resultado["df_informacoes"], use_container_width=True, column_config=COLUNAS_OCULTAS)
+
+        set_state_value("nome_extraido", resultado["nome"])
+        set_state_value("nb_extraido", resultado["nb"])
+
+        exibir_download_informacoes(
+            chave_pdf, resultado["df_informacoes"], resultado["nome"] or "ND", resultado["nb"] or "ND"
+        )
+
+        stats = cache_extracao.estatisticas()
+        st.caption(
+            f"Cache de extração: {stats['itens']} arquivo(s), "
+            f"{stats['acertos']} acerto(s), {stats['falhas']} falha(s)"
+        )
+
+        if get_state_value("df_informacoes") is not resultado["df_informacoes"]:
+            # Novo arquivo: descarta pontuações e seleções do arquivo anterior
+            descartar_analise_anterior()
+        set_state_value("df_informacoes", resultado["df_informacoes"])
+        set_state_value("caso_atual", (resultado["nb"], chave_pdf))
+    else:
+        selecionar_caso_salvo()
+        caso_atual = get_state_value("caso_atual")
+        df_caso = get_state_value("df_informacoes")
+        if caso_atual is not None and df_caso is not None:
+            st.subheader("Informações extraídas com datas (caso salvo)")
+            st.dataframe(df_caso, use_container_width=True, column_config=COLUNAS_OCULTAS)
+            exibir_download_informacoes(
+                caso_atual[1], df_caso,
+                get_state_value("nome_extraido") or "ND", get_state_value("nb_extraido") or "ND"
+            )
 
     # Recupera DataFrame principal
     df_informacoes = get_state_value("df_informacoes")
@@ -600,21 +778,13 @@ def main():
     if df_informacoes is not None and not df_informacoes.empty:
         # Lista de Rubricas
         st.markdown("## Lista de Rúbricas")
-        glossary_terms = carregar_glossario(GLOSSARY_PATH)
+        glossary_terms = carregar_indice_glossario()
         if glossary_terms:
-            df_rubricas = pd.DataFrame({"Rubricas": glossary_terms})
+            df_rubricas = pd.DataFrame({"Rubricas": glossary_terms.termos, "Categoria": glossary_terms.categorias})
             st.dataframe(df_rubricas, use_container_width=True)
         else:
             st.warning("Glossário vazio ou não encontrado.")
 
-        # Ajustar colunas para "DESCRIÇÃO", "DESCONTOS", "PÁGINA"
-        df_aux = df_informacoes.copy()
-        df_aux.rename(columns={
-            "Descrição Rubrica": "DESCRIÇÃO",
-            "Valor": "DESCONTOS",
-            "Página": "PÁGINA"
-        }, inplace=True)
-
         # Filtrar Descontos no Glossário
         st.markdown("## Filtrar Descontos no Glossário")
         with st.form("form_filtro_gloss"):
@@ -623,188 +793,158 @@ def main():
 
         if submit_gloss:
             threshold_value = int(thresh * 100)
-            df_descontos = df_aux[df_aux["DESCONTOS"].str.strip() != ""].copy()
-            set_state_value("df_descontos", df_descontos)
-            df_desc_gloss = cruzar_descontos_com_rubricas(df_descontos, glossary_terms, threshold_value)
-            set_state_value("df_descontos_gloss", df_desc_gloss)
-            set_state_value("df_descontos_gloss_sel", None)
-
-        df_descontos_gloss = get_state_value("df_descontos_gloss")
-        if df_descontos_gloss is not None and not df_descontos_gloss.empty:
+            # Pontuação calculada uma única vez por arquivo; o slider só aplica a máscara
+            medicoes = medicoes_da_sessao()
+            if get_state_value("pontuacoes_descontos") is None:
+                with medicoes.etapa("pontuacao_glossario"):
+                    set_state_value("pontuacoes_descontos", pontuar_descricoes(df_informacoes, glossary_terms))
+            with medicoes.etapa("filtro_similaridade", limiar=threshold_value):
+                df_desc_gloss = filtrar_por_similaridade(descontos_da_sessao(), threshold_value)
+            set_state_value("idx_descontos_gloss", df_desc_gloss.index.to_numpy())
+            set_state_value("idx_descontos_sel", None)
+            set_state_value("descricoes_marcadas", None)
+
+        stats_rubricas = obter_cache_rubricas().estatisticas()
+        if stats_rubricas["acertos"] + stats_rubricas["falhas"]:
+            st.caption(
+                f"Cache de rubricas: {stats_rubricas['acertos']} acerto(s), "
+                f"{stats_rubricas['falhas']} falha(s) ({stats_rubricas['taxa_acerto']:.0%})"
+            )
+
+        idx_gloss = get_state_value("idx_descontos_gloss")
+        if idx_gloss is not None and len(idx_gloss):
+            df_descontos_gloss = descontos_da_sessao(idx_gloss)
             st.markdown("### Descontos x Glossário")
-            st.dataframe(df_descontos_gloss, use_container_width=True)
+            st.dataframe(df_descontos_gloss, use_container_width=True, column_config=COLUNAS_OCULTAS)
 
             st.markdown("## Lista única de descontos")
-            df_sel = get_state_value("df_descontos_gloss_sel")
-            if df_sel is None:
-                df_sel = df_descontos_gloss
-
-            with st.form("form_inclusao_descontos"):
-                valores_unicos = sorted(df_sel["DESCRIÇÃO"].unique())
-                st.write("Marque os itens que deseja incluir:")
-                selected_descr = []
-                for i, val in enumerate(valores_unicos):
-                    qtd = df_sel[df_sel["DESCRIÇÃO"] == val].shape[0]
-                    label_str = f"{i + 1} - {val} (Qtd: {qtd})"
-                    if st.checkbox(label_str, key=f"chk_{i}"):
-                        selected_descr.append(val)
-                incluir_btn = st.form_submit_button("Confirmar Inclusão (Descontos)")
+            idx_sel = get_state_value("idx_descontos_sel")
+            df_sel = df_descontos_gloss if idx_sel is None else descontos_da_sessao(idx_sel)
+
+            st.write("Marque os itens que deseja incluir:")
+            selected_descr = selecionar_descricoes(df_sel)
+            incluir_btn = st.button("Confirmar Inclusão (Descontos)")
 
             if incluir_btn:
-                if selected_descr:
-                    df_incluido = df_sel[df_sel["DESCRIÇÃO"].isin(selected_descr)].copy()
-                    set_state_value("df_descontos_gloss_sel", df_incluido)
+                incluidos = df_sel["DESCRIÇÃO"].astype(str).isin(selected_descr)
+                if incluidos.any():
+                    df_incluido = df_sel[incluidos]
+                    set_state_value("idx_descontos_sel", df_incluido.index.to_numpy())
+                    salvar_selecao_do_caso(df_selecionados=df_incluido)
                     st.success("Descontos selecionados com sucesso!")
                     st.markdown("### Lista restantes após exclusões")
-                    st.dataframe(df_incluido, use_container_width=True)
+                    st.dataframe(df_incluido, use_container_width=True, column_config=COLUNAS_OCULTAS)
                 else:
                     st.warning("Nenhuma descrição selecionada.")
 
-            df_final_sel = get_state_value("df_descontos_gloss_sel")
-            if df_final_sel is not None and not df_final_sel.empty:
+            idx_sel = get_state_value("idx_descontos_sel")
+            if idx_sel is not None and len(idx_sel):
                 st.markdown("## Apresentar Rúbricas para Débitos (Descontos Finais)")
 
-                df_final = df_final_sel.copy()
-                # Ajusta páginas (caso esteja em branco)
-                df_final["PÁGINA"] = pd.to_numeric(df_final["PÁGINA"], errors='coerce').fillna(0)
-                # Ordena por Data + Página
-                df_final = df_final.sort_values(
-                    by=["Data", "PÁGINA"],
-                    key=lambda col: pd.to_datetime(col, format="%m/%Y", errors='coerce')
-                ).reset_index(drop=True)
-
-                # Apenas colunas relevantes
-                df_final = df_final[["Código", "DESCRIÇÃO", "DESCONTOS", "Data"]]
-
-                # Cálculo de A (sem apresentar botão)
-                def _to_float(x):
-                    try:
-                        return float(str(x).replace(',', '.').strip())
-                    except:
-                        return 0.0
-
-                A_val = df_final["DESCONTOS"].apply(_to_float).sum()
-                A_str = f"{A_val:,.2f}"
-
-                # Exibe A diretamente em tela (sem botão)
-                st.write(f"A = Valor Total (R$): {A_str}")
+                with medicoes_da_sessao().etapa("ordenar_descontos_finais", linhas=len(idx_sel)):
+                    df_final = ordenar_descontos_finais(descontos_da_sessao(idx_sel))
 
                 col1, col2 = st.columns(2)
                 with col1:
                     # Input do valor B
-                    valor_recebido_input = st.text_input("B = Valor Recebido - Autor (a)", "0")
-
-                try:
-                    vrnum = float(valor_recebido_input.replace(',', '.').strip())
-                except:
-                    vrnum = 0.0
+                    if get_state_value("valor_recebido_input") is None:
+                        set_state_value("valor_recebido_input", "0")
+                    valor_recebido_input = st.text_input("B = Valor Recebido - Autor (a)", key="valor_recebido_input")
+                    data_referencia = st.date_input(
+                        "Data de referência (prescrição quinquenal)", value=date.today(), format="DD/MM/YYYY"
+                    )
 
-                indebito_val = A_val - vrnum
-                indebito_dobro_val = 2 * indebito_val
-                indebito_str = f"{indebito_val:,.2f}"
-                indebito_dobro_str = f"{indebito_dobro_val:,.2f}"
+                # Todos os totais e agrupamentos calculados uma única vez por execução
+                with medicoes_da_sessao().etapa("resumo"):
+                    resumo = calcular_resumo(df_final, valor_recebido_input, data_referencia)
+                A_val, _, indebito_val, indebito_dobro_val = resumo["totais"]
 
                 with col2:
-                    st.write(f"Indébito (A-B): {indebito_str}")
-                    st.write(f"Indébito em dobro (R$): {indebito_dobro_str}")
-
-                # Armazena o valor digitado no estado
+                    st.write(f"A = Valor Total (R$): {formatar_centavos_brl(A_val)}")
+                    st.write(f"Indébito (A-B): {formatar_centavos_brl(indebito_val)}")
+                    st.write(f"Indébito em dobro (R$): {formatar_centavos_brl(indebito_dobro_val)}")
+                    st.write(texto_nao_prescrito(resumo))
+
+                with st.expander("Resumo dos descontos selecionados"):
+                    abas = st.tabs(["Por competência", "Por rubrica", "Por ano", "Por banco", "Janela de 5 anos"])
+                    for aba, chave in zip(abas, ["por_competencia", "por_rubrica", "por_ano",
+                                                 "por_banco", "janelas_prescricao"]):
+                        with aba:
+                            st.dataframe(resumo_para_exibicao(resumo[chave]), hide_index=True,
+                                         use_container_width=True)
+
+                # Armazena o valor digitado no estado (e no caso salvo, quando alterado)
+                if valor_recebido_input != get_state_value("valor_recebido"):
+                    salvar_selecao_do_caso(valor_recebido=valor_recebido_input)
                 set_state_value("valor_recebido", valor_recebido_input)
 
                 with st.form("form_descontos_finais"):
                     submit_final = st.form_submit_button("Gerar Relatório Final com Descontos")
 
-                if submit_final:
+                # Relatórios identificados pelos dados finais e parâmetros; reaproveitados em reruns
+                chave_final = (hash_dataframe(df_final), valor_recebido_input, data_referencia)
+                if submit_final or artefato_disponivel(chave_final + ("pdf",)):
                     # Monta título final (3.1 => trocar vírgula por ponto no NB)
                     nb_user_fixed = nb_user.replace(",", ".")
                     titulo_final = f"Descontos Finais (Cronológico) - {nome_user} - {nb_user_fixed}"
 
-                    df_com_totais = inserir_totais_na_coluna(df_final.copy(), "DESCONTOS")
-
-                    # (1) Retirar "ISS_" do nome do PDF
-                    pdf_final_name = f"Contracheque Descontos_Finais_{nome_user}_{nb_user}.pdf"
-                    pdf_final_path = os.path.join(tempfile.gettempdir(), pdf_final_name)
-
-                    # Geração do PDF final
-                    pdf = FPDF(orientation='L', format='A4')
-                    pdf.add_page()
-                    pdf.set_font("Arial", "B", 12)
-                    pdf.cell(0, 10, titulo_final, border=False, ln=True, align='C')
-                    pdf.ln(10)
-
-                    pdf.set_font("Arial", "B", 10)
-                    headers = ["Código", "DESCRIÇÃO", "DESCONTOS", "Data"]
-                    col_widths = {
-                        "Código": 25,
-                        "DESCRIÇÃO": 150,
-                        "DESCONTOS": 35,
-                        "Data": 40
-                    }
-                    pdf.set_fill_color(200, 220, 255)
-                    for h in headers:
-                        pdf.cell(col_widths[h], 8, h, border=1, align='C', fill=True)
-                    pdf.ln()
-
-                    # Monta as linhas no PDF
-                    for _, row in df_com_totais.iterrows():
-                        desc = row["DESCRIÇÃO"]
-                        is_especial = desc in [
-                            "A = Valor Total (R$)",
-                            "B = Valor Recebido - Autor (a)",
-                            "Indébito (A-B)",
-                            "Indébito em dobro (R$)"
-                        ]
-                        if is_especial:
-                            # (2.1) Fonte maior
-                            pdf.set_font("Arial", "B", 12)
-                            # (2.2) Cor vermelha
-                            pdf.set_text_color(255, 0, 0)
-                        else:
-                            pdf.set_font("Arial", "", 9)
-                            pdf.set_text_color(0, 0, 0)
-
-                        row_data = []
-                        for h in headers:
-                            val = str(row[h])
-                            if h == "DESCONTOS" and val.strip():
-                                # Converte para formato BRL
-                                val = formatar_valor_brl(val)
-                            row_data.append(val)
-
-                        for h, val in zip(headers, row_data):
-                            pdf.cell(col_widths[h], 8, val, border=1, align='C')
-                        pdf.ln()
-
-                    pdf.output(pdf_final_path)
-
-                    with open(pdf_final_path, "rb") as f_pdf:
-                        st.download_button(
-                            "Baixar PDF (Descontos Finais)",
-                            data=f_pdf.read(),
-                            file_name=pdf_final_name,
-                            mime="application/pdf"
-                        )
-
-                    # Geração do DOCX final
-                    # (1) Retirar "ISS_" do nome do DOCX
-                    docx_final_name = f"Contracheque Descontos_Finais_{nome_user}_{nb_user}.docx"
-
-                    docx_bytes = df_to_docx_bytes(
-                        dados=df_final.copy(),
-                        titulo=titulo_final,
-                        inserir_totais=True,
-                        col_valor_soma="DESCONTOS"
+                    # (1) Retirar "ISS_" do nome do PDF e do DOCX
+                    base_final_name = f"Contracheque Descontos_Finais_{nome_user}_{nb_user}"
+
+                    st.download_button(
+                        "Baixar PDF (Descontos Finais)",
+                        data=obter_artefato(
+                            chave_final + ("pdf",),
+                            lambda: pdf_descontos_finais_bytes(df_final, titulo_final, valor_recebido_input, resumo)
+                        ),
+                        file_name=base_final_name + ".pdf",
+                        mime=MIME_PDF
                     )
-                    docx_bytes_corrigido = ajustar_valores_docx(docx_bytes)
 
                     st.download_button(
                         label="Baixar DOCX (Descontos Finais)",
-                        data=docx_bytes_corrigido,
-                        file_name=docx_final_name,
-                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+                        data=obter_artefato(
+                            chave_final + ("docx",),
+                            lambda: df_to_docx_bytes(
+                                dados=df_final,
+                                titulo=titulo_final,
+                                inserir_totais=True,
+                                col_valor_soma="DESCONTOS",
+                                valor_recebido=valor_recebido_input,
+                                resumo=resumo
+                            )
+                        ),
+                        file_name=base_final_name + ".docx",
+                        mime=MIME_DOCX
+                    )
+
+                    # Planilha: informações extraídas + descontos finais + totais
+                    caso = {"nome": nome_user, "nb": nb_user, "df_informacoes": df_informacoes,
+                            "df_final": df_final, "resumo": resumo}
+                    st.download_button(
+                        label="Baixar XLSX (Informações e Descontos Finais)",
+                        data=obter_artefato(
+                            chave_final + (hash_dataframe(df_informacoes), "xlsx"),
+                            lambda: xlsx_bytes([caso])
+                        ),
+                        file_name=base_final_name + ".xlsx",
+                        mime=MIME_XLSX
                     )
 
 
+def exibir_fila_do_servidor():
+    """Ocupação do agendador do servidor na barra lateral."""
+    stats = obter_agendador().estatisticas()
+    st.sidebar.caption(
+        f"Servidor: {stats['executando']} de {stats['workers']} vaga(s) em uso, "
+        f"{stats['na_fila']} tarefa(s) na fila de {stats['sessoes_na_fila']} sessão(ões)"
+    )
+
+
 if __name__ == "__main__":
     main()
+    exibir_fila_do_servidor()
+    exibir_memoria_da_sessao()
+    if DEBUG_ATIVO:
+        exibir_painel_depuracao()
 
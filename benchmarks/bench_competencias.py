@@ -0,0 +1,100 @@
+"""
+Benchmark da segmentação por competência ('Intervalos') e da associação das datas.
+
+Compara as versões vetorizadas (extracao.montar_df_dados / criar_informacoes_com_datas)
+com as implementações anteriores, linha a linha com iterrows() (centavos valor a valor com
+valor_para_centavos), e confere que a saída é idêntica.
+
+    python benchmarks/bench_competencias.py [qtd_competencias]
+"""
+import os
+import re
+import sys
+import time
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from extracao import (
+    montar_df_dados, criar_informacoes_com_datas, montar_df_competencias, valor_para_centavos, COL_CENTAVOS
+)
+
+
+def montar_df_dados_iterrows(dados_extracao):
+    """Implementação anterior (referência)."""
+    df = pd.DataFrame(dados_extracao)
+    current_segment = 0
+    intervalos = []
+    for _, row in df.iterrows():
+        if row["Código"] == "Rubrica":
+            current_segment += 1
+            intervalos.append("")
+        else:
+            intervalos.append(f"Competência {current_segment}" if current_segment > 0 else "")
+    df["Intervalos"] = intervalos
+    df[COL_CENTAVOS] = pd.array([valor_para_centavos(v) for v in df["Valor"]], dtype="Int64")
+    return df
+
+
+def criar_informacoes_com_datas_iterrows(df_rubricas, df_competencias):
+    """Implementação anterior (referência)."""
+    df_info = df_rubricas.copy()
+    for idx, row in df_info.iterrows():
+        intervalo = row.get("Intervalos", "")
+        match = re.search(r"Competência\s+(\d+)", intervalo)
+        if match:
+            num_comp = int(match.group(1))
+            if 0 <= num_comp - 1 < len(df_competencias):
+                data_comp = df_competencias.loc[num_comp - 1, "Data Competência"]
+                df_info.at[idx, "Data"] = data_comp
+    return df_info
+
+
+def gerar_registros(qtd_competencias, rubricas_por_competencia=6):
+    """Registros sintéticos no formato de registros_das_linhas (inclui linhas antes do 1º cabeçalho)."""
+    registros = [{"Código": "101", "Descrição Rubrica": "ANTES DO CABECALHO", "Valor": "1,00",
+                  "Data": "N/A", "Página": 1}]
+    competencias = []
+    for k in range(qtd_competencias):
+        pagina = k // 4 + 1
+        registros.append({"Código": "Rubrica", "Descrição Rubrica": "Descrição Rubrica", "Valor": "Valor",
+                          "Data": "N/A", "Página": pagina})
+        for j in range(rubricas_por_competencia):
+            registros.append({"Código": str(200 + j), "Descrição Rubrica": f"RUBRICA {j}",
+                              "Valor": f"{j + 10},50", "Data": "N/A", "Página": pagina})
+        competencias.append(f"{k % 12 + 1:02d}/{1990 + k // 12}")
+    # Algumas competências a menos que segmentos: as últimas ficam sem data
+    return registros, competencias[:-3]
+
+
+def medir(func, *args, repeticoes=3):
+    melhor = float("inf")
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = func(*args)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def main():
+    qtd = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    registros, competencias = gerar_registros(qtd)
+    df_competencias = montar_df_competencias(competencias)
+
+    t_ref_dados, df_ref = medir(montar_df_dados_iterrows, registros)
+    t_vet_dados, df_vet = medir(montar_df_dados, registros)
+    assert df_ref.equals(df_vet), "montar_df_dados divergiu da referência"
+
+    t_ref_datas, info_ref = medir(criar_informacoes_com_datas_iterrows, df_ref, df_competencias)
+    t_vet_datas, info_vet = medir(criar_informacoes_com_datas, df_vet, df_competencias)
+    assert info_ref.equals(info_vet), "criar_informacoes_com_datas divergiu da referência"
+
+    print(f"{len(registros)} linhas, {qtd} competências (saídas idênticas)")
+    print(f"Intervalos:   iterrows {t_ref_dados:8.3f}s | vetorizado {t_vet_dados:8.3f}s "
+          f"| {t_ref_dados / t_vet_dados:6.1f}x")
+    print(f"Datas:        iterrows {t_ref_datas:8.3f}s | vetorizado {t_vet_datas:8.3f}s "
+          f"| {t_ref_datas / t_vet_datas:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark do DOCX dos descontos finais (relatorios.df_to_docx_bytes).
+
+Compara o gerador atual (layout das colunas definido uma vez, linhas montadas em XML numa
+única passada, bytes em memória) com a implementação anterior (iterrows, estilo célula a
+célula, larguras redefinidas a cada linha e ajuste dos valores com arquivo temporário)
+e confere que o texto das células é idêntico.
+
+    python benchmarks/bench_docx.py [qtd_linhas] [qtd_linhas_referencia]
+"""
+import os
+import re
+import sys
+import time
+import tempfile
+from io import BytesIO
+import numpy as np
+import pandas as pd
+from docx import Document
+from docx.shared import Pt, Inches, RGBColor
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from extracao import COL_CENTAVOS
+from relatorios import (
+    df_to_docx_bytes,
+    inserir_totais_na_coluna,
+    valores_para_exibicao,
+    formatar_centavos_brl,
+    LINHAS_ESPECIAIS
+)
+
+
+def gerar_descontos(qtd):
+    """DataFrame sintético no formato de ordenar_descontos_finais."""
+    rng = np.random.default_rng(0)
+    centavos = rng.integers(100, 500_000, qtd)
+    datas = pd.period_range("2000-01", periods=max(qtd // 4, 1), freq="M").strftime("%m/%Y")
+    descricoes = np.array(["EMPRESTIMO BANCO BMG", "CONSIGNACAO - CARTAO", "SABEMI SEGUROS & CIA",
+                           "RESERVA DE MARGEM CONSIGNAVEL PARA CARTAO DE CREDITO"])
+    return pd.DataFrame({
+        "Código": rng.integers(200, 300, qtd).astype(str),
+        "DESCRIÇÃO": descricoes[rng.integers(0, len(descricoes), qtd)],
+        "DESCONTOS": [formatar_centavos_brl(c) for c in centavos],
+        "Data": np.resize(np.asarray(datas), qtd),
+        COL_CENTAVOS: pd.array(centavos, dtype="Int64")
+    })
+
+
+def formatar_valor_brl(valor):
+    """Referência: converte string no formato US '999.99' para '999,99' (ajuste posterior do DOCX)."""
+    try:
+        f = float(str(valor).replace(",", "").replace(".", "")) / 100
+        return f"{f:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    except ValueError:
+        return str(valor)
+
+
+def df_to_docx_bytes_iterrows(dados, titulo, valor_recebido="0"):
+    """Implementação anterior (referência), incluindo o ajuste posterior em arquivo temporário."""
+    dados = valores_para_exibicao(inserir_totais_na_coluna(dados.copy(), "DESCONTOS", valor_recebido))
+    document = Document()
+    document.add_heading(titulo, level=1)
+    colunas = dados.columns.tolist()
+    table = document.add_table(rows=1, cols=len(colunas))
+    table.style = 'Table Grid'
+    for i, col_name in enumerate(colunas):
+        table.rows[0].cells[i].text = str(col_name)
+        for run in table.rows[0].cells[i].paragraphs[0].runs:
+            run.font.bold = True
+    width_map = {"DESCRIÇÃO": 130, "DESCONTOS": 40}
+    for _, row in dados.iterrows():
+        is_especial = str(row.get("DESCRIÇÃO", "")) in LINHAS_ESPECIAIS
+        row_cells = table.add_row().cells
+        for i, col_name in enumerate(colunas):
+            paragraph = row_cells[i].paragraphs[0]
+            run = paragraph.add_run(str(row[col_name]))
+            paragraph.alignment = (WD_ALIGN_PARAGRAPH.LEFT if col_name.upper() == "DESCRIÇÃO"
+                                   else WD_ALIGN_PARAGRAPH.CENTER)
+            run.font.size = Pt(9)
+            if is_especial:
+                run.font.bold = True
+                run.font.size = Pt(11)
+                run.font.color.rgb = RGBColor(255, 0, 0)
+        for i, col_name in enumerate(colunas):
+            table.columns[i].width = Inches(width_map.get(col_name, 25) / 25.4)
+    buf = BytesIO()
+    document.save(buf)
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as tmp_in:
+        tmp_in.write(buf.getvalue())
+        input_path = tmp_in.name
+    output_path = input_path.replace(".docx", "_corrigido.docx")
+    doc = Document(input_path)
+    pattern = re.compile(r'([\d,]+\.\d{2})')
+    for para in doc.paragraphs:
+        for val_us in pattern.findall(para.text):
+            para.text = para.text.replace(val_us, formatar_valor_brl(val_us))
+    doc.save(output_path)
+    with open(output_path, "rb") as f:
+        final_bytes = f.read()
+    os.remove(input_path)
+    os.remove(output_path)
+    return final_bytes
+
+
+def textos_da_tabela(docx_bytes):
+    tabela = Document(BytesIO(docx_bytes)).tables[0]
+    return [[c.text for c in row.cells] for row in tabela.rows]
+
+
+def medir(func, *args):
+    inicio = time.perf_counter()
+    resultado = func(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+if __name__ == "__main__":
+    qtd = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    qtd_ref = int(sys.argv[2]) if len(sys.argv) > 2 else min(qtd, 1000)
+    titulo = "Descontos Finais (Cronológico) - NOME - 123.456.789-0"
+
+    df = gerar_descontos(qtd)
+    novo, t_novo = medir(df_to_docx_bytes, df, titulo, True, "DESCONTOS", "1.000,50")
+    print(f"df_to_docx_bytes: {qtd} linhas em {t_novo:.3f}s ({len(novo) / 1024:.0f} KiB)")
+
+    # A referência cresce de forma quadrática (larguras por linha); medida em qtd_ref linhas
+    df_ref = df.head(qtd_ref)
+    ref, t_ref = medir(df_to_docx_bytes_iterrows, df_ref, titulo, "1.000,50")
+    novo_ref, t_novo_ref = medir(df_to_docx_bytes, df_ref, titulo, True, "DESCONTOS", "1.000,50")
+    assert textos_da_tabela(ref) == textos_da_tabela(novo_ref)
+    print(f"referência (iterrows): {qtd_ref} linhas em {t_ref:.3f}s; atual: {t_novo_ref:.3f}s "
+          f"({t_ref / t_novo_ref:.0f}x), tabelas idênticas")
@@ -0,0 +1,105 @@
+"""
+Paridade e vazão dos leitores da camada de texto (leitores.py) na extração.
+
+Para contracheques sintéticos com colunas desenhadas em separado (a camada de texto não
+preserva as linhas) e com linhas inteiras (a camada de texto já vem em linhas), e para os
+PDFs passados na linha de comando:
+  - confere que o leitor "rapido" produz exatamente as mesmas informações do leitor
+    "pdfplumber", inclusive com o pdfplumber forçado nas páginas pares (fallback por página);
+  - mede páginas/s de cada leitor sozinho (só o texto) e da extração completa com cada um,
+    e quantas páginas o leitor rápido mandou para o pdfplumber.
+
+    python benchmarks/bench_leitores.py [arquivo.pdf ...] [--competencias 120] [--rubricas 8]
+
+Sai com código 1 se alguma paridade falhar.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from collections import Counter
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from gerar_contracheque import gerar_contracheque
+from extracao import extrair_contracheque_em_lotes, juntar_lotes, montar_df_informacoes, ORIGEM_RAPIDA
+from leitores import LEITORES, LeitorPyPDF2
+
+
+def extrair(pdf_path, leitor):
+    """(segundos, (nome, nb), df_informacoes, origens das páginas) da extração com 'leitor'."""
+    origens = Counter()
+
+    def lotes():
+        for lote in extrair_contracheque_em_lotes(pdf_path, workers=1, leitor=leitor):
+            origens[lote.get("origem", leitor)] += 1
+            yield lote
+
+    inicio = time.perf_counter()
+    nome, nb, df_competencias, df_dados = juntar_lotes(lotes())
+    df_informacoes = montar_df_informacoes(df_dados, df_competencias).reset_index(drop=True)
+    return time.perf_counter() - inicio, (nome, nb), df_informacoes, origens
+
+
+def texto_vazio_nas_paginas_pares(texto):
+    """Versão de LeitorPyPDF2.texto sem texto nas páginas pares (força o pdfplumber nelas)."""
+    def texto_parcial(self, indice):
+        return "" if indice % 2 == 1 else texto(self, indice)
+    return texto_parcial
+
+
+def vazao_leitor(pdf_path, nome):
+    """Páginas/s do leitor 'nome' só obtendo o texto de todas as páginas."""
+    inicio = time.perf_counter()
+    with LEITORES[nome](pdf_path) as leitor:
+        paginas = len(leitor)
+        for indice in range(paginas):
+            leitor.texto(indice)
+    return paginas / (time.perf_counter() - inicio)
+
+
+def comparar(rotulo, pdf_path):
+    """Imprime paridade e vazão de um PDF; retorna False se alguma paridade falhar."""
+    t_completo, cab_completo, df_completo, origens_completo = extrair(pdf_path, "pdfplumber")
+    t_rapido, cab_rapido, df_rapido, origens = extrair(pdf_path, "rapido")
+    with mock.patch.object(LeitorPyPDF2, "texto", texto_vazio_nas_paginas_pares(LeitorPyPDF2.texto)):
+        _, cab_misto, df_misto, origens_misto = extrair(pdf_path, "rapido")
+
+    paginas = sum(origens_completo.values())
+    paridade = cab_rapido == cab_completo and df_rapido.equals(df_completo)
+    paridade_mista = cab_misto == cab_completo and df_misto.equals(df_completo)
+    print(f"{rotulo}: {paginas} página(s), {len(df_completo)} rubricas")
+    for nome in LEITORES:
+        print(f"  texto {nome:<10} {vazao_leitor(pdf_path, nome):8.1f} páginas/s")
+    print(f"  extração pdfplumber {paginas / t_completo:8.1f} páginas/s")
+    print(f"  extração rapido     {paginas / t_rapido:8.1f} páginas/s "
+          f"({t_completo / t_rapido:.1f}x; {paginas - origens[ORIGEM_RAPIDA]} página(s) no pdfplumber)")
+    print(f"  paridade: {'ok' if paridade else 'DIFERENTE'}; com pdfplumber nas páginas pares "
+          f"({dict(origens_misto)}): {'ok' if paridade_mista else 'DIFERENTE'}")
+    return paridade and paridade_mista
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Paridade e vazão dos leitores da camada de texto.")
+    parser.add_argument("pdfs", nargs="*", help="PDFs reais a comparar além dos sintéticos")
+    parser.add_argument("--competencias", type=int, default=120)
+    parser.add_argument("--rubricas", type=int, default=8)
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp()
+    casos = []
+    for rotulo, linhas_inteiras in (("sintético em colunas", False), ("sintético em linhas", True)):
+        pdf_path = os.path.join(pasta, f"sintetico_{int(linhas_inteiras)}.pdf")
+        gerar_contracheque(pdf_path, competencias=args.competencias, rubricas=args.rubricas,
+                           linhas_inteiras=linhas_inteiras)
+        casos.append((rotulo, pdf_path))
+    casos.extend((os.path.basename(p), p) for p in args.pdfs)
+
+    resultados = [comparar(rotulo, pdf_path) for rotulo, pdf_path in casos]
+    return 0 if all(resultados) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
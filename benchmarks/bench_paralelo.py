@@ -0,0 +1,88 @@
+"""
+Escalabilidade da leitura das páginas em paralelo (extrair_contracheque_em_lotes com workers > 1).
+
+Gera um contracheque sintético grande com colunas desenhadas em separado (todas as páginas
+vão para o pdfplumber, o caso que o pool acelera), extrai com 1, 2, 4, ... processos até o
+nº de núcleos e, para cada um, mede páginas/s, o ganho sobre 1 processo e confere que nome,
+NB, competências e informações são idênticos aos da leitura sequencial.
+
+    python benchmarks/bench_paralelo.py [arquivo.pdf ...] [--competencias 600] [--rubricas 6]
+        [--workers 1,2,4] [--leitor rapido]
+
+Sai com código 1 se alguma extração paralela divergir da sequencial.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from gerar_contracheque import gerar_contracheque
+from extracao import extrair_contracheque_em_lotes, juntar_lotes, montar_df_informacoes
+
+
+def extrair(pdf_path, workers, leitor):
+    """(segundos, páginas, (nome, nb, df_competencias, df_informacoes)) com 'workers' processos."""
+    paginas = 0
+
+    def lotes():
+        nonlocal paginas
+        for lote in extrair_contracheque_em_lotes(pdf_path, workers=workers, leitor=leitor, ocr_workers=0):
+            paginas += 1
+            yield lote
+
+    inicio = time.perf_counter()
+    nome, nb, df_competencias, df_dados = juntar_lotes(lotes())
+    df_informacoes = montar_df_informacoes(df_dados, df_competencias).reset_index(drop=True)
+    return time.perf_counter() - inicio, paginas, (nome, nb, df_competencias, df_informacoes)
+
+
+def iguais(a, b):
+    return a[:2] == b[:2] and a[2].equals(b[2]) and a[3].equals(b[3])
+
+
+def comparar(rotulo, pdf_path, lista_workers, leitor):
+    """Imprime a vazão por nº de processos; retorna False se alguma extração divergir."""
+    base_segundos, paginas, base = extrair(pdf_path, 1, leitor)
+    print(f"{rotulo}: {paginas} página(s), {len(base[3])} rubricas")
+    print(f"  1 processo(s)  {paginas / base_segundos:8.1f} páginas/s")
+    ok = True
+    for workers in lista_workers:
+        if workers <= 1:
+            continue
+        segundos, _, resultado = extrair(pdf_path, workers, leitor)
+        paridade = iguais(resultado, base)
+        ok = ok and paridade
+        print(f"  {workers} processo(s) {paginas / segundos:8.1f} páginas/s ({base_segundos / segundos:.2f}x) - "
+              f"{'ok' if paridade else 'DIFERENTE'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escalabilidade da leitura das páginas em paralelo.")
+    parser.add_argument("pdfs", nargs="*", help="PDFs reais a medir além do sintético")
+    parser.add_argument("--competencias", type=int, default=600)
+    parser.add_argument("--rubricas", type=int, default=6)
+    parser.add_argument("--workers", default=None,
+                        help="Processos a medir, separados por vírgula (padrão: 1, 2, 4, ... até o nº de núcleos)")
+    parser.add_argument("--leitor", default="rapido", help="Leitor da extração (rapido ou pdfplumber)")
+    args = parser.parse_args()
+
+    if args.workers:
+        lista_workers = [int(w) for w in args.workers.split(",")]
+    else:
+        nucleos = multiprocessing.cpu_count()
+        lista_workers = [w for w in (2 ** i for i in range(8)) if w < nucleos] + [nucleos]
+
+    pdf_path = os.path.join(tempfile.mkdtemp(), "sintetico.pdf")
+    gerar_contracheque(pdf_path, competencias=args.competencias, rubricas=args.rubricas)
+    casos = [("sintético em colunas", pdf_path)] + [(os.path.basename(p), p) for p in args.pdfs]
+    resultados = [comparar(rotulo, caminho, lista_workers, args.leitor) for rotulo, caminho in casos]
+    return 0 if all(resultados) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
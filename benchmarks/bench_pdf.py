@@ -0,0 +1,123 @@
+"""
+Benchmark dos relatórios em PDF (relatorios.salvar_em_pdf_basico / salvar_pdf_descontos_finais).
+
+Compara a tabela desenhada a partir de colunas (PDFRelatorio.tabela) com a implementação
+anterior (iterrows + uma chamada cell() por valor, fonte e cor redefinidas a cada linha)
+e confere que o texto extraído da primeira página contém as mesmas linhas.
+
+    python benchmarks/bench_pdf.py [qtd_linhas] [qtd_linhas_referencia]
+"""
+import os
+import sys
+import time
+import tempfile
+import warnings
+import numpy as np
+import pandas as pd
+import pdfplumber
+from fpdf import FPDF
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from extracao import COL_CENTAVOS
+from relatorios import (
+    salvar_em_pdf_basico,
+    salvar_pdf_descontos_finais,
+    inserir_totais_na_coluna,
+    valores_para_exibicao,
+    formatar_centavos_brl,
+    LINHAS_ESPECIAIS
+)
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+
+def gerar_informacoes(qtd):
+    """DataFrame sintético no formato de montar_df_informacoes (já com 'Descrição Rubrica')."""
+    rng = np.random.default_rng(0)
+    centavos = rng.integers(100, 500_000, qtd)
+    datas = pd.period_range("2000-01", periods=max(qtd // 20, 1), freq="M").strftime("%m/%Y")
+    descricoes = np.array([
+        "VALOR TOTAL DE MR DO PERIODO", "EMPRESTIMO BANCO BMG", "CONSIGNACAO - CARTAO",
+        "RESERVA DE MARGEM CONSIGNAVEL PARA CARTAO DE CREDITO BANCO BMG S.A. CONTRATO 1234567890"
+    ])
+    return pd.DataFrame({
+        "Código": rng.integers(100, 300, qtd).astype(str),
+        "Descrição Rubrica": descricoes[rng.integers(0, len(descricoes), qtd)],
+        "Valor": [formatar_centavos_brl(c) for c in centavos],
+        "Data": np.resize(np.asarray(datas), qtd),
+        "Página": np.sort(rng.integers(1, max(qtd // 20, 2), qtd)),
+        COL_CENTAVOS: pd.array(centavos, dtype="Int64")
+    })
+
+
+def descontos_de(df_info):
+    return df_info.rename(columns={"Descrição Rubrica": "DESCRIÇÃO", "Valor": "DESCONTOS"})[
+        ["Código", "DESCRIÇÃO", "DESCONTOS", "Data", COL_CENTAVOS]
+    ]
+
+
+def salvar_pdf_descontos_finais_iterrows(df_final, file_name, titulo_final, valor_recebido="0"):
+    """Implementação anterior (referência)."""
+    df_com_totais = valores_para_exibicao(
+        inserir_totais_na_coluna(df_final.copy(), "DESCONTOS", valor_recebido), "DESCONTOS"
+    )
+    pdf = FPDF(orientation='L', format='A4')
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 10, titulo_final, border=False, ln=True, align='C')
+    pdf.ln(10)
+    pdf.set_font("Arial", "B", 10)
+    headers = ["Código", "DESCRIÇÃO", "DESCONTOS", "Data"]
+    col_widths = {"Código": 25, "DESCRIÇÃO": 150, "DESCONTOS": 35, "Data": 40}
+    pdf.set_fill_color(200, 220, 255)
+    for h in headers:
+        pdf.cell(col_widths[h], 8, h, border=1, align='C', fill=True)
+    pdf.ln()
+    for _, row in df_com_totais.iterrows():
+        if row["DESCRIÇÃO"] in LINHAS_ESPECIAIS:
+            pdf.set_font("Arial", "B", 12)
+            pdf.set_text_color(255, 0, 0)
+        else:
+            pdf.set_font("Arial", "", 9)
+            pdf.set_text_color(0, 0, 0)
+        for h in headers:
+            pdf.cell(col_widths[h], 8, str(row[h]), border=1, align='C')
+        pdf.ln()
+    pdf.output(file_name)
+
+
+def medir(func, *args):
+    inicio = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - inicio
+
+
+def linhas_da_primeira_pagina(caminho):
+    with pdfplumber.open(caminho) as pdf:
+        return [l for l in pdf.pages[0].extract_text().splitlines() if l.split(" ")[0].isdigit()]
+
+
+if __name__ == "__main__":
+    qtd = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    qtd_ref = int(sys.argv[2]) if len(sys.argv) > 2 else min(qtd, 5000)
+    pasta = tempfile.mkdtemp()
+    titulo = "Descontos Finais (Cronológico) - NOME - 123.456.789-0"
+
+    df_info = gerar_informacoes(qtd)
+    t = medir(salvar_em_pdf_basico, df_info, os.path.join(pasta, "basico.pdf"), "NOME", "123.456.789-0")
+    print(f"salvar_em_pdf_basico: {qtd} linhas em {t:.3f}s")
+
+    df_final = descontos_de(df_info)
+    t = medir(salvar_pdf_descontos_finais, df_final, os.path.join(pasta, "final.pdf"), titulo, "1.000,50")
+    print(f"salvar_pdf_descontos_finais: {qtd} linhas em {t:.3f}s")
+
+    # Referência e conferência (descrições curtas, que cabem numa linha nas duas versões)
+    df_ref = df_final.head(qtd_ref)
+    df_ref = df_ref[df_ref["DESCRIÇÃO"].str.len() < 60]
+    t_ref = medir(salvar_pdf_descontos_finais_iterrows, df_ref, os.path.join(pasta, "ref.pdf"), titulo, "1.000,50")
+    t_novo = medir(salvar_pdf_descontos_finais, df_ref, os.path.join(pasta, "novo.pdf"), titulo, "1.000,50")
+    ref = linhas_da_primeira_pagina(os.path.join(pasta, "ref.pdf"))
+    novo = linhas_da_primeira_pagina(os.path.join(pasta, "novo.pdf"))
+    assert ref == novo, (ref[:3], novo[:3])
+    print(f"referência (iterrows): {len(df_ref)} linhas em {t_ref:.3f}s; atual: {t_novo:.3f}s "
+          f"({t_ref / t_novo:.0f}x), primeira página idêntica")
@@ -0,0 +1,154 @@
+"""
+Benchmark de ponta a ponta do pipeline com contracheques sintéticos (gerar_contracheque.py).
+
+Para cada tamanho (competências x rubricas por competência) gera o PDF, mede cada etapa
+(texto das páginas, segmentação, montagem das informações, pontuação no glossário, filtro,
+ordenação + resumo e relatórios PDF/DOCX/XLSX), confere a extração com o que foi gerado
+e compara os tempos com uma base gravada anteriormente.
+
+    python benchmarks/bench_pipeline.py                       # mede e compara com a base
+    python benchmarks/bench_pipeline.py --salvar-base         # grava a base desta máquina
+    python benchmarks/bench_pipeline.py --tamanhos 12x4,240x8 --limite 0.3
+
+Sai com código 1 se alguma etapa ficar mais de 'limite' (fração) acima da base
+(etapas abaixo de --minimo segundos na base são ignoradas, por serem dominadas por ruído).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import warnings
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from gerar_contracheque import gerar_contracheque
+from extracao import extrair_contracheque_em_lotes, juntar_lotes, montar_df_informacoes
+from glossario import GLOSSARIOS, ler_glossarios, IndiceGlossario, pontuar_descontos, filtrar_por_similaridade
+from relatorios import (
+    preparar_df_descontos,
+    ordenar_descontos_finais,
+    calcular_resumo,
+    pdf_descontos_finais_bytes,
+    df_to_docx_bytes,
+    xlsx_bytes
+)
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+TAMANHOS_PADRAO = "12x4,60x6,240x8"
+BASE_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "base_pipeline.json")
+LIMIAR_SIMILARIDADE = 85
+
+
+def medir_pipeline(pdf_path, glossary, esperado):
+    """Executa o pipeline uma vez e retorna {etapa: segundos}. Confere a extração com 'esperado'."""
+    tempos = {"texto_paginas": 0.0, "segmentacao": 0.0}
+
+    def lotes_contabilizados():
+        for lote in extrair_contracheque_em_lotes(pdf_path, workers=1):
+            tempos["texto_paginas"] += lote["tempo_texto"]
+            tempos["segmentacao"] += lote["tempo_analise"]
+            yield lote
+
+    def etapa(nome, func, *args, **kwargs):
+        inicio = time.perf_counter()
+        resultado = func(*args, **kwargs)
+        tempos[nome] = time.perf_counter() - inicio
+        return resultado
+
+    nome, nb, df_competencias, df_dados = juntar_lotes(lotes_contabilizados())
+    df_informacoes = etapa("montar_informacoes", montar_df_informacoes, df_dados, df_competencias)
+    assert len(df_competencias) == esperado["competencias"], (len(df_competencias), esperado)
+    assert len(df_informacoes) == esperado["linhas"], (len(df_informacoes), esperado)
+    assert int(df_informacoes["Centavos"].sum()) == esperado["centavos"]
+
+    df_descontos = preparar_df_descontos(df_informacoes)
+    df_pontuado = etapa("pontuacao_glossario", pontuar_descontos, df_descontos, glossary)
+    df_gloss = etapa("filtro_similaridade", filtrar_por_similaridade, df_pontuado, LIMIAR_SIMILARIDADE)
+    assert not df_gloss.empty
+
+    df_final = etapa("ordenacao", ordenar_descontos_finais, df_gloss)
+    resumo = etapa("resumo", calcular_resumo, df_final, "1.000,00")
+    titulo = f"Descontos Finais (Cronológico) - {nome} - {nb}"
+    etapa("relatorio_pdf", pdf_descontos_finais_bytes, df_final, titulo, "1.000,00", resumo)
+    etapa("relatorio_docx", df_to_docx_bytes, df_final, titulo, True, valor_recebido="1.000,00", resumo=resumo)
+    etapa("relatorio_xlsx", xlsx_bytes, [{"nome": nome, "nb": nb, "df_informacoes": df_informacoes,
+                                          "df_final": df_final, "resumo": resumo}])
+    return tempos
+
+
+def medir_tamanho(pasta, competencias, rubricas, glossary, repeticoes):
+    """Menor tempo de cada etapa em 'repeticoes' execuções (o mínimo é o menos sujeito a ruído)."""
+    pdf_path = os.path.join(pasta, f"sintetico_{competencias}x{rubricas}.pdf")
+    esperado = gerar_contracheque(pdf_path, competencias=competencias, rubricas=rubricas)
+    medicoes = [medir_pipeline(pdf_path, glossary, esperado) for _ in range(repeticoes)]
+    tempos = {etapa: min(m[etapa] for m in medicoes) for etapa in medicoes[0]}
+    tempos["total"] = sum(tempos.values())
+    return esperado, tempos
+
+
+def comparar_com_base(resultados, base, limite, minimo):
+    """Lista de regressões (tamanho, etapa, base, atual) acima de 'limite' em relação à base."""
+    regressoes = []
+    for tamanho, tempos in resultados.items():
+        for etapa, atual in tempos.items():
+            anterior = base.get(tamanho, {}).get(etapa)
+            if anterior is None or anterior < minimo:
+                continue
+            if atual > anterior * (1 + limite):
+                regressoes.append((tamanho, etapa, anterior, atual))
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de ponta a ponta com contracheques sintéticos.")
+    parser.add_argument("--tamanhos", default=TAMANHOS_PADRAO,
+                        help=f"competênciasxrubricas separados por vírgula (padrão: {TAMANHOS_PADRAO})")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Execuções por tamanho (padrão: 3)")
+    parser.add_argument("--base", default=BASE_PADRAO, help="Arquivo JSON com os tempos de referência")
+    parser.add_argument("--salvar-base", action="store_true", help="Grava os tempos medidos como nova base")
+    parser.add_argument("--limite", type=float, default=0.25,
+                        help="Aumento máximo tolerado em relação à base (padrão: 0.25 = 25%%)")
+    parser.add_argument("--minimo", type=float, default=0.02,
+                        help="Etapas abaixo deste tempo (s) na base não são comparadas (padrão: 0.02)")
+    args = parser.parse_args()
+
+    glossary = IndiceGlossario(ler_glossarios({c: os.path.join(RAIZ, p) for c, p in GLOSSARIOS.items()}))
+    pasta = tempfile.mkdtemp()
+    resultados = {}
+    for tamanho in args.tamanhos.split(","):
+        competencias, rubricas = (int(x) for x in tamanho.lower().split("x"))
+        esperado, tempos = medir_tamanho(pasta, competencias, rubricas, glossary, args.repeticoes)
+        resultados[tamanho] = tempos
+        print(f"{tamanho}: {esperado['paginas']} página(s), {esperado['linhas']} rubricas, "
+              f"{tempos['total']:.3f}s no total")
+
+    tabela = pd.DataFrame(resultados).round(4)
+    print(tabela.to_string())
+
+    if args.salvar_base:
+        with open(args.base, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=1)
+        print(f"Base gravada em {args.base}.")
+        return 0
+
+    if not os.path.exists(args.base):
+        print(f"Sem base em {args.base}; use --salvar-base para gravá-la.")
+        return 0
+    with open(args.base, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    regressoes = comparar_com_base(resultados, base, args.limite, args.minimo)
+    for tamanho, etapa, anterior, atual in regressoes:
+        print(f"REGRESSÃO {tamanho} {etapa}: {anterior:.4f}s -> {atual:.4f}s (+{atual / anterior - 1:.0%})")
+    if regressoes:
+        return 1
+    print(f"Nenhuma etapa acima de {args.limite:.0%} da base.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
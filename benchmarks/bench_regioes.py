@@ -0,0 +1,58 @@
+"""
+Benchmark da extração por regiões (modelo da página + coordenadas das palavras) contra a
+extração pelo texto completo das páginas (extract_text + linha.split()).
+
+Usa contracheques sintéticos (gerar_contracheque.py): confere que as duas leituras produzem
+as mesmas informações quando toda rubrica tem valor e mostra a diferença quando há rubricas
+sem valor com descrição terminada em número (o texto completo lê o número como valor).
+
+    python benchmarks/bench_regioes.py [qtd_competencias] [rubricas_por_competencia]
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from gerar_contracheque import gerar_contracheque
+from extracao import extrair_contracheque_em_lotes, juntar_lotes, montar_df_informacoes, MIN_PAGINAS_PARALELO
+
+
+def extrair(pdf_path, por_regioes, workers=1):
+    inicio = time.perf_counter()
+    nome, nb, df_competencias, df_dados = juntar_lotes(
+        extrair_contracheque_em_lotes(pdf_path, workers=workers, por_regioes=por_regioes)
+    )
+    df_informacoes = montar_df_informacoes(df_dados, df_competencias).reset_index(drop=True)
+    return time.perf_counter() - inicio, (nome, nb), df_informacoes
+
+
+if __name__ == "__main__":
+    competencias = int(sys.argv[1]) if len(sys.argv) > 1 else 120
+    rubricas = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    pasta = tempfile.mkdtemp()
+
+    pdf_path = os.path.join(pasta, "sintetico.pdf")
+    esperado = gerar_contracheque(pdf_path, competencias=competencias, rubricas=rubricas)
+    t_texto, cab_texto, df_texto = extrair(pdf_path, por_regioes=False)
+    t_regioes, cab_regioes, df_regioes = extrair(pdf_path, por_regioes=True)
+    assert cab_texto == cab_regioes and df_texto.equals(df_regioes)
+    assert int(df_regioes["Centavos"].sum()) == esperado["centavos"]
+    print(f"{esperado['paginas']} páginas, {len(df_regioes)} rubricas: texto completo {t_texto:.3f}s, "
+          f"regiões {t_regioes:.3f}s; informações idênticas")
+
+    if esperado["paginas"] >= MIN_PAGINAS_PARALELO:
+        t_paralelo, _, df_paralelo = extrair(pdf_path, por_regioes=True, workers=2)
+        assert df_paralelo.equals(df_regioes)
+        print(f"regiões em 2 processos: {t_paralelo:.3f}s; informações idênticas")
+
+    pdf_path = os.path.join(pasta, "sintetico_sem_valor.pdf")
+    esperado = gerar_contracheque(pdf_path, competencias=competencias, rubricas=rubricas, sem_valor=1)
+    _, _, df_texto = extrair(pdf_path, por_regioes=False)
+    _, _, df_regioes = extrair(pdf_path, por_regioes=True)
+    assert int(df_regioes["Centavos"].sum()) == esperado["centavos"]
+    sem_valor = df_regioes["Descrição Rubrica"].astype(str).str.contains("SUSPENSO")
+    print(f"rubricas sem valor: regiões {int((df_regioes.loc[sem_valor, 'Valor'] == '').sum())} de "
+          f"{int(sem_valor.sum())} com valor vazio; texto completo somou "
+          f"{int(df_texto['Centavos'].sum()) - esperado['centavos']} centavos a mais")
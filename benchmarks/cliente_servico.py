@@ -0,0 +1,142 @@
+"""
+Cliente de teste do serviço HTTP (servico.py) com contracheques sintéticos.
+
+Sem --url, sobe o serviço neste processo em uma porta livre. Envia os PDFs em requisições
+simultâneas (metade em stream NDJSON, o mesmo PDF mais de uma vez) e confere, para cada
+resposta, nome, NB, quantidade de descontos e totais contra o processamento em lote
+(processar_lote.processar_arquivo) do mesmo arquivo. Mede requisições/min.
+
+    python benchmarks/cliente_servico.py [--url http://127.0.0.1:8600] [--arquivos 3]
+        [--requisicoes 8] [--competencias 60] [--rubricas 6] [--workers 2]
+
+Sai com código 1 se alguma resposta divergir ou se o lote não achar nenhum desconto
+(glossários ausentes tornariam a conferência trivial).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import urllib.request
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from gerar_contracheque import gerar_contracheque
+from extracao import hash_conteudo
+from glossario import IndiceGlossario, ler_glossarios
+from processar_lote import processar_arquivo
+from servico import criar_servidor, GLOSSARIOS_SERVICO
+
+VALOR_RECEBIDO = "1.000,00"
+SIMILARIDADE = 0.85
+
+
+def analisar_via_http(url, pdf_path, stream, sessao):
+    """Envia o PDF a /analisar; retorna (resultado, páginas recebidas em stream)."""
+    parametros = {"similaridade": SIMILARIDADE, "valor_recebido": VALOR_RECEBIDO, "relatorios": "pdf,docx"}
+    if stream:
+        parametros["stream"] = 1
+    with open(pdf_path, "rb") as f:
+        requisicao = urllib.request.Request(
+            f"{url}/analisar?{urlencode(parametros)}", data=f.read(), method="POST",
+            headers={"Content-Type": "application/pdf", "X-Sessao": sessao}
+        )
+    with urllib.request.urlopen(requisicao, timeout=600) as resposta:
+        if not stream:
+            return json.load(resposta), 0
+        paginas, descontos, resultado = 0, [], None
+        for linha in resposta:
+            evento = json.loads(linha)
+            if evento["evento"] == "pagina":
+                paginas += 1
+            elif evento["evento"] == "desconto":
+                descontos.append(evento)
+            elif evento["evento"] == "resultado":
+                resultado = {**evento, "descontos": descontos}
+            elif evento["evento"] == "erro":
+                raise RuntimeError(evento["erro"])
+        return resultado, paginas
+
+
+def conferir(resultado, esperado):
+    """Lista das divergências entre a resposta do serviço e o resumo do lote."""
+    divergencias = []
+    for campo in ("nome", "nb", "status"):
+        if resultado[campo] != esperado[campo]:
+            divergencias.append(f"{campo}: {resultado[campo]!r} != {esperado[campo]!r}")
+    if len(resultado["descontos"]) != esperado["qtd_descontos"]:
+        divergencias.append(f"descontos: {len(resultado['descontos'])} != {esperado['qtd_descontos']}")
+    for campo in ("valor_total", "indebito", "indebito_dobro", "nao_prescrito"):
+        if abs(resultado["totais"][campo] - esperado[campo]) > 0.005:
+            divergencias.append(f"{campo}: {resultado['totais'][campo]} != {esperado[campo]}")
+    if esperado["status"] == "ok" and set(resultado["relatorios"]) != {"pdf", "docx"}:
+        divergencias.append(f"relatórios: {sorted(resultado['relatorios'])}")
+    return divergencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cliente de teste do serviço HTTP de análise.")
+    parser.add_argument("--url", default=None, help="Serviço já em execução (padrão: sobe um neste processo)")
+    parser.add_argument("--arquivos", type=int, default=3, help="Contracheques sintéticos diferentes")
+    parser.add_argument("--requisicoes", type=int, default=8, help="Requisições enviadas ao mesmo tempo")
+    parser.add_argument("--competencias", type=int, default=60)
+    parser.add_argument("--rubricas", type=int, default=6)
+    parser.add_argument("--workers", type=int, default=2, help="Vagas do serviço local")
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp()
+    arquivos = []
+    for i in range(args.arquivos):
+        pdf_path = os.path.join(pasta, f"sintetico_{i}.pdf")
+        gerar_contracheque(pdf_path, competencias=args.competencias, rubricas=args.rubricas + i, seed=i,
+                           linhas_inteiras=bool(i % 2))
+        arquivos.append(pdf_path)
+
+    glossary = IndiceGlossario(ler_glossarios(GLOSSARIOS_SERVICO))
+    esperados = {}
+    for pdf_path in arquivos:
+        with open(pdf_path, "rb") as f:
+            sha256 = hash_conteudo(f.read())
+        esperados[pdf_path] = processar_arquivo(pdf_path, sha256, pasta, glossary, int(SIMILARIDADE * 100),
+                                                VALOR_RECEBIDO, cache_rubricas_path="", casos_path="")
+        if not esperados[pdf_path]["qtd_descontos"]:
+            print(f"{os.path.basename(pdf_path)}: o lote não achou nenhum desconto; confira os glossários")
+            return 1
+
+    servidor = None
+    url = args.url
+    if url is None:
+        servidor = criar_servidor("127.0.0.1", 0, args.workers, cache_rubricas_path="")
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{servidor.server_address[1]}"
+
+    envios = [(arquivos[i % len(arquivos)], i % 2 == 1, f"cliente{i % 3}") for i in range(args.requisicoes)]
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(envios)) as executor:
+        respostas = list(executor.map(lambda envio: analisar_via_http(url, *envio), envios))
+    decorrido = time.perf_counter() - inicio
+
+    ok = True
+    for (pdf_path, stream, sessao), (resultado, paginas) in zip(envios, respostas):
+        divergencias = conferir(resultado, esperados[pdf_path])
+        ok = ok and not divergencias
+        modo = f"stream, {paginas} página(s)" if stream else "json"
+        print(f"{os.path.basename(pdf_path)} ({sessao}, {modo}): {len(resultado['descontos'])} desconto(s), "
+              f"indébito {resultado['totais']['indebito']:.2f} - "
+              f"{'ok' if not divergencias else 'DIFERENTE: ' + '; '.join(divergencias)}")
+    with urllib.request.urlopen(f"{url}/saude", timeout=30) as resposta:
+        saude = json.load(resposta)
+    print(f"{len(envios)} requisição(ões) em {decorrido:.1f}s ({len(envios) / decorrido * 60:.1f}/min); "
+          f"agendador: {saude['concluidas']} tarefa(s) concluída(s), {saude['anexadas']} anexada(s)")
+    if servidor is not None:
+        servidor.shutdown()
+        servidor.server_close()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
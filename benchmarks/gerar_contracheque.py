@@ -0,0 +1,139 @@
+"""
+Gerador de históricos de créditos do INSS sintéticos (PDF, reportlab) para testes e benchmarks.
+
+Reproduz o que os extratores esperam: Nome e NB na primeira página, a linha do DIP,
+e para cada competência o cabeçalho "Competência / Período / Situação" seguido do bloco
+RUBRICA / DESCRIÇÃO / VALOR. Beneficiário, NB e valores são fictícios.
+
+    python benchmarks/gerar_contracheque.py saida.pdf [qtd_competencias] [rubricas_por_competencia]
+"""
+import os
+import sys
+import random
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+NOME_FICTICIO = "JOAO DA SILVA SINTETICO"
+NB_FICTICIO = "123.456.789-0"
+
+# Rubricas que o glossário reconhece (Cartão/RMC, Tarifas/Seguros) e rubricas comuns
+RUBRICAS_DESCONTO = [
+    ("217", "EMPRESTIMO BANCO BMG"),
+    ("254", "BMG CARTAO"),
+    ("268", "CONSIGNACAO - CARTAO"),
+    ("217", "EMPRESTIMO SOBRE A RMC"),
+    ("254", "PAN CARTAO"),
+    ("254", "DAYCOVAL CARTAO"),
+    ("303", "SABEMI SEGUROS"),
+    ("303", "CHUBB"),
+    ("303", "ASPECIR"),
+    ("216", "CONSIGNACAO EMPRESTIMO BANCARIO"),
+    ("201", "IMPOSTO DE RENDA RETIDO NA FONTE"),
+    ("203", "CONTRIBUICAO SINDICATO"),
+]
+RUBRICA_MR = ("101", "VALOR TOTAL DE MR DO PERIODO")
+
+# Layout (pontos): margens, altura da linha e colunas da tabela de rubricas
+MARGEM_X = 40
+MARGEM_TOPO = 50
+MARGEM_BASE = 60
+ALTURA_LINHA = 13
+COLUNAS = {"codigo": MARGEM_X, "descricao": MARGEM_X + 60, "valor": 470}
+
+
+def formatar_brl(centavos):
+    """12345 -> "123,45"; 123456789 -> "1.234.567,89"."""
+    reais, cent = divmod(centavos, 100)
+    return f"{reais:,}".replace(",", ".") + f",{cent:02d}"
+
+
+def rubricas_da_competencia(rng, qtd, indice):
+    """Rubricas de uma competência: a MR e 'qtd' descontos (variantes com contrato além da lista)."""
+    itens = []
+    for k in range(qtd):
+        codigo, descricao = RUBRICAS_DESCONTO[k % len(RUBRICAS_DESCONTO)]
+        if k >= len(RUBRICAS_DESCONTO):
+            descricao = f"{descricao} CONTRATO {k:04d}"
+        itens.append((codigo, descricao, rng.randint(1_000, 60_000)))
+    rng.shuffle(itens)
+    return [(RUBRICA_MR[0], RUBRICA_MR[1], rng.randint(141_200, 400_000) + indice)] + itens
+
+
+def gerar_contracheque(caminho, competencias=24, rubricas=4, ano_inicial=2018, seed=0,
+                       nome=NOME_FICTICIO, nb=NB_FICTICIO, sem_valor=0, linhas_inteiras=False):
+    """
+    Grava o PDF em 'caminho' com 'competencias' meses consecutivos a partir de 01/ano_inicial e
+    'rubricas' descontos por competência (além da MR). 'sem_valor' acrescenta, por competência,
+    rubricas com a coluna de valor vazia e descrição terminada em número ("... CONTRATO 0001").
+    Com 'linhas_inteiras', cada linha da tabela é escrita de uma vez (texto único, colunas
+    separadas por espaço), como nos PDFs cuja camada de texto já vem em linhas.
+    Retorna o que a extração deve encontrar: {"paginas", "competencias", "linhas", "centavos"}
+    (linhas = rubricas, inclusive a MR e as sem valor).
+    """
+    rng = random.Random(seed)
+    _, altura = A4
+    pdf = canvas.Canvas(caminho, pagesize=A4)
+    esperado = {"paginas": 1, "competencias": competencias, "linhas": 0, "centavos": 0}
+    y = altura - MARGEM_TOPO
+
+    def garantir_espaco(qtd_linhas):
+        """Abre nova página se as próximas 'qtd_linhas' não couberem na atual."""
+        nonlocal y
+        if y - (qtd_linhas - 1) * ALTURA_LINHA < MARGEM_BASE:
+            pdf.showPage()
+            esperado["paginas"] += 1
+            y = altura - MARGEM_TOPO
+
+    def nova_linha(blocos):
+        """Escreve [(coluna, texto, negrito)] na linha atual, abrindo nova página quando necessário."""
+        nonlocal y
+        garantir_espaco(1)
+        if linhas_inteiras:
+            blocos = [(blocos[0][0], " ".join(texto for _, texto, _ in blocos), blocos[0][2])]
+        for coluna, texto, negrito in blocos:
+            pdf.setFont("Helvetica-Bold" if negrito else "Helvetica", 9)
+            pdf.drawString(coluna, y, texto)
+        y -= ALTURA_LINHA
+
+    nova_linha([(MARGEM_X, "INSTITUTO NACIONAL DO SEGURO SOCIAL - HISTÓRICO DE CRÉDITOS", True)])
+    nova_linha([(MARGEM_X, f"NB: {nb}", False)])
+    nova_linha([(MARGEM_X, f"Nome: {nome}", False)])
+    nova_linha([(MARGEM_X, "Data de Nascimento: 01/01/1950", False)])
+    nova_linha([(MARGEM_X, "Data de Início do Pagamento (DIP): 01/01/2015 MR: R$ 1.412,00", False)])
+
+    for indice in range(competencias):
+        mes, ano = indice % 12 + 1, ano_inicial + indice // 12
+        # Cabeçalho da competência, período e cabeçalho RUBRICA ficam na mesma página
+        garantir_espaco(4)
+        nova_linha([(MARGEM_X, "Competência", True), (COLUNAS["descricao"], "Período", True),
+                    (COLUNAS["valor"], "Situação", True)])
+        nova_linha([(MARGEM_X, f"{mes:02d}/{ano}", False),
+                    (COLUNAS["descricao"], f"01/{mes:02d}/{ano} a 28/{mes:02d}/{ano}", False),
+                    (COLUNAS["valor"], "Pago", False)])
+        nova_linha([(COLUNAS["codigo"], "RUBRICA", True), (COLUNAS["descricao"], "DESCRIÇÃO", True),
+                    (COLUNAS["valor"], "VALOR", True)])
+        for codigo, descricao, centavos in rubricas_da_competencia(rng, rubricas, indice):
+            nova_linha([(COLUNAS["codigo"], codigo, False), (COLUNAS["descricao"], descricao, False),
+                        (COLUNAS["valor"], f"R$ {formatar_brl(centavos)}", False)])
+            esperado["linhas"] += 1
+            esperado["centavos"] += centavos
+        for k in range(sem_valor):
+            nova_linha([(COLUNAS["codigo"], "299", False),
+                        (COLUNAS["descricao"], f"EMPRESTIMO SUSPENSO CONTRATO {k + 1:04d}", False)])
+            esperado["linhas"] += 1
+
+    pdf.save()
+    return esperado
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        raise SystemExit(__doc__)
+    saida = sys.argv[1]
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    resultado = gerar_contracheque(
+        saida,
+        competencias=int(sys.argv[2]) if len(sys.argv) > 2 else 24,
+        rubricas=int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    )
+    print(f"{saida}: {resultado}")
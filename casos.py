@@ -0,0 +1,122 @@
+"""
+Armazenamento local dos casos (extrações já processadas) em Parquet.
+
+Cada caso fica em CASOS_PATH/<NB>/<SHA-256 do PDF>/ com:
+    dados.parquet         linhas extraídas (montar_df_dados)
+    competencias.parquet  competências e datas (montar_df_competencias)
+    selecionados.parquet  descontos selecionados (opcional)
+    caso.json             nome, NB, hash, valor recebido e data da última gravação
+"""
+import os
+import re
+import json
+import threading
+from datetime import datetime
+import pandas as pd
+
+# Diretório dos casos salvos (compartilhado pelas sessões e pelo processamento em lote)
+CASOS_PATH = os.environ.get("CASOS_PATH", "casos")
+
+ARQ_DADOS = "dados.parquet"
+ARQ_COMPETENCIAS = "competencias.parquet"
+ARQ_SELECIONADOS = "selecionados.parquet"
+ARQ_META = "caso.json"
+
+
+def _nome_pasta(nb):
+    """NB como nome de diretório seguro ("123.456.789-0" -> "123.456.789-0"; vazio -> "ND")."""
+    return re.sub(r"[^0-9A-Za-z.\-]", "_", str(nb or "").strip()) or "ND"
+
+
+def _gravar_parquet(df, caminho):
+    """Grava o DataFrame de forma atômica (arquivo temporário + rename)."""
+    df.to_parquet(caminho + ".tmp", index=False)
+    os.replace(caminho + ".tmp", caminho)
+
+
+class ArmazemCasos:
+    """
+    Casos indexados por NB e hash do PDF. Gravar um caso já existente substitui seus arquivos;
+    a seleção de descontos e o valor recebido podem ser atualizados separadamente.
+    """
+
+    def __init__(self, path=CASOS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def _pasta(self, nb, sha256):
+        return os.path.join(self.path, _nome_pasta(nb), sha256)
+
+    def existe(self, nb, sha256):
+        return os.path.exists(os.path.join(self._pasta(nb, sha256), ARQ_META))
+
+    def _gravar_meta(self, pasta, meta):
+        meta["salvo_em"] = datetime.now().isoformat(timespec="seconds")
+        caminho = os.path.join(pasta, ARQ_META)
+        with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=1)
+        os.replace(caminho + ".tmp", caminho)
+
+    def _ler_meta(self, pasta):
+        with open(os.path.join(pasta, ARQ_META), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def salvar(self, sha256, nome, nb, df_competencias, df_dados, df_selecionados=None, valor_recebido=None):
+        """Grava (ou substitui) o caso com a extração e, se houver, a seleção e o valor recebido."""
+        pasta = self._pasta(nb, sha256)
+        with self._lock:
+            os.makedirs(pasta, exist_ok=True)
+            _gravar_parquet(df_dados, os.path.join(pasta, ARQ_DADOS))
+            _gravar_parquet(df_competencias, os.path.join(pasta, ARQ_COMPETENCIAS))
+            if df_selecionados is not None:
+                _gravar_parquet(df_selecionados, os.path.join(pasta, ARQ_SELECIONADOS))
+            self._gravar_meta(pasta, {
+                "sha256": sha256,
+                "nome": nome,
+                "nb": nb,
+                "valor_recebido": valor_recebido,
+                "linhas": len(df_dados)
+            })
+
+    def atualizar_selecao(self, nb, sha256, df_selecionados=None, valor_recebido=None):
+        """Atualiza a seleção de descontos e/ou o valor recebido de um caso existente."""
+        pasta = self._pasta(nb, sha256)
+        with self._lock:
+            if not os.path.exists(os.path.join(pasta, ARQ_META)):
+                return False
+            meta = self._ler_meta(pasta)
+            if df_selecionados is not None:
+                _gravar_parquet(df_selecionados, os.path.join(pasta, ARQ_SELECIONADOS))
+            if valor_recebido is not None:
+                meta["valor_recebido"] = valor_recebido
+            self._gravar_meta(pasta, meta)
+        return True
+
+    def carregar(self, nb, sha256):
+        """
+        Retorna o caso como dicionário (nome, nb, sha256, valor_recebido, df_competencias,
+        df_dados, df_selecionados) ou None se não existir.
+        """
+        pasta = self._pasta(nb, sha256)
+        if not os.path.exists(os.path.join(pasta, ARQ_META)):
+            return None
+        caso = self._ler_meta(pasta)
+        caso["df_dados"] = pd.read_parquet(os.path.join(pasta, ARQ_DADOS))
+        caso["df_competencias"] = pd.read_parquet(os.path.join(pasta, ARQ_COMPETENCIAS))
+        caminho_sel = os.path.join(pasta, ARQ_SELECIONADOS)
+        caso["df_selecionados"] = pd.read_parquet(caminho_sel) if os.path.exists(caminho_sel) else None
+        return caso
+
+    def listar(self):
+        """Metadados (caso.json) de todos os casos, do mais recente para o mais antigo."""
+        casos = []
+        if not os.path.isdir(self.path):
+            return casos
+        for pasta_nb in os.scandir(self.path):
+            if not pasta_nb.is_dir():
+                continue
+            for pasta in os.scandir(pasta_nb.path):
+                if pasta.is_dir() and os.path.exists(os.path.join(pasta.path, ARQ_META)):
+                    casos.append(self._ler_meta(pasta.path))
+        return sorted(casos, key=lambda c: c.get("salvo_em", ""), reverse=True)
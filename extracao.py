@@ -0,0 +1,745 @@
+import os
+import re
+import time
+import hashlib
+import multiprocessing
+import pdfplumber
+import numpy as np
+import pandas as pd
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from leitores import LeitorPyPDF2, LeitorPdfplumber
+from ocr import FilaOCR, OCR_WORKERS, ocr_disponivel
+
+# Abaixo deste número de páginas o custo de iniciar os processos não compensa
+MIN_PAGINAS_PARALELO = 16
+# Quantidade de blocos de páginas por processo (equilibra a carga entre os núcleos)
+BLOCOS_POR_PROCESSO = 4
+# Leitura pelas regiões do modelo da página (registros_por_modelo) nas páginas que vão para o
+# pdfplumber; desligada por padrão: nos benchmarks (bench_regioes) ainda é mais lenta que o texto
+POR_REGIOES_PADRAO = os.environ.get("LEITURA_POR_REGIOES", "0") == "1"
+
+###############################################################################
+# PADRÕES DE EXTRAÇÃO
+###############################################################################
+padrao_NB = re.compile(r"NB:\s*([\d\.\-]+)")
+padrao_nome = re.compile(r"Nome:\s*([A-Z\s]+)")
+padrao_competencia = re.compile(r"\b(0[1-9]|1[0-2])\/(\d{4})\b")
+padrao_competencia_pagina = re.compile(r"Competência\s*(\d{2}/\d{4})")
+padrao_DIP = re.compile(r"Data de Início do Pagamento \(DIP\): \d{2}/\d{2}/\d{4} MR: R\$ [\d.,]+")
+padrao_valor = re.compile(r"[\d.,]+")
+
+# Coluna com o valor monetário em centavos (inteiro exato), preenchida na extração
+COL_CENTAVOS = "Centavos"
+
+# Colunas de texto com poucos valores distintos guardadas como categorias no DataFrame de informações
+COLUNAS_CATEGORICAS = ["Código", "Descrição Rubrica", "Data"]
+
+
+def hash_conteudo(dados: bytes) -> str:
+    """Retorna o SHA-256 (hex) do conteúdo enviado."""
+    return hashlib.sha256(dados).hexdigest()
+
+
+###############################################################################
+# VALORES MONETÁRIOS (CENTAVOS)
+###############################################################################
+def valor_para_centavos(texto):
+    """
+    Converte um valor monetário em centavos (int), aceitando "1.234,56", "1,234.56",
+    "R$ 1234,5" e "1234". O último separador seguido de 1 ou 2 dígitos é o decimal.
+    Texto que não é valor (ex.: "Valor") retorna None.
+    """
+    t = str(texto).replace("R$", "").replace(" ", "").strip()
+    negativo = t.startswith("-")
+    t = t.lstrip("-")
+    if not t or not t[0].isdigit() or not padrao_valor.fullmatch(t):
+        return None
+    pos = max(t.rfind(","), t.rfind("."))
+    if pos >= 0 and len(t) - pos - 1 in (1, 2):
+        inteiro, fracao = t[:pos], t[pos + 1:].ljust(2, "0")
+    else:
+        inteiro, fracao = t, "00"
+    inteiro = inteiro.replace(",", "").replace(".", "")
+    centavos = int(inteiro or "0") * 100 + int(fracao)
+    return -centavos if negativo else centavos
+
+
+def centavos_da_serie(serie):
+    """Converte uma coluna de valores (texto) em centavos (Int64); cada valor distinto é lido uma vez."""
+    mapa = {v: valor_para_centavos(v) for v in pd.unique(serie)}
+    return pd.array(serie.map(mapa), dtype="Int64")
+
+
+###############################################################################
+# FUNÇÕES POR PÁGINA (COMPARTILHADAS PELOS EXTRATORES)
+###############################################################################
+def nome_e_nb_do_texto(text):
+    """
+    Extrai Nome e NB do texto da primeira página.
+    Caso não encontre, retorna "N/D".
+    """
+    nome = "N/D"
+    nb = "N/D"
+    nb_match = padrao_NB.search(text)
+    if nb_match:
+        nb = nb_match.group(1).strip()
+    nome_match = padrao_nome.search(text)
+    if nome_match:
+        nome = nome_match.group(1).strip().split("\n")[0]
+    return nome, nb
+
+
+def competencias_das_linhas(linhas):
+    """
+    Retorna as competências (MM/AAAA) encontradas até 3 linhas abaixo
+    de uma linha com "Competência" e "Período".
+    """
+    competencias = []
+    for i, linha in enumerate(linhas):
+        if "Competência" in linha and "Período" in linha:
+            for j in range(1, 4):
+                if i + j < len(linhas):
+                    matches = padrao_competencia.findall(linhas[i + j])
+                    for (mes, ano) in matches:
+                        competencias.append(f"{mes}/{ano}")
+    return competencias
+
+
+def filtrar_linhas_apos_dip(linhas, iniciar_extracao):
+    """
+    Descarta as linhas anteriores à linha do DIP e as linhas com "Data de Nascimento".
+    Retorna (linhas_filtradas, iniciar_extracao) para continuar na próxima página.
+    """
+    linhas_filtradas = []
+    for linha in linhas:
+        if not iniciar_extracao:
+            if padrao_DIP.match(linha):
+                iniciar_extracao = True
+            continue
+
+        if "Data de Nascimento" in linha:
+            continue
+
+        linhas_filtradas.append(linha)
+    return linhas_filtradas, iniciar_extracao
+
+
+def registros_das_linhas(linhas_filtradas, page_number):
+    """
+    Converte as linhas filtradas de uma página em registros
+    (Código, Descrição Rubrica, Valor, Data, Página).
+    """
+    registros = []
+    competencia_match = padrao_competencia_pagina.search("\n".join(linhas_filtradas))
+    competencia = competencia_match.group(1) if competencia_match else "N/A"
+
+    for linha in linhas_filtradas:
+        if "RUBRICA" in linha.upper():
+            registros.append({
+                "Código": "Rubrica",
+                "Descrição Rubrica": "Descrição Rubrica",
+                "Valor": "Valor",
+                "Data": competencia,
+                "Página": page_number
+            })
+            continue
+
+        parts = linha.split()
+        if len(parts) >= 3 and parts[0].isdigit():
+            codigo = parts[0]
+            descricao = " ".join(parts[1:-1]).replace("R$", "").strip()
+            valor = parts[-1]
+            registros.append({
+                "Código": codigo,
+                "Descrição Rubrica": descricao,
+                "Valor": valor,
+                "Data": competencia,
+                "Página": page_number
+            })
+    return registros
+
+
+def montar_df_competencias(competencias_extraidas):
+    """Ordena as competências únicas e nomeia cada uma como "Competência N"."""
+    competencias_unicas = sorted(set(competencias_extraidas), key=lambda x: datetime.strptime(x, "%m/%Y"))
+    df_competencias_filtradas = pd.DataFrame(competencias_unicas, columns=["Data Competência"])
+    df_competencias_filtradas["Nome Competência"] = [f"Competência {i + 1}" for i in
+                                                     range(len(df_competencias_filtradas))]
+    return df_competencias_filtradas
+
+
+def montar_df_dados(dados_extracao):
+    """
+    Monta o DataFrame de rubricas com a coluna 'Intervalos' ("Competência X")
+    e a coluna 'Centavos' (valor em centavos, inteiro; vazio nos cabeçalhos).
+    O número do segmento é a contagem acumulada das linhas de cabeçalho "Rubrica".
+    """
+    df = pd.DataFrame(dados_extracao)
+    if df.empty:
+        df["Intervalos"] = []
+        df[COL_CENTAVOS] = pd.array([], dtype="Int64")
+        return df
+
+    e_cabecalho = (df["Código"] == "Rubrica").to_numpy()
+    segmento = np.cumsum(e_cabecalho)
+    intervalos = np.array([""] + [f"Competência {i}" for i in range(1, segmento[-1] + 1)], dtype=object)
+    df["Intervalos"] = np.where(e_cabecalho, "", intervalos[segmento])
+    df[COL_CENTAVOS] = centavos_da_serie(df["Valor"])
+    return df
+
+
+###############################################################################
+# LOTES POR PÁGINA (JUNÇÃO ORDENADA)
+###############################################################################
+# Origem de cada página lida (chave "origem" dos lotes)
+ORIGEM_RAPIDA = LeitorPyPDF2.nome
+ORIGEM_TEXTO = LeitorPdfplumber.nome
+ORIGEM_REGIOES = "regioes"
+ORIGEM_OCR = "ocr"
+# Página sem camada de texto (escaneada) que não passou pelo OCR
+ORIGEM_SEM_TEXTO = "sem_texto"
+
+
+def analisar_texto_pagina(text, page_number, iniciar_extracao):
+    """
+    Competências e registros do texto de uma página.
+    Retorna (competencias, registros, iniciar_extracao) para continuar na próxima página.
+    """
+    if not text:
+        return [], [], iniciar_extracao
+    linhas = text.split("\n")
+    competencias = competencias_das_linhas(linhas)
+    linhas_filtradas, iniciar_extracao = filtrar_linhas_apos_dip(linhas, iniciar_extracao)
+    return competencias, registros_das_linhas(linhas_filtradas, page_number), iniciar_extracao
+
+
+def lotes_por_origem(paginas, total_paginas):
+    """
+    Fase de junção (sequencial e barata): recebe as páginas lidas em ordem, como
+    (page_number, origem, dados, tempo_texto), e aplica Nome/NB, competências, o corte
+    do DIP e a segmentação por rubrica. 'dados' é o texto da página, ou, para ORIGEM_REGIOES,
+    (competencias, registros, modelo, tempo_analise) já segmentados pelo modelo.
+    Gera um lote (dict) por página com as chaves:
+      pagina, total_paginas, nome, nb, competencias, registros, origem,
+      tempo_texto (segundos obtendo o texto da página) e tempo_analise (segundos na segmentação).
+    """
+    nome, nb = "N/D", "N/D"
+    iniciar_extracao = False
+    for page_number, origem, dados, tempo_texto in paginas:
+        lido = time.perf_counter()
+        tempo_modelo = 0.0
+        if origem == ORIGEM_REGIOES:
+            competencias, registros, modelo, tempo_modelo = dados
+            if page_number == 1:
+                nome, nb = modelo.nome, modelo.nb
+            iniciar_extracao = iniciar_extracao or page_number >= modelo.pagina_dip
+        else:
+            if page_number == 1:
+                nome, nb = nome_e_nb_do_texto(dados or "")
+            competencias, registros, iniciar_extracao = analisar_texto_pagina(dados, page_number, iniciar_extracao)
+        yield {
+            "pagina": page_number,
+            "total_paginas": total_paginas,
+            "nome": nome,
+            "nb": nb,
+            "competencias": competencias,
+            "registros": registros,
+            "origem": origem,
+            "tempo_texto": tempo_texto,
+            "tempo_analise": tempo_modelo + time.perf_counter() - lido
+        }
+
+
+def paginas_de_textos(textos_paginas, origem=LeitorPdfplumber.nome):
+    """
+    (page_number, text) -> (page_number, origem, text, tempo_texto) para lotes_por_origem.
+    Páginas sem texto saem com ORIGEM_SEM_TEXTO (candidatas ao OCR). O tempo gasto pelo
+    consumidor entre uma página e outra não entra no tempo_texto da seguinte.
+    """
+    inicio = time.perf_counter()
+    for page_number, text in textos_paginas:
+        lido = time.perf_counter()
+        yield page_number, (origem if text and text.strip() else ORIGEM_SEM_TEXTO), text, lido - inicio
+        inicio = time.perf_counter()
+
+
+def juntar_lotes(lotes):
+    """Consome os lotes por página e retorna (nome, nb, df_competencias, df_dados)."""
+    nome, nb = "N/D", "N/D"
+    competencias_extraidas = []
+    dados_extracao = []
+    for lote in lotes:
+        nome, nb = lote["nome"], lote["nb"]
+        competencias_extraidas.extend(lote["competencias"])
+        dados_extracao.extend(lote["registros"])
+    return nome, nb, montar_df_competencias(competencias_extraidas), montar_df_dados(dados_extracao)
+
+
+def textos_das_paginas(pdf):
+    """Gera (page_number, text) para cada página de um PDF já aberto."""
+    for page in pdf.pages:
+        yield page.page_number, page.extract_text()
+
+
+def _extrair_textos_intervalo(pdf_path, inicio, fim):
+    """Executado em outro processo: extrai o texto das páginas [inicio, fim)."""
+    with pdfplumber.open(pdf_path) as pdf:
+        return [(pdf.pages[i].page_number, pdf.pages[i].extract_text()) for i in range(inicio, fim)]
+
+
+def textos_das_paginas_paralelo(pdf_path, total_paginas, workers):
+    """
+    Extrai o texto das páginas em um pool de processos, dividindo o PDF
+    em blocos contíguos. Gera (page_number, text) na ordem original.
+    """
+    inicios, fins = _blocos_de_paginas(total_paginas, workers)
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=contexto) as executor:
+        for bloco in executor.map(_extrair_textos_intervalo, [pdf_path] * len(inicios), inicios, fins):
+            yield from bloco
+
+
+###############################################################################
+# EXTRAÇÃO POR REGIÕES (MODELO DA PÁGINA, COORDENADAS DAS PALAVRAS)
+###############################################################################
+# Distância vertical (pontos) entre palavras da mesma linha e folga horizontal das colunas
+TOLERANCIA_LINHA = 3
+TOLERANCIA_COLUNA = 2
+# Páginas examinadas para aprender o modelo (DIP, cabeçalhos de competência e de rubrica)
+PAGINAS_MODELO = 3
+
+
+class ModeloPagina:
+    """
+    Regiões do histórico de créditos aprendidas uma vez por documento: página e posição
+    (base) da linha do DIP, colunas da tabela de rubricas (código, descrição, valor) e
+    coluna das competências. Nome e NB vêm do cabeçalho (recorte acima do DIP).
+    """
+
+    def __init__(self, pagina_dip, base_dip, x_codigo, x_descricao, x_valor, x_competencia, x_periodo,
+                 nome="N/D", nb="N/D"):
+        self.pagina_dip = pagina_dip
+        self.base_dip = base_dip
+        self.x_codigo = x_codigo
+        self.x_descricao = x_descricao
+        self.x_valor = x_valor
+        self.x_competencia = x_competencia
+        self.x_periodo = x_periodo
+        self.nome = nome
+        self.nb = nb
+
+    def recorte(self, page):
+        """Região útil da página: à direita das colunas e, na página do DIP, abaixo dele."""
+        x0 = max(0, min(self.x_codigo, self.x_competencia) - TOLERANCIA_COLUNA)
+        topo = self.base_dip if page.page_number == self.pagina_dip else 0
+        return page.crop((x0, topo, page.width, page.height))
+
+
+def palavras_por_linha(palavras):
+    """Agrupa as palavras (extract_words) em linhas pela posição vertical, da esquerda para a direita."""
+    linhas = []
+    for palavra in sorted(palavras, key=lambda p: (round(p["top"]), p["x0"])):
+        if linhas and abs(palavra["top"] - linhas[-1][0]["top"]) <= TOLERANCIA_LINHA:
+            linhas[-1].append(palavra)
+        else:
+            linhas.append([palavra])
+    return [sorted(linha, key=lambda p: p["x0"]) for linha in linhas]
+
+
+def _texto(palavras):
+    return " ".join(p["text"] for p in palavras)
+
+
+def aprender_modelo_pagina(pdf):
+    """
+    Procura nas primeiras páginas a linha do DIP, o cabeçalho "Competência / Período" e o
+    cabeçalho "RUBRICA / DESCRIÇÃO / VALOR" e monta o ModeloPagina.
+    Retorna None se o documento não seguir o layout (os extratores usam então o texto da página).
+    """
+    dip = competencia = rubrica = pagina_rubrica = None
+    for page in pdf.pages[:PAGINAS_MODELO]:
+        for linha in palavras_por_linha(page.extract_words()):
+            textos = [p["text"] for p in linha]
+            if dip is None and padrao_DIP.match(_texto(linha)):
+                dip = (page.page_number, max(p["bottom"] for p in linha))
+            elif competencia is None and "Competência" in textos and "Período" in textos:
+                competencia = (linha[textos.index("Competência")]["x0"], linha[textos.index("Período")]["x0"])
+            elif rubrica is None and textos and textos[0].upper() == "RUBRICA":
+                descricao = [p for p in linha if p["text"].upper().startswith("DESCRI")]
+                valor = [p for p in linha if p["text"].upper() == "VALOR"]
+                if descricao and valor:
+                    rubrica = (linha[0]["x0"], descricao[0]["x0"], valor[0]["x0"])
+                    pagina_rubrica = page
+        if dip and competencia and rubrica:
+            break
+    if not (dip and competencia and rubrica):
+        return None
+
+    primeira = pdf.pages[0]
+    base_cabecalho = dip[1] if dip[0] == 1 else primeira.height
+    nome, nb = nome_e_nb_do_texto(primeira.crop((0, 0, primeira.width, base_cabecalho)).extract_text() or "")
+    modelo = ModeloPagina(dip[0], dip[1], *rubrica, *competencia, nome=nome, nb=nb)
+
+    # Layout sem colunas alinhadas aos cabeçalhos: nenhuma rubrica com valor na página do cabeçalho
+    _, registros, _, _ = registros_por_modelo(pagina_rubrica, modelo)
+    if not any(r["Código"] != "Rubrica" and valor_para_centavos(r["Valor"]) is not None for r in registros):
+        return None
+    return modelo
+
+
+def registros_por_modelo(page, modelo):
+    """
+    Lê uma página pelas regiões do modelo. As colunas vêm da posição das palavras:
+    código à esquerda da descrição, descrição até o início da coluna de valor e valor
+    nas palavras que alcançam essa coluna (descrições terminadas em número não viram valor).
+    Retorna (competencias, registros, tempo_texto, tempo_analise).
+    """
+    inicio = time.perf_counter()
+    if page.page_number < modelo.pagina_dip:
+        return [], [], time.perf_counter() - inicio, 0.0
+    linhas = palavras_por_linha(modelo.recorte(page).extract_words())
+    lido = time.perf_counter()
+
+    competencias = []
+    registros = []
+    competencia_pagina = "N/A"
+    limite_codigo = modelo.x_descricao - TOLERANCIA_COLUNA
+    for i, linha in enumerate(linhas):
+        textos = [p["text"] for p in linha]
+        if "Competência" in textos and "Período" in textos:
+            for seguinte in linhas[i + 1:i + 4]:
+                for p in seguinte:
+                    if (modelo.x_competencia - TOLERANCIA_COLUNA <= p["x0"] < modelo.x_periodo
+                            and padrao_competencia.fullmatch(p["text"])):
+                        competencias.append(p["text"])
+                        if competencia_pagina == "N/A":
+                            competencia_pagina = p["text"]
+            continue
+        if "Nascimento" in textos:
+            continue
+        if textos[0].upper() == "RUBRICA":
+            registros.append({
+                "Código": "Rubrica",
+                "Descrição Rubrica": "Descrição Rubrica",
+                "Valor": "Valor",
+                "Data": competencia_pagina,
+                "Página": page.page_number
+            })
+            continue
+
+        codigo = [p["text"] for p in linha if p["x0"] < limite_codigo]
+        if len(codigo) != 1 or not codigo[0].isdigit():
+            continue
+        descricao = _texto(p for p in linha if p["x0"] >= limite_codigo and p["x1"] <= modelo.x_valor)
+        valor = [p["text"] for p in linha if p["x1"] > modelo.x_valor and p["text"] != "R$"]
+        if not descricao:
+            continue
+        registros.append({
+            "Código": codigo[0],
+            "Descrição Rubrica": descricao.replace("R$", "").strip(),
+            "Valor": " ".join(valor),
+            "Data": competencia_pagina,
+            "Página": page.page_number
+        })
+    return competencias, registros, lido - inicio, time.perf_counter() - lido
+
+
+def pagina_por_modelo(page, modelo):
+    """
+    Página do pdfplumber pelas regiões do modelo, como (page_number, origem, dados, tempo_texto)
+    de lotes_por_origem; página sem caracteres (escaneada) sai com ORIGEM_SEM_TEXTO.
+    """
+    if not page.chars:
+        return page.page_number, ORIGEM_SEM_TEXTO, None, 0.0
+    competencias, registros, tempo_texto, tempo_analise = registros_por_modelo(page, modelo)
+    return page.page_number, ORIGEM_REGIOES, (competencias, registros, modelo, tempo_analise), tempo_texto
+
+
+def _registros_por_modelo_intervalo(pdf_path, modelo, inicio, fim):
+    """Executado em outro processo: pagina_por_modelo das páginas [inicio, fim)."""
+    with pdfplumber.open(pdf_path) as pdf:
+        return [pagina_por_modelo(pdf.pages[i], modelo) for i in range(inicio, fim)]
+
+
+def _blocos_de_paginas(total_paginas, workers):
+    """Divide as páginas em blocos contíguos [inicio, fim) para o pool de processos."""
+    qtd_blocos = min(total_paginas, workers * BLOCOS_POR_PROCESSO)
+    tamanho = -(-total_paginas // qtd_blocos)
+    inicios = list(range(0, total_paginas, tamanho))
+    return inicios, [min(i + tamanho, total_paginas) for i in inicios]
+
+
+def registros_por_modelo_paralelo(pdf_path, total_paginas, workers, modelo):
+    """Como pagina_por_modelo em todas as páginas, distribuído em blocos por 'workers' processos."""
+    inicios, fins = _blocos_de_paginas(total_paginas, workers)
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=contexto) as executor:
+        for bloco in executor.map(_registros_por_modelo_intervalo, [pdf_path] * len(inicios),
+                                  [modelo] * len(inicios), inicios, fins):
+            yield from bloco
+
+
+###############################################################################
+# LEITOR RÁPIDO (CAMADA DE TEXTO COM CONFERÊNCIA DAS ÂNCORAS)
+###############################################################################
+# "rapido": camada de texto (PyPDF2) e pdfplumber só nas páginas sem as âncoras esperadas;
+# "pdfplumber": todas as páginas pelo pdfplumber (regiões ou texto completo)
+LEITOR_PADRAO = os.environ.get("LEITOR_TEXTO", "rapido")
+LEITOR_RAPIDO = "rapido"
+
+
+def _linha_de_rubrica(linha):
+    """Código numérico, descrição e valor monetário na mesma linha."""
+    parts = linha.split()
+    return len(parts) >= 3 and parts[0].isdigit() and valor_para_centavos(parts[-1]) is not None
+
+
+def texto_tem_ancoras(text):
+    """
+    Confere se o texto de uma página preserva as linhas que o parser espera:
+    a linha do DIP inteira, "Competência" no cabeçalho com "Período" e a competência
+    logo abaixo, cada cabeçalho RUBRICA/DESCRIÇÃO seguido de uma rubrica (exceto no fim da
+    página) e toda linha iniciada por código numérico com descrição e valor. Texto vazio não passa.
+    """
+    if not text or not text.strip():
+        return False
+    linhas = [linha for linha in text.split("\n") if linha.strip()]
+    for i, linha in enumerate(linhas):
+        ultima = i + 1 == len(linhas)
+        if "Data de Início do Pagamento" in linha and not padrao_DIP.match(linha):
+            return False
+        if "Competência" in linha:
+            if "Período" not in linha or not (ultima or competencias_das_linhas(linhas[i:i + 4])):
+                return False
+            continue
+        if "RUBRICA" in linha.upper():
+            if "DESCRI" not in linha.upper() or not (ultima or _linha_de_rubrica(linhas[i + 1])):
+                return False
+            continue
+        parts = linha.split()
+        if parts and parts[0].isdigit() and not _linha_de_rubrica(linha):
+            return False
+    return True
+
+
+def paginas_leitor_rapido(pdf_path, inicio=0, fim=None, por_regioes=POR_REGIOES_PADRAO):
+    """
+    Lê as páginas [inicio, fim) pela camada de texto e confere as âncoras de cada uma
+    (texto_tem_ancoras). Só as páginas reprovadas são abertas no pdfplumber, pelas regiões
+    do modelo (aprendido na primeira página reprovada com texto) ou pelo texto completo;
+    as que não têm caracteres (escaneadas) saem com ORIGEM_SEM_TEXTO.
+    Gera (page_number, origem, dados, tempo_texto) para lotes_por_origem.
+    """
+    completo = None
+    modelo = None
+    modelo_aprendido = False
+    with LeitorPyPDF2(pdf_path) as rapido:
+        fim = len(rapido) if fim is None else fim
+        try:
+            for indice in range(inicio, fim):
+                lendo = time.perf_counter()
+                text = rapido.texto(indice)
+                if texto_tem_ancoras(text):
+                    yield indice + 1, ORIGEM_RAPIDA, text, time.perf_counter() - lendo
+                    continue
+                if completo is None:
+                    completo = LeitorPdfplumber(pdf_path)
+                page = completo.pagina(indice)
+                if not page.chars:
+                    yield indice + 1, ORIGEM_SEM_TEXTO, None, time.perf_counter() - lendo
+                    continue
+                if not modelo_aprendido:
+                    modelo = aprender_modelo_pagina(completo.pdf) if por_regioes else None
+                    modelo_aprendido = True
+                if modelo is not None:
+                    yield pagina_por_modelo(page, modelo)
+                else:
+                    yield indice + 1, ORIGEM_TEXTO, completo.texto(indice), time.perf_counter() - lendo
+        finally:
+            if completo is not None:
+                completo.fechar()
+
+
+def _paginas_leitor_rapido_intervalo(pdf_path, inicio, fim, por_regioes):
+    """Executado em outro processo: paginas_leitor_rapido das páginas [inicio, fim)."""
+    return list(paginas_leitor_rapido(pdf_path, inicio, fim, por_regioes))
+
+
+def paginas_leitor_rapido_paralelo(pdf_path, total_paginas, workers, por_regioes=POR_REGIOES_PADRAO):
+    """Como paginas_leitor_rapido em todas as páginas, distribuído em blocos por 'workers' processos."""
+    inicios, fins = _blocos_de_paginas(total_paginas, workers)
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=contexto) as executor:
+        for bloco in executor.map(_paginas_leitor_rapido_intervalo, [pdf_path] * len(inicios),
+                                  inicios, fins, [por_regioes] * len(inicios)):
+            yield from bloco
+
+
+def _sondar_leitor_rapido(pdf_path):
+    """
+    (total_paginas, primeira_com_ancoras) pela camada de texto;
+    total_paginas é None se o PyPDF2 não abrir o arquivo.
+    """
+    try:
+        with LeitorPyPDF2(pdf_path) as rapido:
+            return len(rapido), len(rapido) > 0 and texto_tem_ancoras(rapido.texto(0))
+    except Exception:
+        return None, False
+
+
+###############################################################################
+# OCR DAS PÁGINAS SEM TEXTO (ESCANEADAS)
+###############################################################################
+def paginas_com_ocr(paginas, pdf_path, workers=OCR_WORKERS):
+    """
+    Repassa as páginas lidas (page_number, origem, dados, tempo_texto) na ordem, trocando
+    as sem texto (ORIGEM_SEM_TEXTO) pelo texto do OCR (ORIGEM_OCR), que segue para o parser
+    de linhas como as demais. Cada página escaneada é pedida à FilaOCR assim que aparece
+    (cache pelo hash da página, pool de processos) e as páginas seguintes continuam sendo
+    lidas enquanto o OCR roda. Sem OCR disponível, ou se o OCR da página falhar, as páginas
+    seguem sem texto.
+    """
+    if not ocr_disponivel():
+        yield from paginas
+        return
+
+    pendentes = deque()
+    with FilaOCR(pdf_path, workers=workers) as fila:
+        for page_number, origem, dados, tempo_texto in paginas:
+            if origem == ORIGEM_SEM_TEXTO:
+                pendentes.append((page_number, ORIGEM_OCR, fila.pedir(page_number - 1), tempo_texto))
+            else:
+                pendentes.append((page_number, origem, dados, tempo_texto))
+            while pendentes and (pendentes[0][1] != ORIGEM_OCR or pendentes[0][2].done()):
+                yield _pagina_resolvida(pendentes.popleft())
+        while pendentes:
+            yield _pagina_resolvida(pendentes.popleft())
+
+
+def _pagina_resolvida(pagina):
+    """
+    Troca o Future do OCR pelo texto reconhecido (espera o término, se preciso). Se o OCR
+    da página falhar (rasterização, Tesseract), ela segue sem texto, como sem OCR disponível.
+    """
+    page_number, origem, dados, tempo_texto = pagina
+    if origem != ORIGEM_OCR:
+        return pagina
+    try:
+        texto, segundos = dados.result()
+    except Exception:
+        return page_number, ORIGEM_SEM_TEXTO, None, tempo_texto
+    return page_number, origem, texto, tempo_texto + segundos
+
+
+def extrair_contracheque_em_lotes(pdf_path, workers=1, por_regioes=POR_REGIOES_PADRAO, leitor=None,
+                                  ocr_workers=OCR_WORKERS):
+    """
+    Gerador com um lote de registros por página (ver lotes_por_origem), na ordem do PDF.
+    Com leitor "rapido" (padrão: LEITOR_TEXTO), as páginas vêm da camada de texto e só as
+    que não têm as âncoras esperadas são lidas pelo pdfplumber (paginas_leitor_rapido);
+    se o PyPDF2 não abrir o arquivo, segue como leitor "pdfplumber". O pool de processos
+    só é usado pelo leitor rápido quando a primeira página já precisa do pdfplumber.
+    Com 'por_regioes' (padrão: LEITURA_POR_REGIOES=1), o modelo da página é aprendido uma vez
+    e cada página é lida pelas regiões e coordenadas das palavras (registros_por_modelo); sem
+    ele, ou se o documento não seguir o layout, usa o texto completo das páginas.
+    Com workers > 1 as páginas são lidas em um pool de processos;
+    PDFs pequenos (ou workers <= 1) seguem pelo caminho sequencial.
+    Páginas sem texto passam pelo OCR em 'ocr_workers' processos (paginas_com_ocr).
+    """
+    leitor = leitor or LEITOR_PADRAO
+    total_paginas, primeira_com_ancoras = _sondar_leitor_rapido(pdf_path) if leitor == LEITOR_RAPIDO else (None, False)
+    if total_paginas is not None:
+        # A camada de texto custa milissegundos por página: o pool só compensa quando o
+        # documento vai para o pdfplumber (primeira página já reprovada nas âncoras)
+        if workers <= 1 or total_paginas < MIN_PAGINAS_PARALELO or primeira_com_ancoras:
+            paginas = paginas_leitor_rapido(pdf_path, por_regioes=por_regioes)
+        else:
+            paginas = paginas_leitor_rapido_paralelo(pdf_path, total_paginas, min(workers, total_paginas),
+                                                     por_regioes)
+        yield from lotes_por_origem(paginas_com_ocr(paginas, pdf_path, ocr_workers), total_paginas)
+        return
+
+    with pdfplumber.open(pdf_path) as pdf:
+        total_paginas = len(pdf.pages)
+        modelo = aprender_modelo_pagina(pdf) if por_regioes else None
+        if workers <= 1 or total_paginas < MIN_PAGINAS_PARALELO:
+            if modelo is not None:
+                paginas = (pagina_por_modelo(page, modelo) for page in pdf.pages)
+            else:
+                paginas = paginas_de_textos(textos_das_paginas(pdf))
+            yield from lotes_por_origem(paginas_com_ocr(paginas, pdf_path, ocr_workers), total_paginas)
+            return
+
+    workers = min(workers, total_paginas)
+    if modelo is not None:
+        paginas = registros_por_modelo_paralelo(pdf_path, total_paginas, workers, modelo)
+    else:
+        paginas = paginas_de_textos(textos_das_paginas_paralelo(pdf_path, total_paginas, workers))
+    yield from lotes_por_origem(paginas_com_ocr(paginas, pdf_path, ocr_workers), total_paginas)
+
+
+def extrair_contracheque_em_uma_vaga(pdf_path):
+    """
+    extrair_contracheque_em_lotes todo no processo atual, inclusive o OCR (ocr_workers=0):
+    usado nas vagas do agendador, que já limitam quantos núcleos a extração ocupa.
+    """
+    return extrair_contracheque_em_lotes(pdf_path, workers=1, ocr_workers=0)
+
+
+def extrair_contracheque_passagem_unica(pdf_path):
+    """
+    Extração completa em uma só passagem pelas páginas (cada página lida uma única vez),
+    sem pool de páginas: Nome/NB, competências e rubricas juntos.
+    Retorna (nome, nb, df_competencias, df_dados).
+    """
+    return juntar_lotes(extrair_contracheque_em_lotes(pdf_path, workers=1))
+
+
+def criar_informacoes_com_datas(df_rubricas, df_competencias):
+    """
+    Associa cada linha do DataFrame de Rubricas às datas extraídas (df_competencias),
+    de acordo com a coluna 'Intervalos' => "Competência X".
+    O número X é lido uma vez por valor distinto e as datas entram com uma única junção indexada.
+    """
+    df_info = df_rubricas.copy()
+    if "Intervalos" not in df_info.columns or df_info.empty:
+        return df_info
+
+    numeros = {}
+    for intervalo in df_info["Intervalos"].unique():
+        match = re.search(r"Competência\s+(\d+)", intervalo)
+        numeros[intervalo] = int(match.group(1)) if match else 0
+    num_comp = df_info["Intervalos"].map(numeros).to_numpy()
+
+    validos = (num_comp >= 1) & (num_comp <= len(df_competencias))
+    if validos.any():
+        datas = df_competencias["Data Competência"].reindex(num_comp[validos] - 1).to_numpy()
+        df_info.loc[validos, "Data"] = datas
+    return df_info
+
+
+def montar_df_informacoes(df_dados, df_competencias):
+    """
+    Associa as datas às rubricas e remove as linhas de cabeçalho ("Rubrica")
+    e a coluna auxiliar 'Intervalos'.
+    """
+    if df_dados is None or df_dados.empty:
+        return pd.DataFrame()
+    df_informacoes = criar_informacoes_com_datas(df_dados, df_competencias)
+    df_informacoes = df_informacoes[df_informacoes["Código"] != "Rubrica"]
+    if "Intervalos" in df_informacoes.columns:
+        df_informacoes = df_informacoes.drop(columns=["Intervalos"])
+    return compactar_df_informacoes(df_informacoes)
+
+
+def compactar_df_informacoes(df_informacoes):
+    """
+    Reduz a memória do DataFrame de informações: código, descrição e data viram
+    categorias e a página vira inteiro de 32 bits. Valores e índice não mudam.
+    """
+    tipos = {c: "category" for c in COLUNAS_CATEGORICAS if c in df_informacoes.columns}
+    if "Página" in df_informacoes.columns and pd.api.types.is_integer_dtype(df_informacoes["Página"]):
+        tipos["Página"] = "int32"
+    return df_informacoes.astype(tipos)
@@ -0,0 +1,316 @@
+import os
+import re
+import hashlib
+import unicodedata
+import sqlite3
+import threading
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+# Bibliotecas para fuzzy matching
+from rapidfuzz import process, fuzz
+
+# Pontuações abaixo deste valor são descartadas no cálculo da matriz (mínimo do slider = 0.1)
+PONTUACAO_MINIMA = 10
+COL_SIMILARIDADE = "SIMILARIDADE"
+COL_RUBRICA_GLOSSARIO = "RUBRICA GLOSSÁRIO"
+COL_CATEGORIA = "CATEGORIA"
+
+# Glossários nomeados (categoria -> arquivo)
+GLOSSARIOS = {
+    "Cartão/RMC": "Rubricas.txt",
+    "Tarifas/Seguros": "Tarifas.txt"
+}
+CATEGORIA_PADRAO = "Glossário"
+# Pontuação atribuída às correspondências exatas ou por substring (palavras inteiras)
+PONTUACAO_EXATA = 100.0
+# Termos aceitos na busca por substring: palavras soltas ("EMPRESTIMO", "CAR", "VIDA")
+# aparecem em quase qualquer descrição e só contam por correspondência exata ou fuzzy
+PALAVRAS_MINIMAS_SUBSTRING = 2
+TAMANHO_MINIMO_SUBSTRING = 8
+
+# Cache em disco (SQLite) das pontuações, compartilhado entre beneficiários e reinícios
+CACHE_RUBRICAS_PATH = os.environ.get("CACHE_RUBRICAS_PATH", "cache_rubricas.sqlite3")
+# Máximo de parâmetros por consulta SQLite
+LOTE_SQLITE = 500
+
+
+###############################################################################
+# GLOSSÁRIO DE RUBRICAS
+###############################################################################
+def ler_glossario(path):
+    """Lê um arquivo de glossário (Rubricas.txt, Tarifas.txt) e retorna como lista de strings."""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def ler_glossarios(glossarios=GLOSSARIOS):
+    """Lê os glossários nomeados e retorna {categoria: [termos]} (arquivos ausentes são ignorados)."""
+    termos = {}
+    for categoria, path in glossarios.items():
+        if os.path.exists(path):
+            termos[categoria] = ler_glossario(path)
+    return termos
+
+
+_SEM_ACENTOS = str.maketrans("ÁÀÂÃÄÉÈÊËÍÌÎÏÓÒÔÕÖÚÙÛÜÇÑ", "AAAAAEEEEIIIIOOOOOUUUUCN")
+_NAO_ALFANUMERICO = re.compile(r"[^A-Z0-9]+")
+
+
+def normalizar_descricao(texto):
+    """Maiúsculas, sem acentos e sem pontuação, com espaços simples ("Olé - Cartão" -> "OLE CARTAO")."""
+    texto = str(texto).upper().translate(_SEM_ACENTOS)
+    if not texto.isascii():
+        texto = unicodedata.normalize("NFKD", texto)
+        texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return _NAO_ALFANUMERICO.sub(" ", texto).strip()
+
+
+def _regex_da_trie(termos):
+    """
+    Compila os termos em uma única expressão regular a partir de uma trie
+    (prefixos compartilhados), percorrendo cada descrição uma única vez.
+    """
+    trie = {}
+    for termo in termos:
+        no = trie
+        for ch in termo:
+            no = no.setdefault(ch, {})
+        no[""] = True
+
+    def montar(no):
+        ramos = [re.escape(ch) + montar(filho) for ch, filho in sorted(no.items()) if ch]
+        if not ramos:
+            return ""
+        corpo = ramos[0] if len(ramos) == 1 else "(?:" + "|".join(ramos) + ")"
+        return f"(?:{corpo})?" if "" in no else corpo
+
+    return re.compile(r"(?<![A-Z0-9])" + montar(trie) + r"(?![A-Z0-9])")
+
+
+def termo_aceita_substring(normalizado):
+    """True se o termo (normalizado) é específico o bastante para valer 100 contido em outra descrição."""
+    return (len(normalizado.split()) >= PALAVRAS_MINIMAS_SUBSTRING
+            and len(normalizado) >= TAMANHO_MINIMO_SUBSTRING)
+
+
+class IndiceGlossario:
+    """
+    Índice compilado de um ou mais glossários nomeados. A busca tenta, nesta ordem:
+      1. correspondência exata da descrição normalizada;
+      2. termo contido na descrição (palavras inteiras, ex.: "DESC BMG CARTAO 12"), só para
+         termos com PALAVRAS_MINIMAS_SUBSTRING palavras e TAMANHO_MINIMO_SUBSTRING caracteres;
+      3. fuzzy matching (fuzz.ratio) apenas para as descrições restantes.
+    """
+
+    def __init__(self, glossarios):
+        self.termos = []
+        self.normalizados = []
+        self.categorias = []
+        self._indice_normalizado = {}
+        for categoria, termos in glossarios.items():
+            for termo in termos:
+                normalizado = normalizar_descricao(termo)
+                if not normalizado or normalizado in self._indice_normalizado:
+                    continue
+                self._indice_normalizado[normalizado] = len(self.termos)
+                self.termos.append(termo.strip())
+                self.normalizados.append(normalizado)
+                self.categorias.append(categoria)
+        self.categoria_do_termo = dict(zip(self.termos, self.categorias))
+        termos_substring = [n for n in self.normalizados if termo_aceita_substring(n)]
+        self._padrao = _regex_da_trie(termos_substring) if termos_substring else None
+
+        conteudo = "\n".join(f"{c}|{t}" for c, t in zip(self.categorias, self.termos))
+        conteudo += (f"\n#indice-v2|fuzz.ratio|cutoff={PONTUACAO_MINIMA}"
+                     f"|substring={PALAVRAS_MINIMAS_SUBSTRING},{TAMANHO_MINIMO_SUBSTRING}")
+        # Qualquer edição nos glossários muda a versão e invalida as entradas antigas do cache
+        self.versao = hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+    def __len__(self):
+        return len(self.termos)
+
+    def buscar(self, descricoes):
+        """
+        Retorna (pontuacoes, termos) por descrição: 100 para exatas/substring,
+        fuzz.ratio para as demais; sem termo acima de PONTUACAO_MINIMA => (0.0, "").
+        """
+        pontuacoes = np.zeros(len(descricoes))
+        termos = [""] * len(descricoes)
+        if not self.termos:
+            return pontuacoes, termos
+
+        restantes = []
+        for i, descricao in enumerate(descricoes):
+            normalizado = normalizar_descricao(descricao)
+            indice = self._indice_normalizado.get(normalizado)
+            if indice is None and self._padrao is not None:
+                encontrados = [m.group(0) for m in self._padrao.finditer(normalizado)]
+                if encontrados:
+                    indice = self._indice_normalizado[max(encontrados, key=len)]
+            if indice is None:
+                restantes.append((i, normalizado))
+                continue
+            pontuacoes[i] = PONTUACAO_EXATA
+            termos[i] = self.termos[indice]
+
+        if restantes:
+            melhor_pontuacao, melhor_normalizado = pontuar_descricoes(
+                [n for _, n in restantes], self.normalizados)
+            for (i, _), pontuacao, normalizado in zip(restantes, melhor_pontuacao, melhor_normalizado):
+                if normalizado:
+                    pontuacoes[i] = pontuacao
+                    termos[i] = self.termos[self._indice_normalizado[normalizado]]
+        return pontuacoes, termos
+
+
+def indice_do_glossario(glossary):
+    """Aceita um IndiceGlossario, {categoria: [termos]} ou uma lista simples de termos."""
+    if isinstance(glossary, IndiceGlossario):
+        return glossary
+    if isinstance(glossary, dict):
+        return IndiceGlossario(glossary)
+    return IndiceGlossario({CATEGORIA_PADRAO: list(glossary or [])})
+
+
+class CacheRubricas:
+    """
+    Cache persistente (SQLite) de descrição -> (termo do glossário, pontuação),
+    indexado pela versão do glossário. Mantém contadores de acertos e falhas.
+    """
+
+    def __init__(self, path=CACHE_RUBRICAS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        with self._conectar() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rubricas ("
+                " versao TEXT NOT NULL,"
+                " descricao TEXT NOT NULL,"
+                " termo TEXT NOT NULL,"
+                " pontuacao REAL NOT NULL,"
+                " PRIMARY KEY (versao, descricao))"
+            )
+
+    @contextmanager
+    def _conectar(self):
+        # Uma conexão por operação: seguro entre threads (sessões) e processos (lote). O "with"
+        # da conexão do sqlite3 só confirma a transação; o fechamento fica aqui
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def obter(self, versao, descricoes):
+        """Retorna {descricao: (termo, pontuacao)} para as descrições já em cache."""
+        encontrados = {}
+        with self._conectar() as conn:
+            for i in range(0, len(descricoes), LOTE_SQLITE):
+                lote = descricoes[i:i + LOTE_SQLITE]
+                marcadores = ",".join("?" * len(lote))
+                cursor = conn.execute(
+                    f"SELECT descricao, termo, pontuacao FROM rubricas"
+                    f" WHERE versao = ? AND descricao IN ({marcadores})",
+                    [versao, *lote]
+                )
+                for descricao, termo, pontuacao in cursor:
+                    encontrados[descricao] = (termo, pontuacao)
+        with self._lock:
+            self.acertos += len(encontrados)
+            self.falhas += len(descricoes) - len(encontrados)
+        return encontrados
+
+    def guardar(self, versao, itens):
+        """Grava os itens [(descricao, termo, pontuacao), ...] da versão informada."""
+        with self._conectar() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO rubricas (versao, descricao, termo, pontuacao) VALUES (?, ?, ?, ?)",
+                [(versao, d, t, float(p)) for d, t, p in itens]
+            )
+
+    def estatisticas(self):
+        """Retorna um dicionário com acertos, falhas e taxa de acerto (deste processo)."""
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": (self.acertos / total) if total else 0.0
+            }
+
+
+def pontuar_descricoes(descricoes, glossary, score_cutoff=PONTUACAO_MINIMA):
+    """
+    Calcula de uma só vez (multithread) a matriz de similaridade (fuzz.ratio)
+    entre as descrições e o glossário. Retorna (melhor_pontuacao, melhor_termo)
+    por descrição; sem termo acima de score_cutoff => (0.0, "").
+    """
+    if len(descricoes) == 0 or not glossary:
+        return np.zeros(len(descricoes)), [""] * len(descricoes)
+
+    matriz = process.cdist(descricoes, glossary, scorer=fuzz.ratio,
+                           score_cutoff=score_cutoff, dtype=np.float64, workers=-1)
+    melhor_indice = matriz.argmax(axis=1)
+    melhor_pontuacao = matriz[np.arange(len(descricoes)), melhor_indice]
+    melhor_termo = [glossary[i] if p > 0 else "" for i, p in zip(melhor_indice, melhor_pontuacao)]
+    return melhor_pontuacao, melhor_termo
+
+
+def pontuar_descontos(df_descontos, glossary, cache=None):
+    """
+    Acrescenta as colunas SIMILARIDADE (0 a 100), RUBRICA GLOSSÁRIO (termo correspondente)
+    e CATEGORIA (glossário de origem) a cada desconto. 'glossary' pode ser um IndiceGlossario,
+    {categoria: [termos]} ou uma lista. A busca é feita uma vez por descrição única;
+    com 'cache' (CacheRubricas), apenas as descrições ainda não vistas são buscadas.
+    """
+    indice = indice_do_glossario(glossary)
+    df_pontuado = df_descontos.copy()
+    # Descrições como texto (a coluna pode ser categórica): os mapas abaixo geram números/texto
+    descricoes = df_pontuado["DESCRIÇÃO"].astype(str)
+    unique_desc = list(pd.unique(descricoes))
+    resultados = {}
+    pendentes = unique_desc
+
+    if cache is not None and indice:
+        resultados = cache.obter(indice.versao, unique_desc)
+        pendentes = [d for d in unique_desc if d not in resultados]
+
+    if pendentes:
+        pontuacoes, termos = indice.buscar(pendentes)
+        novos = list(zip(pendentes, termos, pontuacoes))
+        resultados.update({d: (t, p) for d, t, p in novos})
+        if cache is not None and indice:
+            cache.guardar(indice.versao, novos)
+
+    df_pontuado[COL_SIMILARIDADE] = descricoes.map(
+        {d: float(p) for d, (_, p) in resultados.items()})
+    df_pontuado[COL_RUBRICA_GLOSSARIO] = descricoes.map(
+        {d: t for d, (t, _) in resultados.items()})
+    df_pontuado[COL_CATEGORIA] = df_pontuado[COL_RUBRICA_GLOSSARIO].map(
+        indice.categoria_do_termo).fillna("")
+    return df_pontuado
+
+
+def filtrar_por_similaridade(df_pontuado, threshold=85):
+    """Máscara sobre as pontuações já calculadas: mantém SIMILARIDADE >= threshold."""
+    if df_pontuado.empty:
+        return pd.DataFrame()
+    return df_pontuado[df_pontuado[COL_SIMILARIDADE] >= max(threshold, PONTUACAO_MINIMA)]
+
+
+def cruzar_descontos_com_rubricas(df_descontos, glossary, threshold=85, cache=None):
+    """
+    Filtra linhas cujo texto em 'DESCRIÇÃO' combine (exata, substring ou fuzzy matching)
+    com itens do glossário acima de 'threshold' (0 a 100).
+    Mantém as colunas SIMILARIDADE, RUBRICA GLOSSÁRIO e CATEGORIA do termo correspondente.
+    """
+    if df_descontos.empty or not len(glossary):
+        return pd.DataFrame()
+
+    return filtrar_por_similaridade(pontuar_descontos(df_descontos, glossary, cache), threshold)
@@ -0,0 +1,93 @@
+"""
+Leitores da camada de texto dos PDFs (backends da extração).
+
+    "pypdf2"      texto gravado no PDF (PyPDF2): muito mais rápido, mas a quebra das linhas
+                  depende de como o PDF foi gerado (colunas desenhadas em separado saem em
+                  linhas separadas)
+    "pdfplumber"  análise do layout caractere a caractere (pdfplumber): lento, linhas fiéis
+
+Todo leitor abre o PDF uma vez, informa a quantidade de páginas (len) e entrega o texto de
+uma página por vez (texto(indice), índice a partir de 0). A escolha entre eles, página a
+página, fica em extracao.paginas_leitor_rapido.
+"""
+from io import BytesIO
+import pdfplumber
+from PyPDF2 import PdfReader
+
+
+class LeitorPdfplumber:
+    """Texto das páginas pelo pdfplumber (extract_text), o mesmo usado pelos extratores."""
+
+    nome = "pdfplumber"
+
+    def __init__(self, pdf_path):
+        self.pdf = pdfplumber.open(pdf_path)
+
+    def __len__(self):
+        return len(self.pdf.pages)
+
+    def texto(self, indice):
+        return self.pdf.pages[indice].extract_text() or ""
+
+    def pagina(self, indice):
+        """Página do pdfplumber (para a leitura por regiões)."""
+        return self.pdf.pages[indice]
+
+    def fechar(self):
+        self.pdf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+class LeitorPyPDF2:
+    """
+    Texto das páginas pela camada de texto do PDF (PyPDF2). Falhas ao ler uma página
+    viram texto vazio, para que a página siga pelo leitor completo.
+    """
+
+    nome = "pypdf2"
+
+    def __init__(self, pdf_path):
+        self._arquivo = open(pdf_path, "rb")
+        try:
+            self.reader = PdfReader(self._arquivo)
+            self._paginas = self.reader.pages
+        except Exception:
+            self._arquivo.close()
+            raise
+
+    def __len__(self):
+        return len(self._paginas)
+
+    def texto(self, indice):
+        try:
+            return self._paginas[indice].extract_text() or ""
+        except Exception:
+            return ""
+
+    def fechar(self):
+        self._arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+def contar_paginas(conteudo_pdf):
+    """Quantidade de páginas do PDF (bytes) pela camada de texto; 1 se o PyPDF2 não abrir o arquivo."""
+    try:
+        return len(PdfReader(BytesIO(conteudo_pdf)).pages)
+    except Exception:
+        return 1
+
+
+LEITORES = {
+    LeitorPyPDF2.nome: LeitorPyPDF2,
+    LeitorPdfplumber.nome: LeitorPdfplumber,
+}
@@ -0,0 +1,138 @@
+"""
+Medição de tempo por etapa (spans) e perfil opcional (cProfile) do pipeline.
+
+Ativada pela variável de ambiente DEBUG_DESEMPENHO:
+    "" ou "0"  desativada (as etapas não medem nada)
+    "1"        mede as etapas e as páginas, registra cada medição como uma linha JSON
+               (logger "analista.desempenho", saída de erro) e mostra o painel de depuração
+    "perfil"   como "1" e também grava um arquivo .prof (cProfile) por PDF processado
+               em PERFIS_PATH (padrão: perfis/)
+
+Os arquivos .prof podem ser abertos com "python -m pstats arquivo.prof" ou snakeviz.
+"""
+import os
+import json
+import time
+import logging
+import cProfile
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+
+MODO_DEBUG = os.environ.get("DEBUG_DESEMPENHO", "").strip().lower()
+DEBUG_ATIVO = MODO_DEBUG not in ("", "0", "false", "nao", "não")
+PERFIL_ATIVO = MODO_DEBUG == "perfil"
+PERFIS_PATH = os.environ.get("PERFIS_PATH", "perfis")
+
+# Medições mantidas por sessão/arquivo (as mais antigas são descartadas)
+MEDICOES_MAX = 5000
+
+logger = logging.getLogger("analista.desempenho")
+if DEBUG_ATIVO and not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+class Medicoes:
+    """
+    Registro das etapas medidas (nome, horário, duração em segundos, etapa pai e atributos).
+    'contexto' (ex.: arquivo, sessão) acompanha cada linha do log JSON.
+    Com DEBUG_DESEMPENHO desativado, etapa() e registrar() não fazem nada.
+    """
+
+    def __init__(self, contexto=None, max_medicoes=MEDICOES_MAX):
+        self.contexto = dict(contexto or {})
+        self.spans = deque(maxlen=max_medicoes)
+        self._pilha = []
+
+    @contextmanager
+    def etapa(self, nome, **atributos):
+        """Mede o bloco 'with' como uma etapa (aninhada na etapa em andamento, se houver)."""
+        if not DEBUG_ATIVO:
+            yield
+            return
+        pai = self._pilha[-1] if self._pilha else ""
+        self._pilha.append(nome)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._pilha.pop()
+            self.registrar(nome, time.perf_counter() - inicio, pai=pai, **atributos)
+
+    def registrar(self, nome, segundos, pai=None, **atributos):
+        """Registra uma duração medida fora de etapa() (ex.: tempos por página da extração)."""
+        if not DEBUG_ATIVO:
+            return
+        span = {
+            "etapa": nome,
+            "pai": (self._pilha[-1] if self._pilha else "") if pai is None else pai,
+            "segundos": round(segundos, 6),
+            "em": datetime.now().isoformat(timespec="milliseconds"),
+            **atributos
+        }
+        self.spans.append(span)
+        logger.info(json.dumps({**self.contexto, **span}, ensure_ascii=False, default=str))
+
+    def registrar_lote(self, lote):
+        """Registra o tempo de texto e de segmentação de um lote de extracao.lotes_por_origem."""
+        if "tempo_texto" in lote:
+            origem = {"origem": lote["origem"]} if "origem" in lote else {}
+            self.registrar("pagina.texto", lote["tempo_texto"], pagina=lote["pagina"], **origem)
+            self.registrar("pagina.analise", lote["tempo_analise"], pagina=lote["pagina"],
+                           registros=len(lote["registros"]))
+
+    def lotes_medidos(self, lotes):
+        """Repassa os lotes de extracao.lotes_por_origem registrando cada um (registrar_lote)."""
+        for lote in lotes:
+            self.registrar_lote(lote)
+            yield lote
+
+    def limpar(self):
+        self.spans.clear()
+
+    def por_etapa(self):
+        """DataFrame com quantidade, total, média e máximo (segundos) de cada etapa."""
+        if not self.spans:
+            return pd.DataFrame(columns=["etapa", "qtd", "total", "media", "maximo"])
+        df = pd.DataFrame(list(self.spans))
+        return (df.groupby("etapa", sort=False)["segundos"]
+                .agg(qtd="size", total="sum", media="mean", maximo="max")
+                .sort_values("total", ascending=False)
+                .reset_index())
+
+    def paginas_mais_lentas(self, quantidade=10):
+        """Páginas com maior tempo de texto + segmentação entre as medições registradas."""
+        paginas = [s for s in self.spans if s["etapa"] in ("pagina.texto", "pagina.analise")]
+        if not paginas:
+            return pd.DataFrame(columns=["pagina", "segundos"])
+        df = pd.DataFrame(paginas).pivot_table(
+            index="pagina", columns="etapa", values="segundos", aggfunc="last"
+        ).fillna(0)
+        df["segundos"] = df.sum(axis=1)
+        return df.sort_values("segundos", ascending=False).head(quantidade).reset_index()
+
+
+@contextmanager
+def perfil(nome):
+    """
+    Com DEBUG_DESEMPENHO=perfil, executa o bloco sob cProfile e grava PERFIS_PATH/<nome>_<data>.prof.
+    O caminho gravado é registrado no log JSON.
+    """
+    if not PERFIL_ATIVO:
+        yield
+        return
+    perfilador = cProfile.Profile()
+    perfilador.enable()
+    try:
+        yield
+    finally:
+        perfilador.disable()
+        os.makedirs(PERFIS_PATH, exist_ok=True)
+        caminho = os.path.join(PERFIS_PATH, f"{nome}_{datetime.now():%Y%m%d_%H%M%S}.prof")
+        perfilador.dump_stats(caminho)
+        logger.info(json.dumps({"perfil": caminho}, ensure_ascii=False))
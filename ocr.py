@@ -0,0 +1,209 @@
+"""
+OCR das páginas sem camada de texto (contracheques escaneados).
+
+Cada página é rasterizada (pdf2image/poppler) e lida pelo Tesseract (pytesseract) em um
+pool de processos. O texto reconhecido fica em cache (SQLite) pelo hash do conteúdo da
+página (fluxo de conteúdo e imagens), de modo que a mesma página escaneada nunca passa
+duas vezes pelo OCR, mesmo em outro PDF ou após reinício.
+
+    OCR_WORKERS      processos do pool (padrão: nº de núcleos; 0 = no próprio processo)
+    OCR_DPI          resolução da rasterização (padrão: 300)
+    OCR_IDIOMA       idioma do Tesseract (padrão: "por")
+    CACHE_OCR_PATH   arquivo do cache (padrão: cache_ocr.sqlite3)
+
+Sem pytesseract, pdf2image ou o executável do Tesseract, ocr_disponivel() é False e as
+páginas seguem sem texto.
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor
+from PyPDF2 import PdfReader
+
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", str(multiprocessing.cpu_count())))
+OCR_DPI = int(os.environ.get("OCR_DPI", "300"))
+OCR_IDIOMA = os.environ.get("OCR_IDIOMA", "por")
+CACHE_OCR_PATH = os.environ.get("CACHE_OCR_PATH", "cache_ocr.sqlite3")
+
+_disponivel = None
+
+
+def ocr_disponivel():
+    """True se pytesseract, pdf2image e o executável do Tesseract estão instalados (verificado uma vez)."""
+    global _disponivel
+    if _disponivel is None:
+        try:
+            import pytesseract
+            import pdf2image  # noqa: F401
+            pytesseract.get_tesseract_version()
+            _disponivel = True
+        except Exception:
+            _disponivel = False
+    return _disponivel
+
+
+def hash_pagina(pagina):
+    """
+    SHA-256 (hex) do conteúdo de uma página do PyPDF2: fluxo de conteúdo e dados das
+    imagens/formulários usados por ela. None se a página não puder ser lida.
+    """
+    try:
+        h = hashlib.sha256()
+        conteudo = pagina.get_contents()
+        if conteudo is not None:
+            h.update(conteudo.get_data())
+        recursos = pagina.get("/Resources")
+        xobjetos = recursos.get_object().get("/XObject") if recursos is not None else None
+        if xobjetos is not None:
+            xobjetos = xobjetos.get_object()
+            for nome in sorted(xobjetos):
+                h.update(str(nome).encode())
+                h.update(xobjetos[nome].get_object().get_data())
+        return h.hexdigest()
+    except Exception:
+        return None
+
+
+def ocr_pagina(pdf_path, indice, dpi=OCR_DPI, idioma=OCR_IDIOMA):
+    """
+    Executado em outro processo: rasteriza a página 'indice' (a partir de 0) e retorna
+    (texto reconhecido, segundos).
+    """
+    import pytesseract
+    from pdf2image import convert_from_path
+
+    inicio = time.perf_counter()
+    imagens = convert_from_path(pdf_path, dpi=dpi, first_page=indice + 1, last_page=indice + 1)
+    texto = pytesseract.image_to_string(imagens[0], lang=idioma) if imagens else ""
+    return texto, time.perf_counter() - inicio
+
+
+class CacheOCR:
+    """
+    Cache persistente (SQLite) de hash da página -> texto do OCR, indexado pela
+    configuração do OCR (idioma e resolução). Mantém contadores de acertos e falhas.
+    """
+
+    def __init__(self, path=CACHE_OCR_PATH):
+        self.path = path
+        self.acertos = 0
+        self.falhas = 0
+        with self._conectar() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS paginas ("
+                " versao TEXT NOT NULL,"
+                " hash TEXT NOT NULL,"
+                " texto TEXT NOT NULL,"
+                " PRIMARY KEY (versao, hash))"
+            )
+
+    @contextmanager
+    def _conectar(self):
+        # Uma conexão por operação: seguro entre threads (sessões) e processos (lote). O "with"
+        # da conexão do sqlite3 só confirma a transação; o fechamento fica aqui
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def obter(self, versao, hash_):
+        """Texto já reconhecido para a página, ou None."""
+        with self._conectar() as conn:
+            linha = conn.execute(
+                "SELECT texto FROM paginas WHERE versao = ? AND hash = ?", (versao, hash_)
+            ).fetchone()
+        if linha is None:
+            self.falhas += 1
+            return None
+        self.acertos += 1
+        return linha[0]
+
+    def guardar(self, versao, hash_, texto):
+        with self._conectar() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO paginas (versao, hash, texto) VALUES (?, ?, ?)", (versao, hash_, texto)
+            )
+
+
+class FilaOCR:
+    """
+    Fila de OCR das páginas de um PDF. pedir(indice) retorna um Future com
+    (texto, segundos): imediato se a página já está no cache; senão a página vai para o
+    pool de processos (criado no primeiro pedido) e o texto é gravado no cache ao terminar;
+    a mesma página pedida de novo enquanto o OCR roda recebe o mesmo Future.
+    Com workers=0 não há pool: o OCR roda no próprio processo, dentro de pedir() (tarefas do
+    agendador, cujas vagas já limitam os núcleos). Nada é aberto enquanto nenhuma página for pedida.
+    """
+
+    def __init__(self, pdf_path, workers=OCR_WORKERS, cache=None, dpi=OCR_DPI, idioma=OCR_IDIOMA):
+        self.pdf_path = pdf_path
+        self.workers = max(0, workers)
+        self.cache = cache
+        self.dpi = dpi
+        self.idioma = idioma
+        self.versao = f"{idioma}@{dpi}"
+        self._reader = None
+        self._arquivo = None
+        self._executor = None
+        # Páginas iguais pedidas antes do primeiro OCR terminar compartilham o mesmo Future
+        self._em_andamento = {}
+
+    def _hash(self, indice):
+        if self._reader is None:
+            self._arquivo = open(self.pdf_path, "rb")
+            self._reader = PdfReader(self._arquivo)
+        return hash_pagina(self._reader.pages[indice])
+
+    def pedir(self, indice):
+        if self.cache is None:
+            self.cache = CacheOCR()
+        hash_ = self._hash(indice)
+        if hash_ in self._em_andamento:
+            return self._em_andamento[hash_]
+        texto = self.cache.obter(self.versao, hash_) if hash_ else None
+        if texto is not None:
+            futuro = Future()
+            futuro.set_result((texto, 0.0))
+            return futuro
+
+        if self.workers == 0:
+            futuro = Future()
+            try:
+                futuro.set_result(ocr_pagina(self.pdf_path, indice, self.dpi, self.idioma))
+            except Exception as e:
+                futuro.set_exception(e)
+            if hash_:
+                self._guardar(hash_, futuro)
+            return futuro
+
+        if self._executor is None:
+            contexto = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=contexto)
+        futuro = self._executor.submit(ocr_pagina, self.pdf_path, indice, self.dpi, self.idioma)
+        if hash_:
+            self._em_andamento[hash_] = futuro
+            futuro.add_done_callback(lambda f: self._guardar(hash_, f))
+        return futuro
+
+    def _guardar(self, hash_, futuro):
+        """Grava no cache o texto de um OCR concluído (cancelados e falhas não entram)."""
+        if not futuro.cancelled() and futuro.exception() is None:
+            self.cache.guardar(self.versao, hash_, futuro.result()[0])
+
+    def fechar(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+        if self._arquivo is not None:
+            self._arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
@@ -0,0 +1,318 @@
+"""
+Processamento em lote (sem interface) de um diretório de contracheques do INSS.
+
+Exemplos:
+    python processar_lote.py pasta_com_pdfs/ --saida resultados --workers 4
+    python processar_lote.py "entrada/*.pdf" --valor-recebido 1500,00
+
+Para cada PDF gera o relatório final (PDF, DOCX e XLSX) com os descontos que combinam
+com o glossário e registra o resultado em um resumo consolidado (resumo_lote.csv).
+Arquivos já processados (mesmo SHA-256) são ignorados nas execuções seguintes.
+"""
+import argparse
+import glob
+import json
+import os
+import time
+import traceback
+import multiprocessing
+import pandas as pd
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from casos import ArmazemCasos, CASOS_PATH
+from extracao import (
+    hash_conteudo,
+    extrair_contracheque_em_lotes,
+    extrair_contracheque_em_uma_vaga,
+    juntar_lotes,
+    montar_df_informacoes,
+    ORIGEM_OCR,
+    ORIGEM_SEM_TEXTO
+)
+from medicao import Medicoes, perfil
+from glossario import (
+    ler_glossario,
+    cruzar_descontos_com_rubricas,
+    CacheRubricas,
+    IndiceGlossario,
+    CACHE_RUBRICAS_PATH
+)
+from relatorios import (
+    df_to_docx_bytes,
+    salvar_pdf_descontos_finais,
+    salvar_xlsx,
+    preparar_df_descontos,
+    ordenar_descontos_finais,
+    calcular_resumo
+)
+
+MANIFESTO = "processados.json"
+RESUMO = "resumo_lote.csv"
+
+
+###############################################################################
+# ENTRADAS E MANIFESTO
+###############################################################################
+def listar_pdfs(entradas):
+    """Expande diretórios e padrões glob em uma lista ordenada (sem repetições) de PDFs."""
+    arquivos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            arquivos.extend(glob.glob(os.path.join(entrada, "*.pdf")))
+            arquivos.extend(glob.glob(os.path.join(entrada, "*.PDF")))
+        else:
+            arquivos.extend(glob.glob(entrada))
+    return sorted(set(os.path.abspath(a) for a in arquivos))
+
+
+def carregar_manifesto(pasta_saida):
+    """Retorna o dicionário sha256 -> resumo dos arquivos já processados."""
+    caminho = os.path.join(pasta_saida, MANIFESTO)
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def salvar_manifesto(pasta_saida, manifesto):
+    """Grava o manifesto de forma atômica (arquivo temporário + rename)."""
+    caminho = os.path.join(pasta_saida, MANIFESTO)
+    with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=1)
+    os.replace(caminho + ".tmp", caminho)
+
+
+###############################################################################
+# PROCESSAMENTO DE UM ARQUIVO (EXECUTADO NOS PROCESSOS DO POOL)
+###############################################################################
+def processar_arquivo(pdf_path, sha256, pasta_saida, glossary, threshold, valor_recebido,
+                      cache_rubricas_path=CACHE_RUBRICAS_PATH, casos_path=CASOS_PATH, workers_paginas=1):
+    """
+    Executa o mesmo pipeline da interface para um PDF: extração, filtro pelo glossário,
+    ordenação cronológica e relatórios finais (PDF, DOCX e XLSX). Com 'casos_path', grava
+    o caso no armazém (Parquet) para ser retomado na interface. Retorna o resumo do arquivo.
+    Com workers_paginas > 1, as páginas (e o OCR) são lidas nesse número de processos;
+    com 1, tudo roda neste processo. Com DEBUG_DESEMPENHO ativo, cada etapa (e cada página)
+    é registrada no log JSON.
+    """
+    with perfil(f"{os.path.splitext(os.path.basename(pdf_path))[0]}_{sha256[:8]}"):
+        return _processar_arquivo(pdf_path, sha256, pasta_saida, glossary, threshold, valor_recebido,
+                                  cache_rubricas_path, casos_path, workers_paginas)
+
+
+def _extrair(pdf_path, workers_paginas):
+    if workers_paginas <= 1:
+        return extrair_contracheque_em_uma_vaga(pdf_path)
+    return extrair_contracheque_em_lotes(pdf_path, workers=workers_paginas, ocr_workers=workers_paginas)
+
+
+def _processar_arquivo(pdf_path, sha256, pasta_saida, glossary, threshold, valor_recebido,
+                       cache_rubricas_path, casos_path, workers_paginas):
+    medicoes = Medicoes({"arquivo": os.path.basename(pdf_path), "sha256": sha256[:12]})
+    origens = Counter()
+
+    def lotes_contados(lotes):
+        for lote in lotes:
+            origens[lote["origem"]] += 1
+            yield lote
+
+    with medicoes.etapa("extracao"):
+        nome, nb, df_competencias, df_dados = juntar_lotes(
+            lotes_contados(medicoes.lotes_medidos(_extrair(pdf_path, workers_paginas)))
+        )
+    armazem = ArmazemCasos(casos_path) if casos_path else None
+    if armazem is not None:
+        with medicoes.etapa("salvar_caso"):
+            armazem.salvar(sha256, nome, nb, df_competencias, df_dados, valor_recebido=valor_recebido)
+    with medicoes.etapa("montar_informacoes", linhas=len(df_dados)):
+        df_informacoes = montar_df_informacoes(df_dados, df_competencias)
+    resumo = {
+        "arquivo": os.path.basename(pdf_path),
+        "sha256": sha256,
+        "nome": nome,
+        "nb": nb,
+        "qtd_rubricas": len(df_informacoes),
+        "paginas_ocr": origens[ORIGEM_OCR],
+        "paginas_sem_texto": origens[ORIGEM_SEM_TEXTO],
+        "qtd_descontos": 0,
+        "valor_total": 0.0,
+        "valor_recebido": valor_recebido,
+        "indebito": 0.0,
+        "indebito_dobro": 0.0,
+        "nao_prescrito": 0.0,
+        "pdf": "",
+        "docx": "",
+        "xlsx": "",
+        "status": "sem descontos",
+        "erro": ""
+    }
+    if df_informacoes.empty:
+        resumo["status"] = "sem informações"
+        return resumo
+
+    df_descontos = preparar_df_descontos(df_informacoes)
+    cache = CacheRubricas(cache_rubricas_path) if cache_rubricas_path else None
+    with medicoes.etapa("pontuacao_glossario", descontos=len(df_descontos)):
+        df_desc_gloss = cruzar_descontos_com_rubricas(df_descontos, glossary, threshold, cache)
+    if df_desc_gloss.empty:
+        return resumo
+
+    df_final = ordenar_descontos_finais(df_desc_gloss)
+    if armazem is not None:
+        armazem.atualizar_selecao(nb, sha256, df_selecionados=df_desc_gloss)
+    with medicoes.etapa("resumo"):
+        resumo_valores = calcular_resumo(df_final, valor_recebido)
+    A_val, _, indebito_val, indebito_dobro_val = resumo_valores["totais"]
+
+    nb_fixed = nb.replace(",", ".")
+    titulo_final = f"Descontos Finais (Cronológico) - {nome} - {nb_fixed}"
+    base_nome = f"Contracheque Descontos_Finais_{nome}_{nb}_{sha256[:8]}"
+
+    pdf_final_path = os.path.join(pasta_saida, base_nome + ".pdf")
+    with medicoes.etapa("relatorio.pdf", linhas=len(df_final)):
+        salvar_pdf_descontos_finais(df_final, pdf_final_path, titulo_final, valor_recebido, resumo_valores)
+
+    with medicoes.etapa("relatorio.docx", linhas=len(df_final)):
+        docx_bytes = df_to_docx_bytes(
+            dados=df_final,
+            titulo=titulo_final,
+            inserir_totais=True,
+            col_valor_soma="DESCONTOS",
+            valor_recebido=valor_recebido,
+            resumo=resumo_valores
+        )
+    docx_final_path = os.path.join(pasta_saida, base_nome + ".docx")
+    with open(docx_final_path, "wb") as f:
+        f.write(docx_bytes)
+
+    xlsx_final_path = os.path.join(pasta_saida, base_nome + ".xlsx")
+    with medicoes.etapa("relatorio.xlsx"):
+        salvar_xlsx([{"nome": nome, "nb": nb, "df_informacoes": df_informacoes,
+                      "df_final": df_final, "resumo": resumo_valores}], xlsx_final_path)
+
+    resumo.update({
+        "qtd_descontos": len(df_final),
+        "valor_total": A_val / 100,
+        "indebito": indebito_val / 100,
+        "indebito_dobro": indebito_dobro_val / 100,
+        "nao_prescrito": resumo_valores["nao_prescrito"] / 100,
+        "pdf": os.path.basename(pdf_final_path),
+        "docx": os.path.basename(docx_final_path),
+        "xlsx": os.path.basename(xlsx_final_path),
+        "status": "ok"
+    })
+    return resumo
+
+
+###############################################################################
+# LOTE
+###############################################################################
+def processar_lote(entradas, pasta_saida, workers=None, glossario_path="Rubricas.txt", tarifas_path="Tarifas.txt",
+                   threshold=85, valor_recebido="0", reprocessar=False,
+                   cache_rubricas_path=CACHE_RUBRICAS_PATH, casos_path=CASOS_PATH):
+    """
+    Processa os PDFs em um pool de processos, ignorando os que já constam no manifesto.
+    Com menos arquivos que 'workers' (ex.: um único PDF grande), os processos que sobram
+    leem as páginas de cada arquivo em paralelo (workers_paginas de processar_arquivo).
+    Falhas em um arquivo são registradas no resumo e não interrompem o lote.
+    Retorna o DataFrame do resumo consolidado.
+    """
+    os.makedirs(pasta_saida, exist_ok=True)
+    glossarios = {"Cartão/RMC": ler_glossario(glossario_path)}
+    if tarifas_path:
+        glossarios["Tarifas/Seguros"] = ler_glossario(tarifas_path)
+    glossary = IndiceGlossario(glossarios)
+    manifesto = carregar_manifesto(pasta_saida)
+
+    pendentes = []
+    ignorados = 0
+    for pdf_path in listar_pdfs(entradas):
+        with open(pdf_path, "rb") as f:
+            sha256 = hash_conteudo(f.read())
+        if not reprocessar and manifesto.get(sha256, {}).get("status") in ("ok", "sem descontos", "sem informações"):
+            ignorados += 1
+            continue
+        pendentes.append((pdf_path, sha256))
+
+    print(f"{len(pendentes)} arquivo(s) a processar, {ignorados} já processado(s).")
+    inicio = time.monotonic()
+    concluidos = 0
+    falhas = 0
+
+    workers = workers or multiprocessing.cpu_count()
+    workers_paginas = max(1, workers // max(1, len(pendentes)))
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=contexto) as executor:
+        futuros = {
+            executor.submit(processar_arquivo, pdf_path, sha256, pasta_saida,
+                            glossary, threshold, valor_recebido, cache_rubricas_path,
+                            casos_path, workers_paginas): (pdf_path, sha256)
+            for pdf_path, sha256 in pendentes
+        }
+        for futuro in as_completed(futuros):
+            pdf_path, sha256 = futuros[futuro]
+            try:
+                resumo = futuro.result()
+            except Exception as e:
+                falhas += 1
+                resumo = {
+                    "arquivo": os.path.basename(pdf_path),
+                    "sha256": sha256,
+                    "status": "erro",
+                    "erro": f"{type(e).__name__}: {e}"
+                }
+                traceback.print_exc()
+            concluidos += 1
+            manifesto[sha256] = resumo
+            salvar_manifesto(pasta_saida, manifesto)
+
+            decorrido = time.monotonic() - inicio
+            print(f"[{concluidos}/{len(pendentes)}] {resumo['arquivo']}: {resumo['status']} "
+                  f"({concluidos / decorrido * 60:.1f} arquivos/min)")
+
+    decorrido = time.monotonic() - inicio
+    if pendentes:
+        print(f"Concluído: {concluidos - falhas} ok, {falhas} falha(s) em {decorrido:.1f}s "
+              f"({concluidos / decorrido * 60:.1f} arquivos/min).")
+
+    df_resumo = pd.DataFrame(list(manifesto.values()))
+    df_resumo.to_csv(os.path.join(pasta_saida, RESUMO), index=False, sep=";", encoding="utf-8-sig")
+    return df_resumo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Processa em lote contracheques do INSS (PDF).")
+    parser.add_argument("entradas", nargs="+", help="Diretórios ou padrões glob de PDFs")
+    parser.add_argument("--saida", default="saida_lote", help="Diretório de saída (padrão: saida_lote)")
+    parser.add_argument("--workers", type=int, default=None, help="Processos em paralelo (padrão: nº de núcleos)")
+    parser.add_argument("--glossario", default="Rubricas.txt", help="Arquivo de glossário (padrão: Rubricas.txt)")
+    parser.add_argument("--tarifas", default="Tarifas.txt",
+                        help="Glossário de tarifas/seguros (padrão: Tarifas.txt; '' desativa)")
+    parser.add_argument("--similaridade", type=float, default=0.85,
+                        help="Nível de similaridade de 0.1 a 1.0 (padrão: 0.85)")
+    parser.add_argument("--valor-recebido", default="0", help="B = Valor Recebido - Autor (a) (padrão: 0)")
+    parser.add_argument("--cache-rubricas", default=CACHE_RUBRICAS_PATH,
+                        help="Arquivo SQLite do cache de rubricas ('' desativa)")
+    parser.add_argument("--casos", default=CASOS_PATH,
+                        help="Diretório do armazém de casos (Parquet) lido pela interface ('' desativa)")
+    parser.add_argument("--reprocessar", action="store_true", help="Processa novamente arquivos já concluídos")
+    args = parser.parse_args()
+
+    df_resumo = processar_lote(
+        args.entradas,
+        args.saida,
+        workers=args.workers,
+        glossario_path=args.glossario,
+        tarifas_path=args.tarifas,
+        threshold=int(args.similaridade * 100),
+        valor_recebido=args.valor_recebido,
+        reprocessar=args.reprocessar,
+        cache_rubricas_path=args.cache_rubricas,
+        casos_path=args.casos
+    )
+    return 1 if "status" in df_resumo and (df_resumo["status"] == "erro").any() else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,913 @@
+import re
+import pandas as pd
+from datetime import date
+from io import BytesIO
+from itertools import repeat
+
+# Bibliotecas para DOCX
+from docx import Document
+from docx.shared import Twips
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from xml.sax.saxutils import escape
+from docx.enum.section import WD_ORIENT
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+# Bibliotecas para planilhas (XLSX)
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+
+# Bibliotecas para PDF (relatórios)
+from fpdf import FPDF, __version__ as _VERSAO_FPDF
+from fpdf.enums import PDFResourceType, XPos, YPos
+from fpdf.util import escape_parens as _escape_parens_fpdf
+
+from extracao import COL_CENTAVOS, valor_para_centavos, centavos_da_serie
+from glossario import normalizar_descricao
+
+LINHAS_ESPECIAIS = [
+    "A = Valor Total (R$)",
+    "B = Valor Recebido - Autor (a)",
+    "Indébito (A-B)",
+    "Indébito em dobro (R$)"
+]
+
+# Bancos reconhecidos na descrição do desconto (palavra inteira, descrição normalizada)
+BANCOS = [
+    "AGIBANK", "BANRISUL", "BBS", "BIB", "BMG", "BONSUCESSO", "BRADESCO", "C6", "CAIXA",
+    "CETELEM", "DAYCOVAL", "INTER", "ITAU", "MASTER", "MERCANTIL", "OLE", "PAN", "SAFRA",
+    "SANTANDER"
+]
+BANCO_NAO_IDENTIFICADO = "Não identificado"
+# Prescrição quinquenal: meses da janela móvel
+MESES_PRESCRICAO = 60
+# Largura (mm) das colunas das tabelas DOCX; demais colunas usam LARGURA_DOCX_PADRAO_MM
+LARGURAS_DOCX_MM = {"COD": 20, "DESCRIÇÃO": 130, "DESCONTOS": 40, "DATA": 30, "PÁGINA": 20}
+LARGURA_DOCX_PADRAO_MM = 25
+# Propriedades de run das células DOCX (9 pt; linhas de totais em 11 pt, negrito, vermelho)
+_RPR_NORMAL = '<w:rPr><w:sz w:val="18"/></w:rPr>'
+_RPR_ESPECIAL = '<w:rPr><w:b/><w:color w:val="FF0000"/><w:sz w:val="22"/></w:rPr>'
+# Caracteres de controle não aceitos em XML
+_TEXTO_XML_INVALIDO = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+# Agrupamentos do resumo incluídos ao final do PDF e do DOCX finais
+SECOES_RESUMO = [
+    ("Totais por ano", "por_ano"),
+    ("Totais por rubrica", "por_rubrica"),
+    ("Totais por banco", "por_banco")
+]
+
+
+###############################################################################
+# PREPARAÇÃO DOS DESCONTOS E TOTAIS
+###############################################################################
+def formatar_centavos_brl(centavos):
+    """Formata centavos (int) em BRL: 123456 -> "1.234,56". Valores ausentes viram ""."""
+    if centavos is None or pd.isna(centavos):
+        return ""
+    sinal = "-" if centavos < 0 else ""
+    reais, resto = divmod(abs(int(centavos)), 100)
+    return f"{sinal}{reais:,}".replace(",", ".") + f",{resto:02d}"
+
+
+def centavos_do_df(df, col_valor="DESCONTOS"):
+    """Coluna de centavos do DataFrame (lida da coluna de valor se ainda não existir)."""
+    if COL_CENTAVOS in df.columns:
+        return df[COL_CENTAVOS]
+    return pd.Series(centavos_da_serie(df[col_valor]), index=df.index)
+
+
+def valor_recebido_centavos(valor_recebido):
+    """Converte o valor B digitado ("1.234,56" ou "1234.56") em centavos; inválido => 0."""
+    return valor_para_centavos(valor_recebido or "0") or 0
+
+
+def preparar_df_descontos(df_informacoes):
+    """
+    Renomeia as colunas para "DESCRIÇÃO", "DESCONTOS", "PÁGINA"
+    e mantém apenas as linhas com valor de desconto preenchido.
+    """
+    df_aux = df_informacoes.rename(columns={
+        "Descrição Rubrica": "DESCRIÇÃO",
+        "Valor": "DESCONTOS",
+        "Página": "PÁGINA"
+    })
+    return df_aux[df_aux["DESCONTOS"].str.strip() != ""].copy()
+
+
+def ordenar_descontos_finais(df_sel):
+    """Ordena os descontos selecionados por Data + Página e mantém as colunas do relatório final."""
+    df_final = df_sel.copy()
+    # Ajusta páginas (caso esteja em branco)
+    df_final["PÁGINA"] = pd.to_numeric(df_final["PÁGINA"], errors='coerce').fillna(0)
+    # Ordena por Data + Página
+    df_final = df_final.sort_values(
+        by=["Data", "PÁGINA"],
+        key=lambda col: pd.to_datetime(col, format="%m/%Y", errors='coerce')
+    ).reset_index(drop=True)
+
+    # Apenas colunas relevantes (+ centavos, usados nos totais)
+    colunas = ["Código", "DESCRIÇÃO", "DESCONTOS", "Data"]
+    if COL_CENTAVOS in df_final.columns:
+        colunas.append(COL_CENTAVOS)
+    return df_final[colunas]
+
+
+def calcular_totais(df_final, valor_recebido="0", col_valor="DESCONTOS"):
+    """Retorna (A, B, Indébito (A-B), Indébito em dobro) em centavos (int, sem arredondamentos)."""
+    A_val = int(centavos_do_df(df_final, col_valor).sum())
+    vrnum = valor_recebido_centavos(valor_recebido)
+    indebito_val = A_val - vrnum
+    return A_val, vrnum, indebito_val, 2 * indebito_val
+
+
+###############################################################################
+# RESUMO (TOTAIS AGRUPADOS)
+###############################################################################
+def banco_da_descricao(descricao):
+    """Primeiro banco de BANCOS que aparece (palavra inteira) na descrição."""
+    for palavra in normalizar_descricao(descricao).split():
+        if palavra in BANCOS:
+            return palavra
+    return BANCO_NAO_IDENTIFICADO
+
+
+def _somar_por(agrupado, chave):
+    return (agrupado.groupby(chave, dropna=False, sort=False)
+            .agg(Qtd=("Qtd", "sum"), Centavos=(COL_CENTAVOS, "sum"))
+            .reset_index())
+
+
+def calcular_resumo(df_sel, valor_recebido="0", data_referencia=None, col_valor="DESCONTOS"):
+    """
+    Calcula, de uma só vez, os totais dos descontos selecionados e os agrupamentos por
+    competência, rubrica (descrição), ano e banco, além da janela móvel de 5 anos
+    (prescrição quinquenal). As linhas são agrupadas uma única vez por
+    (competência, descrição, banco); os demais agrupamentos partem desse resultado.
+    Valores em centavos (int). Retorna um dicionário consumido pela tela, PDF e DOCX.
+    """
+    data_referencia = data_referencia or date.today()
+    centavos = centavos_do_df(df_sel, col_valor).fillna(0).astype("int64")
+    A_val = int(centavos.sum())
+    vrnum = valor_recebido_centavos(valor_recebido)
+
+    descricoes = df_sel["DESCRIÇÃO"].astype(str)
+    bancos = {d: banco_da_descricao(d) for d in descricoes.unique()}
+    base = pd.DataFrame({
+        "Competência": pd.to_datetime(df_sel["Data"], format="%m/%Y", errors="coerce").dt.to_period("M"),
+        "DESCRIÇÃO": descricoes,
+        "Banco": descricoes.map(bancos),
+        COL_CENTAVOS: centavos
+    })
+    agrupado = (base.groupby(["Competência", "DESCRIÇÃO", "Banco"], dropna=False, sort=False)
+                .agg(Qtd=(COL_CENTAVOS, "size"), Centavos=(COL_CENTAVOS, "sum"))
+                .reset_index())
+    agrupado["Ano"] = agrupado["Competência"].dt.year.astype("Int64")
+
+    por_competencia = _somar_por(agrupado, "Competência").sort_values("Competência", na_position="last")
+    por_ano = _somar_por(agrupado, "Ano").sort_values("Ano", na_position="last")
+    por_rubrica = _somar_por(agrupado, "DESCRIÇÃO").sort_values(COL_CENTAVOS, ascending=False)
+    por_banco = _somar_por(agrupado, "Banco").sort_values(COL_CENTAVOS, ascending=False)
+
+    # Janela móvel de 5 anos terminando em cada competência
+    mensal = por_competencia.dropna(subset=["Competência"]).set_index("Competência")[COL_CENTAVOS]
+    janelas = pd.DataFrame(columns=["Início", "Fim", COL_CENTAVOS])
+    if not mensal.empty:
+        meses = pd.period_range(mensal.index.min(), mensal.index.max(), freq="M")
+        acumulado = mensal.reindex(meses, fill_value=0).rolling(MESES_PRESCRICAO, min_periods=1).sum()
+        acumulado = acumulado.loc[mensal.index].astype("int64")
+        janelas = pd.DataFrame({
+            "Início": acumulado.index - (MESES_PRESCRICAO - 1),
+            "Fim": acumulado.index,
+            COL_CENTAVOS: acumulado.to_numpy()
+        })
+
+    # Não prescrito: as MESES_PRESCRICAO competências até a de referência (ajuizamento), como nas janelas
+    referencia = pd.Period(data_referencia, freq="M")
+    competencias = mensal.index
+    nao_prescrito = int(mensal[(competencias > referencia - MESES_PRESCRICAO)
+                               & (competencias <= referencia)].sum()) if not mensal.empty else 0
+
+    for df_grupo in (por_competencia, por_ano, por_rubrica, por_banco):
+        df_grupo.reset_index(drop=True, inplace=True)
+
+    return {
+        "totais": (A_val, vrnum, A_val - vrnum, 2 * (A_val - vrnum)),
+        "por_competencia": por_competencia,
+        "por_ano": por_ano,
+        "por_rubrica": por_rubrica,
+        "por_banco": por_banco,
+        "janelas_prescricao": janelas,
+        "nao_prescrito": nao_prescrito,
+        "data_referencia": data_referencia
+    }
+
+
+def resumo_para_exibicao(df_grupo):
+    """Converte um agrupamento do resumo em texto (competências MM/AAAA e valores em BRL)."""
+    df_exib = df_grupo.copy()
+    for col in df_exib.columns:
+        if isinstance(df_exib[col].dtype, pd.PeriodDtype):
+            df_exib[col] = df_exib[col].dt.strftime("%m/%Y").fillna("N/D")
+    if "Ano" in df_exib.columns:
+        df_exib["Ano"] = df_exib["Ano"].astype(str).replace("<NA>", "N/D")
+    df_exib["Valor (R$)"] = df_exib.pop(COL_CENTAVOS).map(formatar_centavos_brl)
+    return df_exib
+
+
+def texto_nao_prescrito(resumo):
+    """Linha de texto com o total não prescrito em relação à data de referência."""
+    return (f"Não prescrito (5 anos até {resumo['data_referencia']:%d/%m/%Y}): "
+            f"R$ {formatar_centavos_brl(resumo['nao_prescrito'])}")
+
+
+###############################################################################
+# RELATÓRIOS (TOTAIS, FORMATOS, DOCX)
+###############################################################################
+def inserir_totais_na_coluna(df, col_valor, valor_recebido="0", resumo=None):
+    """
+    Insere linhas ao final da coluna col_valor com:
+       - A = Valor Total (R$)
+       - B = Valor Recebido – Autor (a)
+       - Indébito (A-B)
+       - Indébito em dobro (R$)
+
+    *Utiliza o valor de 'valor_recebido' (string digitada pelo usuário) para B.
+    Os totais são somas exatas em centavos; col_valor recebe o texto já em BRL.
+    Com 'resumo' (calcular_resumo) os totais já calculados são reaproveitados.
+    """
+    if col_valor not in df.columns:
+        return df
+
+    totais = resumo["totais"] if resumo is not None else calcular_totais(df, valor_recebido, col_valor)
+    if totais[0] == 0:
+        return df
+
+    # Insere as 4 linhas especiais no DataFrame (demais colunas em branco)
+    df_totais = pd.DataFrame({c: [""] * len(LINHAS_ESPECIAIS) for c in df.columns})
+    df_totais[col_valor] = [formatar_centavos_brl(v) for v in totais]
+    df_totais["DESCRIÇÃO"] = LINHAS_ESPECIAIS
+    df_totais[COL_CENTAVOS] = pd.array(totais, dtype="Int64")
+    return pd.concat([df, df_totais], ignore_index=True)
+
+
+def valores_para_exibicao(dados, col_valor="DESCONTOS"):
+    """
+    Borda de apresentação: reescreve col_valor em BRL a partir da coluna de centavos
+    e remove a coluna de centavos (não exibida nos relatórios).
+    """
+    if COL_CENTAVOS not in dados.columns:
+        return dados
+    dados = dados.copy()
+    if col_valor in dados.columns:
+        centavos = dados[COL_CENTAVOS]
+        formatados = centavos.map(formatar_centavos_brl, na_action="ignore")
+        dados[col_valor] = formatados.where(centavos.notna(), dados[col_valor])
+    return dados.drop(columns=[COL_CENTAVOS])
+
+
+def df_to_docx_bytes(dados: pd.DataFrame, titulo: str,
+                     inserir_totais=False, col_valor_soma="DESCONTOS", valor_recebido="0",
+                     resumo=None) -> bytes:
+    """
+    Converte DataFrame em um arquivo DOCX (bytes) com layout paisagem.
+    Pode inserir linhas de total e demais itens se inserir_totais=True.
+    Com 'resumo' (calcular_resumo) usa os totais já calculados e acrescenta os agrupamentos.
+    """
+    if inserir_totais:
+        dados = inserir_totais_na_coluna(dados.copy(), col_valor_soma, valor_recebido, resumo)
+    dados = valores_para_exibicao(dados, col_valor_soma)
+
+    # (3.1) Ajustar a numeração do NB (retirar vírgulas, substituir por pontos)
+    # Exemplo: "137,939,448-9" => "137.939.448-9"
+    titulo_fixed = titulo
+    # Extrai a parte do NB, se existir, e troca vírgulas por ponto
+    # Supondo que o título seja algo como: "Descontos Finais (Cronológico) - NOME - 137,939,448-9"
+    match_nb = re.search(r"-(.*?)$", titulo)  # pega o final a partir do último hífen
+    if match_nb:
+        nb_dirty = match_nb.group(1)
+        # Remove espaços extras
+        nb_dirty_strip = nb_dirty.strip()
+        # Substitui vírgulas por pontos
+        nb_clean = nb_dirty_strip.replace(",", ".")
+        # Constrói o novo título
+        titulo_fixed = titulo.replace(nb_dirty_strip, nb_clean)
+
+    document = Document()
+    for section in document.sections:
+        section.orientation = WD_ORIENT.LANDSCAPE
+        new_width, new_height = section.page_height, section.page_width
+        section.page_width = new_width
+        section.page_height = new_height
+
+    titulo_heading = document.add_heading(titulo_fixed, level=1)
+    titulo_heading.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    if dados.empty:
+        p = document.add_paragraph("DataFrame vazio - nenhum dado para exibir.")
+        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        buf = BytesIO()
+        document.save(buf)
+        return buf.getvalue()
+
+    _docx_tabela(document, dados, LARGURAS_DOCX_MM, destacar_especiais=True)
+
+    if resumo is not None:
+        _docx_resumo(document, resumo)
+
+    buf = BytesIO()
+    document.save(buf)
+    return buf.getvalue()
+
+
+def _docx_celulas_xml(valores, larguras, alinhamentos, rpr):
+    """XML (WordprocessingML) de uma linha da tabela, com texto, largura e formatação já definidos."""
+    celulas = "".join(
+        f'<w:tc><w:tcPr><w:tcW w:w="{largura}" w:type="dxa"/></w:tcPr>'
+        f'<w:p><w:pPr><w:jc w:val="{alinhamento}"/></w:pPr>'
+        f'<w:r>{rpr}<w:t xml:space="preserve">{escape(_TEXTO_XML_INVALIDO.sub("", str(valor)))}</w:t></w:r></w:p></w:tc>'
+        for valor, largura, alinhamento in zip(valores, larguras, alinhamentos)
+    )
+    return f"<w:tr>{celulas}</w:tr>"
+
+
+def _docx_tabela(document, dados, larguras_mm=None, destacar_especiais=False):
+    """
+    Acrescenta 'dados' como tabela 'Table Grid'. O layout das colunas é definido uma única vez
+    e as linhas são montadas como XML em uma só passada sobre as colunas (sem iterrows nem
+    chamadas por célula do python-docx); LINHAS_ESPECIAIS ficam em negrito e vermelho.
+    """
+    colunas = [str(c) for c in dados.columns]
+    larguras_mm = larguras_mm or {}
+    larguras = [int(larguras_mm.get(col, LARGURA_DOCX_PADRAO_MM) / 25.4 * 1440) for col in colunas]
+    alinhamentos = ["left" if col.upper() == "DESCRIÇÃO" else "center" for col in colunas]
+
+    table = document.add_table(rows=1, cols=len(colunas))
+    table.style = 'Table Grid'
+    for i, col_name in enumerate(colunas):
+        table.columns[i].width = Twips(larguras[i])
+        cell = table.rows[0].cells[i]
+        cell.width = Twips(larguras[i])
+        cell.text = col_name
+        for run in cell.paragraphs[0].runs:
+            run.font.bold = True
+
+    if dados.empty:
+        return table
+
+    especiais = (dados["DESCRIÇÃO"].astype(str).isin(LINHAS_ESPECIAIS).tolist()
+                 if destacar_especiais and "DESCRIÇÃO" in dados.columns else [False] * len(dados))
+    linhas = [
+        _docx_celulas_xml(valores, larguras, alinhamentos, _RPR_ESPECIAL if especial else _RPR_NORMAL)
+        for valores, especial in zip(zip(*(dados[c].tolist() for c in dados.columns)), especiais)
+    ]
+    corpo = parse_xml(f"<w:tbl {nsdecls('w')}>{''.join(linhas)}</w:tbl>")
+    table._tbl.extend(list(corpo))
+    return table
+
+
+def _docx_resumo(document, resumo):
+    """Acrescenta ao DOCX a linha de prescrição e as tabelas de SECOES_RESUMO."""
+    p = document.add_paragraph()
+    run = p.add_run(texto_nao_prescrito(resumo))
+    run.font.bold = True
+    for titulo_secao, chave in SECOES_RESUMO:
+        document.add_heading(titulo_secao, level=2)
+        _docx_tabela(document, resumo_para_exibicao(resumo[chave]), LARGURAS_DOCX_MM)
+
+
+###############################################################################
+# CONTEÚDO DA PÁGINA EM PDF (API INTERNA DO FPDF2)
+###############################################################################
+class ConteudoPaginaFPDF:
+    """
+    Único ponto do projeto que usa a API interna do fpdf2 (versão fixada em requirements.txt),
+    para escrever texto e traços direto no conteúdo da página:
+      - fonte(fonte): (índice da fonte no documento, larguras dos caracteres em 1/1000 do
+        tamanho), de FPDF.current_font (.i e .cw);
+      - usar_fonte(indice): declara a fonte nos recursos da página atual (FPDF._resource_catalog);
+      - escrever(comandos): operadores PDF no conteúdo da página atual (FPDF._out);
+      - escapar(texto): texto pronto para o operador Tj (fpdf.util.escape_parens).
+    Levanta RuntimeError na criação (ou na primeira fonte) se esses internos não existirem;
+    tests/test_relatorios.py compara o resultado com o desenhado pela API pública (cell()).
+    """
+
+    def __init__(self, pdf):
+        catalogo = getattr(pdf, "_resource_catalog", None)
+        if not callable(getattr(pdf, "_out", None)) or not callable(getattr(catalogo, "add", None)):
+            raise RuntimeError(f"fpdf2 {_VERSAO_FPDF} sem FPDF._out/_resource_catalog.add: "
+                               "incompatível com ConteudoPaginaFPDF (ver requirements.txt)")
+        self.pdf = pdf
+        self._fontes = {}
+        self._fontes_nas_paginas = set()
+
+    def fonte(self, fonte):
+        """(índice, larguras) da fonte (família, estilo, tamanho), registrada no documento uma vez."""
+        if fonte not in self._fontes:
+            pdf = self.pdf
+            anterior = (pdf.font_family, pdf.font_style, pdf.font_size_pt)
+            pdf.set_font(*fonte)
+            obj = pdf.current_font
+            if not isinstance(getattr(obj, "i", None), int) or not hasattr(getattr(obj, "cw", None), "__getitem__"):
+                raise RuntimeError(f"fpdf2 {_VERSAO_FPDF}: fonte sem .i/.cw, "
+                                   "incompatível com ConteudoPaginaFPDF (ver requirements.txt)")
+            self._fontes[fonte] = (obj.i, obj.cw)
+            if anterior[0]:
+                pdf.set_font(*anterior)
+        return self._fontes[fonte]
+
+    def usar_fonte(self, indice):
+        """Declara a fonte nos recursos da página atual (uma vez por página)."""
+        pagina = self.pdf.page
+        if (pagina, indice) not in self._fontes_nas_paginas:
+            self.pdf._resource_catalog.add(PDFResourceType.FONT, indice, pagina)
+            self._fontes_nas_paginas.add((pagina, indice))
+
+    def escrever(self, comandos):
+        """Acrescenta 'comandos' (operadores PDF, em pt) ao conteúdo da página atual."""
+        self.pdf._out(comandos)
+
+    escapar = staticmethod(_escape_parens_fpdf)
+
+
+###############################################################################
+# TABELAS EM PDF
+###############################################################################
+class PDFRelatorio(FPDF):
+    """
+    FPDF com renderização de tabelas a partir de colunas (listas de textos), usada pelos
+    dois relatórios. As células são escritas diretamente no conteúdo da página (um bloco
+    por página, via ConteudoPaginaFPDF, em vez de uma chamada cell() por valor); textos
+    longos são quebrados em linhas e o cabeçalho da tabela é repetido a cada quebra de página.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._conteudo = ConteudoPaginaFPDF(self)
+        self._linhas_cache = {}
+
+    def _texto_centralizado(self, y, altura, texto, fonte):
+        """
+        Equivalente a cell(0, altura, texto, align='C') na linha y, sem mover o cursor, escrito
+        direto no conteúdo da página (cabeçalhos e rodapés repetidos em todas as páginas).
+        """
+        indice, cw = self._conteudo.fonte(fonte)
+        texto = _latin1(texto)
+        largura = sum(map(cw.__getitem__, texto)) * fonte[2] / 1000 / self.k
+        x = self.l_margin + (self.epw - largura) / 2
+        base = self.h - (y + 0.5 * altura + 0.3 * fonte[2] / self.k)
+        self._conteudo.usar_fonte(indice)
+        self._conteudo.escrever(f"q 0 g BT /F{indice} {fonte[2]:.2f} Tf {x * self.k:.2f} {base * self.k:.2f} Td "
+                                f"({self._conteudo.escapar(texto)}) Tj ET Q")
+
+    def _quebrar_texto(self, texto, largura, fonte):
+        """
+        Quebra 'texto' em linhas que cabem em 'largura' (mm) e retorna [(linha escapada, largura_mm)].
+        O resultado é guardado por (texto, largura, fonte): descrições se repetem muito.
+        """
+        chave = (texto, largura, fonte)
+        linhas = self._linhas_cache.get(chave)
+        if linhas is not None:
+            return linhas
+
+        cw = self._conteudo.fonte(fonte)[1]
+        escapar = self._conteudo.escapar
+        escala = fonte[2] / 1000 / self.k
+        maximo = largura / escala
+        largura_total = sum(map(cw.__getitem__, texto))
+        if largura_total <= maximo:
+            linhas = [(escapar(texto), largura_total * escala)]
+            self._linhas_cache[chave] = linhas
+            return linhas
+
+        partes = []
+        atual, largura_atual = "", 0
+        for palavra in texto.split(" "):
+            largura_palavra = sum(map(cw.__getitem__, palavra))
+            if atual and largura_atual + cw[" "] + largura_palavra <= maximo:
+                atual += " " + palavra
+                largura_atual += cw[" "] + largura_palavra
+                continue
+            if atual or partes:
+                partes.append((atual, largura_atual))
+            atual, largura_atual = "", 0
+            # Palavra maior que a coluna: quebra por caractere
+            for c in palavra:
+                largura_c = cw[c]
+                if atual and largura_atual + largura_c > maximo:
+                    partes.append((atual, largura_atual))
+                    atual, largura_atual = "", 0
+                atual += c
+                largura_atual += largura_c
+        partes.append((atual, largura_atual))
+        linhas = [(escapar(parte), largura_parte * escala) for parte, largura_parte in partes]
+        self._linhas_cache[chave] = linhas
+        return linhas
+
+    def tabela(self, colunas, valores, larguras, alinhamentos=None, destaques=None,
+               fonte=("helvetica", "", 9), fonte_cabecalho=("helvetica", "B", 10),
+               fonte_destaque=("helvetica", "B", 12), altura_minima=8, cor_destaque=(255, 0, 0),
+               cor_cabecalho=(200, 220, 255), margem=1):
+        """
+        Desenha uma tabela com bordas na posição atual.
+
+        colunas: títulos; valores: uma lista de textos por coluna (mesmo tamanho);
+        larguras: mm por coluna; alinhamentos: 'L', 'C' ou 'R' por coluna (padrão 'C');
+        destaques: lista de bool por linha (linhas desenhadas com fonte_destaque e cor_destaque).
+        """
+        k, altura_pagina = self.k, self.h
+        alinhamentos = alinhamentos or ["C"] * len(colunas)
+        qtd = len(valores[0]) if valores else 0
+        destaques = destaques if destaques is not None else [False] * qtd
+        larguras_uteis = [max(largura - 2 * margem, 1) for largura in larguras]
+        posicoes_x = [self.l_margin + sum(larguras[:i]) for i in range(len(larguras))]
+        x_inicio, x_fim = self.l_margin, posicoes_x[-1] + larguras[-1]
+        linha_base = f"{x_inicio * k:.2f} {{:.2f}} m {x_fim * k:.2f} {{:.2f}} l S"
+
+        def celula(texto, j, f):
+            """(qtd. de linhas, [(início, fim)]) com o texto já posicionado na horizontal."""
+            x, largura, alinhamento = posicoes_x[j], larguras[j], alinhamentos[j]
+            partes = []
+            linhas = self._quebrar_texto(texto, larguras_uteis[j], f)
+            for texto_linha, largura_texto in linhas:
+                if not texto_linha:
+                    partes.append(None)
+                    continue
+                if alinhamento == "L":
+                    tx = x + margem
+                elif alinhamento == "R":
+                    tx = x + largura - margem - largura_texto
+                else:
+                    tx = x + (largura - largura_texto) / 2
+                partes.append((f"BT {tx * k:.2f} ", f" Td ({texto_linha}) Tj ET"))
+            return len(linhas), partes
+
+        conteudo = []
+        estado = {"fonte": None, "cor": None, "topo": None}
+
+        def usar_fonte(f):
+            indice = self._conteudo.fonte(f)[0]
+            self._conteudo.usar_fonte(indice)
+            conteudo.append(f"BT /F{indice} {f[2]:.2f} Tf ET")
+            estado["fonte"] = f
+
+        def usar_cor(cor):
+            conteudo.append(f"{cor[0] / 255:.3f} {cor[1] / 255:.3f} {cor[2] / 255:.3f} rg")
+            estado["cor"] = cor
+
+        def descarregar():
+            # Bordas verticais e superior do trecho da tabela nesta página; q/Q isola fonte
+            # e cores do bloco do estado controlado pelo FPDF
+            if estado["topo"] is not None:
+                topo, base = (altura_pagina - estado["topo"]) * k, (altura_pagina - self.y) * k
+                conteudo.append(linha_base.format(topo, topo))
+                conteudo.extend(f"{x * k:.2f} {topo:.2f} m {x * k:.2f} {base:.2f} l S"
+                                for x in posicoes_x + [x_fim])
+            if conteudo:
+                self._conteudo.escrever("q\n" + "\n".join(conteudo) + "\nQ")
+                conteudo.clear()
+            estado["fonte"] = estado["cor"] = estado["topo"] = None
+
+        def linha(celulas, f, cor_texto, cor_fundo=None):
+            entrelinha = f[2] / k * 1.25
+            altura = max(altura_minima, max(c[0] for c in celulas) * entrelinha + 2 * margem)
+            if self.y + altura > self.page_break_trigger and self.y > self.t_margin + 1:
+                descarregar()
+                self.add_page()
+                if cor_fundo is None:
+                    cabecalho()
+            y = self.y
+            if estado["topo"] is None:
+                estado["topo"] = y
+            if cor_fundo is not None:
+                usar_cor(cor_fundo)
+                conteudo.append(f"{x_inicio * k:.2f} {(altura_pagina - y) * k:.2f} "
+                                f"{(x_fim - x_inicio) * k:.2f} {-altura * k:.2f} re f")
+            base_pt = (altura_pagina - y - altura) * k
+            conteudo.append(linha_base.format(base_pt, base_pt))
+            if estado["fonte"] != f:
+                usar_fonte(f)
+            if estado["cor"] != cor_texto:
+                usar_cor(cor_texto)
+            # Texto de cada célula centralizado na vertical (baseline como em cell())
+            ajuste = altura_pagina - y - 0.5 * entrelinha - 0.3 * f[2] / k
+            for qtd_linhas, partes in celulas:
+                ty = ajuste - (altura - qtd_linhas * entrelinha) / 2
+                for parte in partes:
+                    if parte is not None:
+                        conteudo.append(f"{parte[0]}{ty * k:.2f}{parte[1]}")
+                    ty -= entrelinha
+            self.y = y + altura
+
+        titulos = [celula(_latin1(c), j, fonte_cabecalho) for j, c in enumerate(colunas)]
+
+        def cabecalho():
+            linha(titulos, fonte_cabecalho, (0, 0, 0), cor_cabecalho)
+
+        # Cada valor distinto de uma coluna é convertido, quebrado e posicionado uma única vez
+        textos = []
+        celulas_colunas = []
+        for j, coluna in enumerate(valores):
+            convertidos = {v: _latin1(v) for v in dict.fromkeys(coluna)}
+            unicos = {t: celula(t, j, fonte) for t in dict.fromkeys(convertidos.values())}
+            textos.append([convertidos[v] for v in coluna])
+            celulas_colunas.append([unicos[t] for t in textos[-1]])
+
+        self.x = self.l_margin
+        cabecalho()
+        for i, (celulas, destaque) in enumerate(zip(zip(*celulas_colunas), destaques)):
+            if destaque:
+                linha([celula(coluna[i], j, fonte_destaque) for j, coluna in enumerate(textos)],
+                      fonte_destaque, cor_destaque)
+            else:
+                linha(celulas, fonte, (0, 0, 0))
+        descarregar()
+        self.x = self.l_margin
+
+
+def _latin1(valor):
+    """Texto restrito ao latin-1 das fontes padrão do PDF (demais caracteres viram '?')."""
+    return str(valor).encode("latin-1", "replace").decode("latin-1")
+
+
+def colunas_do_df(dados, colunas):
+    """Valores de 'colunas' como listas de textos (coluna ausente vira texto vazio)."""
+    return [dados[c].astype(str).tolist() if c in dados.columns else [""] * len(dados) for c in colunas]
+
+
+###############################################################################
+# CLASSE PDFBASICO PARA O RELATÓRIO BÁSICO
+###############################################################################
+class PDFBasico(PDFRelatorio):
+    """
+    Ajusta cabeçalho do relatório, incluindo 'Contracheque ISS - nome + NB'.
+    """
+
+    def __init__(self, nome_user, nb_user, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.nome_user = nome_user
+        self.nb_user = nb_user
+
+    def header(self):
+        # Texto direto no conteúdo em vez de cell(): o cabeçalho se repete em todas as páginas
+        titulo = f"Contracheque ISS - {self.nome_user} - {self.nb_user}"
+        self._texto_centralizado(self.t_margin, 10, titulo, ('helvetica', 'B', 12))
+        self.set_y(self.t_margin + 20)
+
+    def footer(self):
+        self._texto_centralizado(self.h - 15, 10, f'Página {self.page_no()}', ('helvetica', 'I', 8))
+
+
+def _montar_pdf_basico(dados, nome_user, nb_user):
+    """
+    Monta um PDF simples com colunas: ["Código", "Descrição Rubrica", "Valor", "Data", "Página"].
+    Usa a classe PDFBasico com cabeçalho personalizado (nome + NB).
+    """
+    headers = ["Código", "Descrição Rubrica", "Valor", "Data", "Página"]
+    col_widths = {
+        "Código": 30,
+        "Descrição Rubrica": 130,
+        "Valor": 40,
+        "Data": 40,
+        "Página": 40
+    }
+
+    pdf = PDFBasico(nome_user=nome_user, nb_user=nb_user, orientation='L', format='A4')
+    pdf.add_page()
+    pdf.tabela(
+        headers,
+        colunas_do_df(dados, headers),
+        [col_widths[h] for h in headers],
+        alinhamentos=["L" if h == "Descrição Rubrica" else "C" for h in headers],
+        fonte_cabecalho=("helvetica", "", 10),
+        altura_minima=10
+    )
+    return pdf
+
+
+def salvar_em_pdf_basico(dados, file_name, nome_user, nb_user):
+    """Grava em 'file_name' o PDF das informações com datas (ver _montar_pdf_basico)."""
+    _montar_pdf_basico(dados, nome_user, nb_user).output(file_name)
+
+
+def pdf_basico_bytes(dados, nome_user, nb_user) -> bytes:
+    """PDF das informações com datas gerado em memória (sem arquivo em disco)."""
+    return bytes(_montar_pdf_basico(dados, nome_user, nb_user).output())
+
+
+def _montar_pdf_descontos_finais(df_final, titulo_final, valor_recebido="0", resumo=None):
+    """
+    Monta o PDF final (cronológico) com colunas ["Código", "DESCRIÇÃO", "DESCONTOS", "Data"]
+    e as linhas de totais (A, B, Indébito, Indébito em dobro) destacadas em vermelho.
+    Com 'resumo' (calcular_resumo) usa os totais já calculados e acrescenta os agrupamentos.
+    """
+    df_com_totais = valores_para_exibicao(
+        inserir_totais_na_coluna(df_final.copy(), "DESCONTOS", valor_recebido, resumo), "DESCONTOS"
+    )
+
+    pdf = PDFRelatorio(orientation='L', format='A4')
+    pdf.add_page()
+    pdf.set_font("helvetica", "B", 12)
+    pdf.cell(0, 10, titulo_final, border=False, align='C', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.ln(10)
+
+    headers = ["Código", "DESCRIÇÃO", "DESCONTOS", "Data"]
+    col_widths = {
+        "Código": 25,
+        "DESCRIÇÃO": 150,
+        "DESCONTOS": 35,
+        "Data": 40
+    }
+    # Linhas de totais: fonte maior, negrito e em vermelho; DESCONTOS já está em BRL
+    pdf.tabela(
+        headers,
+        colunas_do_df(df_com_totais, headers),
+        [col_widths[h] for h in headers],
+        alinhamentos=["L" if h == "DESCRIÇÃO" else "C" for h in headers],
+        destaques=df_com_totais["DESCRIÇÃO"].isin(LINHAS_ESPECIAIS).tolist()
+    )
+
+    if resumo is not None:
+        _pdf_resumo(pdf, resumo)
+    return pdf
+
+
+def salvar_pdf_descontos_finais(df_final, file_name, titulo_final, valor_recebido="0", resumo=None):
+    """Grava em 'file_name' o PDF final (ver _montar_pdf_descontos_finais)."""
+    _montar_pdf_descontos_finais(df_final, titulo_final, valor_recebido, resumo).output(file_name)
+
+
+def pdf_descontos_finais_bytes(df_final, titulo_final, valor_recebido="0", resumo=None) -> bytes:
+    """PDF final gerado em memória (sem arquivo em disco)."""
+    return bytes(_montar_pdf_descontos_finais(df_final, titulo_final, valor_recebido, resumo).output())
+
+
+def _pdf_resumo(pdf, resumo):
+    """Acrescenta ao PDF a linha de prescrição e as tabelas de SECOES_RESUMO."""
+    pdf.set_text_color(0, 0, 0)
+    pdf.ln(6)
+    pdf.set_font("helvetica", "B", 10)
+    pdf.cell(0, 8, texto_nao_prescrito(resumo), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    for titulo_secao, chave in SECOES_RESUMO:
+        df_exib = resumo_para_exibicao(resumo[chave])
+        colunas = list(df_exib.columns)
+        pdf.ln(4)
+        pdf.set_font("helvetica", "B", 10)
+        pdf.cell(0, 8, titulo_secao, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        pdf.tabela(
+            colunas,
+            colunas_do_df(df_exib, colunas),
+            [150 if col == "DESCRIÇÃO" else 40 for col in colunas],
+            alinhamentos=["L" if col == "DESCRIÇÃO" else "C" for col in colunas],
+            altura_minima=7
+        )
+
+
+###############################################################################
+# PLANILHA (XLSX) EM MODO STREAMING
+###############################################################################
+FORMATO_MOEDA_XLSX = '#,##0.00'
+FORMATO_COMPETENCIA_XLSX = 'mm/yyyy'
+
+
+# Linhas convertidas de uma vez (valores, datas) ao gravar a planilha: a memória usada por
+# caso fica limitada a um bloco, qualquer que seja o tamanho do DataFrame
+LINHAS_POR_BLOCO_XLSX = 5000
+
+
+def _reais_da_coluna(df, col_valor):
+    """Valores em reais (float) a partir dos centavos; vazio => None."""
+    return [None if pd.isna(c) else int(c) / 100 for c in centavos_do_df(df, col_valor)]
+
+
+def _datas_da_coluna(serie):
+    """Competências "MM/AAAA" como datas (primeiro dia do mês); inválidas => None."""
+    datas = pd.to_datetime(serie, format="%m/%Y", errors="coerce")
+    return [None if pd.isna(d) else d.date() for d in datas]
+
+
+def _fatias(df):
+    """O DataFrame em blocos consecutivos de LINHAS_POR_BLOCO_XLSX linhas."""
+    for inicio in range(0, len(df), LINHAS_POR_BLOCO_XLSX):
+        yield df.iloc[inicio:inicio + LINHAS_POR_BLOCO_XLSX]
+
+
+def _escrever_aba(wb, titulo, colunas, linhas, formatos=None, larguras=None):
+    """
+    Cria uma aba (modo write_only) e grava as linhas (tuplas de valores), consumidas uma a
+    uma. Colunas com formato usam uma única célula estilizada, reaproveitada a cada linha:
+    o modo streaming grava a linha assim que ela é anexada.
+    """
+    ws = wb.create_sheet(titulo)
+    for letra, largura in zip("ABCDEFGHIJ", larguras or []):
+        ws.column_dimensions[letra].width = largura
+    ws.append(colunas)
+    celulas = []
+    for formato in formatos or [None] * len(colunas):
+        if formato is None:
+            celulas.append(None)
+            continue
+        celula = WriteOnlyCell(ws)
+        celula.number_format = formato
+        celulas.append(celula)
+    for linha in linhas:
+        saida = []
+        for valor, celula in zip(linha, celulas):
+            if celula is None or valor is None:
+                saida.append(valor)
+            else:
+                celula.value = valor
+                saida.append(celula)
+        ws.append(saida)
+    return ws
+
+
+def _linhas_informacoes(casos):
+    for caso in casos:
+        df = caso.get("df_informacoes")
+        if df is None or df.empty:
+            continue
+        for fatia in _fatias(df):
+            yield from zip(
+                repeat(caso["nome"]),
+                repeat(caso["nb"]),
+                fatia["Código"].astype(str),
+                fatia["Descrição Rubrica"].astype(str),
+                _reais_da_coluna(fatia, "Valor"),
+                _datas_da_coluna(fatia["Data"]),
+                (None if pd.isna(p) else int(p) for p in fatia["Página"])
+            )
+
+
+def _linhas_descontos_finais(casos):
+    for caso in casos:
+        df = caso.get("df_final")
+        if df is None or df.empty:
+            continue
+        for fatia in _fatias(df):
+            yield from zip(
+                repeat(caso["nome"]),
+                repeat(caso["nb"]),
+                fatia["Código"].astype(str),
+                fatia["DESCRIÇÃO"].astype(str),
+                _reais_da_coluna(fatia, "DESCONTOS"),
+                _datas_da_coluna(fatia["Data"])
+            )
+
+
+def _linhas_totais(casos):
+    """Totais (A, B, indébitos, não prescrito) e total por ano de cada beneficiário."""
+    for caso in casos:
+        resumo = caso.get("resumo")
+        if resumo is None:
+            continue
+        rotulos = LINHAS_ESPECIAIS + [f"Não prescrito (5 anos até {resumo['data_referencia']:%d/%m/%Y})"]
+        valores = list(resumo["totais"]) + [resumo["nao_prescrito"]]
+        for rotulo, centavos in zip(rotulos, valores):
+            yield caso["nome"], caso["nb"], rotulo, centavos / 100
+        for ano, centavos in zip(resumo["por_ano"]["Ano"], resumo["por_ano"][COL_CENTAVOS]):
+            yield caso["nome"], caso["nb"], f"Total {'N/D' if pd.isna(ano) else int(ano)}", int(centavos) / 100
+
+
+def _montar_xlsx(casos):
+    """
+    Monta a planilha (openpyxl write_only, memória constante) com as abas "Informações",
+    "Descontos Finais" e "Totais". 'casos' é uma lista de dicionários com nome,
+    nb, df_informacoes, df_final e resumo (calcular_resumo) de cada beneficiário.
+    Valores são células numéricas e competências são datas.
+    """
+    casos = list(casos)
+    wb = Workbook(write_only=True)
+    _escrever_aba(
+        wb, "Informações",
+        ["Nome", "NB", "Código", "Descrição Rubrica", "Valor (R$)", "Competência", "Página"],
+        _linhas_informacoes(casos),
+        [None, None, None, None, FORMATO_MOEDA_XLSX, FORMATO_COMPETENCIA_XLSX, None],
+        [30, 16, 10, 60, 14, 12, 8]
+    )
+    _escrever_aba(
+        wb, "Descontos Finais",
+        ["Nome", "NB", "Código", "DESCRIÇÃO", "DESCONTOS (R$)", "Competência"],
+        _linhas_descontos_finais(casos),
+        [None, None, None, None, FORMATO_MOEDA_XLSX, FORMATO_COMPETENCIA_XLSX],
+        [30, 16, 10, 60, 16, 12]
+    )
+    _escrever_aba(
+        wb, "Totais",
+        ["Nome", "NB", "Item", "Valor (R$)"],
+        _linhas_totais(casos),
+        [None, None, None, FORMATO_MOEDA_XLSX],
+        [30, 16, 45, 16]
+    )
+    return wb
+
+
+def xlsx_bytes(casos) -> bytes:
+    """Planilha de _montar_xlsx gerada em memória."""
+    buf = BytesIO()
+    _montar_xlsx(casos).save(buf)
+    return buf.getvalue()
+
+
+def salvar_xlsx(casos, file_name):
+    """Grava em 'file_name' a planilha de _montar_xlsx."""
+    _montar_xlsx(casos).save(file_name)
@@ -0,0 +1,446 @@
+"""
+Serviço HTTP local (sem interface) da análise de contracheques do INSS, para outros sistemas
+do escritório obterem os descontos e o indébito de um PDF.
+
+    python servico.py [--host 127.0.0.1] [--porta 8600] [--workers 4]
+
+POST /analisar
+    Corpo: o PDF (Content-Type: application/pdf). Parâmetros na query string:
+        similaridade     0.1 a 1.0 (padrão: 0.85)
+        valor_recebido   B = Valor Recebido - Autor (a) (padrão: 0)
+        data_referencia  AAAA-MM-DD, para a prescrição quinquenal (padrão: hoje)
+        rubrica          descrição selecionada; repetir para várias (padrão: todas as que
+                         combinam com o glossário, como no processamento em lote)
+        relatorios       formatos incluídos em base64 na resposta: pdf,docx,xlsx (padrão: nenhum)
+        stream           1 = resposta em NDJSON (uma linha JSON por evento), enviada à medida
+                         que o PDF é lido: posição na fila, cada página com as rubricas
+                         extraídas, cada desconto final e, por último, o resultado
+    Resposta: JSON com nome, NB, descontos finais (linhas) e totais em reais; 400/411/413
+    para parâmetros ou corpo inválidos, 422 se o PDF não puder ser lido e 500 em erro na análise.
+    O cabeçalho X-Sessao (padrão: IP do cliente) agrupa as requisições do cliente na fila
+    justa; cada requisição aguarda as tarefas com um identificador próprio.
+
+GET /saude
+    Ocupação do agendador.
+
+A extração e a análise usam as mesmas funções da interface e do lote (extracao, glossario,
+relatorios) e passam pelo agendador (agendador.py): no máximo 'workers' tarefas
+simultâneas, rodízio entre clientes e o mesmo PDF enviado ao mesmo tempo lido uma só vez.
+
+    SERVICO_HOST     endereço (padrão: 127.0.0.1)
+    SERVICO_PORTA    porta (padrão: 8600)
+    SERVICO_MAX_MB   tamanho máximo do PDF (padrão: 50)
+
+Os glossários (Rubricas.txt, Tarifas.txt) são lidos da pasta deste arquivo, qualquer que
+seja o diretório atual; sem nenhum termo o serviço não inicia.
+"""
+import os
+import json
+import uuid
+import base64
+import argparse
+import tempfile
+from collections import Counter
+from datetime import date
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from agendador import Agendador, AGENDADOR_WORKERS, ERRO
+from extracao import (
+    hash_conteudo,
+    extrair_contracheque_em_uma_vaga,
+    juntar_lotes,
+    montar_df_informacoes,
+    COL_CENTAVOS,
+    ORIGEM_OCR,
+    ORIGEM_SEM_TEXTO
+)
+from glossario import (
+    ler_glossarios,
+    cruzar_descontos_com_rubricas,
+    CacheRubricas,
+    IndiceGlossario,
+    GLOSSARIOS,
+    CACHE_RUBRICAS_PATH
+)
+from leitores import contar_paginas
+from relatorios import (
+    df_to_docx_bytes,
+    pdf_descontos_finais_bytes,
+    xlsx_bytes,
+    preparar_df_descontos,
+    ordenar_descontos_finais,
+    calcular_resumo
+)
+
+SERVICO_HOST = os.environ.get("SERVICO_HOST", "127.0.0.1")
+SERVICO_PORTA = int(os.environ.get("SERVICO_PORTA", "8600"))
+SERVICO_MAX_MB = int(os.environ.get("SERVICO_MAX_MB", "50"))
+# Intervalo (segundos) entre verificações do andamento das tarefas nas respostas em stream
+INTERVALO_STREAM = 0.25
+FORMATOS_RELATORIO = ("pdf", "docx", "xlsx")
+MIME_JSON = "application/json; charset=utf-8"
+MIME_NDJSON = "application/x-ndjson; charset=utf-8"
+# Glossários da pasta do serviço (os caminhos de glossario.GLOSSARIOS são relativos)
+GLOSSARIOS_SERVICO = {
+    categoria: os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+    for categoria, path in GLOSSARIOS.items()
+}
+
+
+class ParametroInvalido(ValueError):
+    """Parâmetro ou corpo da requisição inválido; 'status' é o código HTTP da resposta (padrão: 400)."""
+
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.status = status
+
+
+###############################################################################
+# PARÂMETROS
+###############################################################################
+def ler_parametros(query):
+    """Valida a query string de /analisar e retorna os parâmetros da análise."""
+    valores = parse_qs(query)
+
+    def unico(nome, padrao):
+        return valores.get(nome, [padrao])[-1]
+
+    try:
+        similaridade = float(unico("similaridade", "0.85"))
+    except ValueError:
+        raise ParametroInvalido("similaridade deve ser um número de 0.1 a 1.0")
+    if not 0.1 <= similaridade <= 1.0:
+        raise ParametroInvalido("similaridade deve ser um número de 0.1 a 1.0")
+    try:
+        data_referencia = date.fromisoformat(unico("data_referencia", date.today().isoformat()))
+    except ValueError:
+        raise ParametroInvalido("data_referencia deve estar no formato AAAA-MM-DD")
+    relatorios = [f for f in unico("relatorios", "").lower().split(",") if f]
+    desconhecidos = sorted(set(relatorios) - set(FORMATOS_RELATORIO))
+    if desconhecidos:
+        raise ParametroInvalido(f"relatorios desconhecidos: {', '.join(desconhecidos)} "
+                                f"(use {','.join(FORMATOS_RELATORIO)})")
+    return {
+        "threshold": int(round(similaridade * 100)),
+        "valor_recebido": unico("valor_recebido", "0"),
+        "data_referencia": data_referencia,
+        "rubricas": sorted(set(valores.get("rubrica", []))),
+        "relatorios": sorted(set(relatorios)),
+        "stream": unico("stream", "0").lower() in ("1", "true", "sim")
+    }
+
+
+###############################################################################
+# PIPELINE (EXECUTADO NAS VAGAS DO AGENDADOR)
+###############################################################################
+def extrair_pdf(tarefa, agendador, conteudo_pdf, sha256):
+    """
+    Lê o PDF em um processo do pool do agendador, guardando cada lote em tarefa.parciais.
+    Retorna {"nome", "nb", "df_informacoes", "paginas_ocr", "paginas_sem_texto"}.
+    """
+    origens = Counter()
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+        tmp_file.write(conteudo_pdf)
+        tmp_file_path = tmp_file.name
+    try:
+        # Com DEBUG_DESEMPENHO=perfil, o processamento deste arquivo é gravado em um .prof
+        for lote in agendador.gerar_em_processo(extrair_contracheque_em_uma_vaga, tmp_file_path,
+                                                nome_perfil=sha256[:12]):
+            tarefa.parciais.append(lote)
+            origens[lote["origem"]] += 1
+            tarefa.progresso = lote["pagina"] / lote["total_paginas"]
+    finally:
+        os.unlink(tmp_file_path)
+
+    nome, nb, df_competencias, df_dados = juntar_lotes(tarefa.parciais)
+    return {
+        "nome": nome,
+        "nb": nb,
+        "df_informacoes": montar_df_informacoes(df_dados, df_competencias),
+        "paginas_ocr": origens[ORIGEM_OCR],
+        "paginas_sem_texto": origens[ORIGEM_SEM_TEXTO]
+    }
+
+
+def linhas_json(df):
+    """
+    Linhas do DataFrame como lista de dicionários serializáveis em JSON, sem a coluna interna
+    de centavos (o valor vai formatado, como nos relatórios).
+    """
+    df = df.drop(columns=[COL_CENTAVOS], errors="ignore")
+    return json.loads(df.to_json(orient="records", force_ascii=False))
+
+
+def analisar(extraido, glossary, parametros, cache=None):
+    """
+    Mesmo pipeline da interface sobre o resultado de extrair_pdf: filtro pelo glossário,
+    seleção das rubricas pedidas, ordenação cronológica, totais e relatórios pedidos.
+    Valores dos totais em reais; relatórios em base64.
+    """
+    df_informacoes = extraido["df_informacoes"]
+    resultado = {
+        "nome": extraido["nome"],
+        "nb": extraido["nb"],
+        "qtd_rubricas": len(df_informacoes),
+        "paginas_ocr": extraido["paginas_ocr"],
+        "paginas_sem_texto": extraido["paginas_sem_texto"],
+        "status": "sem descontos",
+        "descontos": [],
+        "totais": {"valor_total": 0.0, "valor_recebido": 0.0, "indebito": 0.0,
+                   "indebito_dobro": 0.0, "nao_prescrito": 0.0},
+        "relatorios": {}
+    }
+    if df_informacoes.empty:
+        resultado["status"] = "sem informações"
+        return resultado
+
+    df_desc_gloss = cruzar_descontos_com_rubricas(
+        preparar_df_descontos(df_informacoes), glossary, parametros["threshold"], cache
+    )
+    if parametros["rubricas"] and not df_desc_gloss.empty:
+        df_desc_gloss = df_desc_gloss[df_desc_gloss["DESCRIÇÃO"].astype(str).isin(parametros["rubricas"])]
+    if df_desc_gloss.empty:
+        return resultado
+
+    df_final = ordenar_descontos_finais(df_desc_gloss)
+    valor_recebido = parametros["valor_recebido"]
+    resumo = calcular_resumo(df_final, valor_recebido, parametros["data_referencia"])
+    A_val, vrnum, indebito_val, indebito_dobro_val = resumo["totais"]
+    resultado.update({
+        "status": "ok",
+        "descontos": linhas_json(df_final),
+        "totais": {
+            "valor_total": A_val / 100,
+            "valor_recebido": vrnum / 100,
+            "indebito": indebito_val / 100,
+            "indebito_dobro": indebito_dobro_val / 100,
+            "nao_prescrito": resumo["nao_prescrito"] / 100
+        }
+    })
+
+    nome, nb = extraido["nome"], extraido["nb"]
+    titulo_final = f"Descontos Finais (Cronológico) - {nome} - {nb.replace(',', '.')}"
+    geradores = {
+        "pdf": lambda: pdf_descontos_finais_bytes(df_final, titulo_final, valor_recebido, resumo),
+        "docx": lambda: df_to_docx_bytes(dados=df_final, titulo=titulo_final, inserir_totais=True,
+                                         col_valor_soma="DESCONTOS", valor_recebido=valor_recebido,
+                                         resumo=resumo),
+        "xlsx": lambda: xlsx_bytes([{"nome": nome, "nb": nb, "df_informacoes": df_informacoes,
+                                     "df_final": df_final, "resumo": resumo}])
+    }
+    for formato in parametros["relatorios"]:
+        resultado["relatorios"][formato] = base64.b64encode(geradores[formato]()).decode("ascii")
+    return resultado
+
+
+###############################################################################
+# HTTP
+###############################################################################
+class ServicoHandler(BaseHTTPRequestHandler):
+    """Requisições de /analisar e /saude; cada uma roda em uma thread do servidor."""
+
+    server_version = "AnalistaContracheques/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if urlsplit(self.path).path != "/saude":
+            self._responder_json(404, {"erro": "rota não encontrada"})
+            return
+        self._responder_json(200, {"status": "ok", **self.server.agendador.estatisticas()})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != "/analisar":
+            self._responder_json(404, {"erro": "rota não encontrada"})
+            return
+        try:
+            parametros = ler_parametros(url.query)
+            conteudo_pdf = self._ler_pdf()
+        except ParametroInvalido as e:
+            self._responder_json(e.status, {"erro": str(e)})
+            return
+        # Requisições simultâneas do mesmo cliente dividem a fila, mas cada uma aguarda (e
+        # cancela) as tarefas com a própria sessão
+        sessao = uuid.uuid4().hex
+        fila = self.headers.get("X-Sessao") or self.client_address[0]
+        if parametros["stream"]:
+            self._analisar_em_stream(conteudo_pdf, parametros, sessao, fila)
+        else:
+            self._analisar(conteudo_pdf, parametros, sessao, fila)
+
+    def _ler_pdf(self):
+        tamanho = self.headers.get("Content-Length")
+        if tamanho is None:
+            raise ParametroInvalido("envie o PDF no corpo da requisição (Content-Length)", status=411)
+        try:
+            tamanho = int(tamanho)
+        except ValueError:
+            raise ParametroInvalido(f"Content-Length inválido: {tamanho!r}") from None
+        if tamanho < 0:
+            raise ParametroInvalido(f"Content-Length inválido: {tamanho}")
+        if tamanho > SERVICO_MAX_MB * 1024 * 1024:
+            # O corpo não é lido: a conexão é encerrada após a resposta
+            self.close_connection = True
+            raise ParametroInvalido(f"PDF maior que {SERVICO_MAX_MB} MB", status=413)
+        conteudo_pdf = self.rfile.read(tamanho)
+        if len(conteudo_pdf) < tamanho:
+            self.close_connection = True
+            raise ParametroInvalido(f"corpo incompleto: {len(conteudo_pdf)} de {tamanho} bytes")
+        if not conteudo_pdf.startswith(b"%PDF"):
+            raise ParametroInvalido("o corpo da requisição não é um PDF")
+        return conteudo_pdf
+
+    # Tarefas -----------------------------------------------------------------
+    def _submeter_extracao(self, conteudo_pdf, sha256, sessao, fila):
+        agendador = self.server.agendador
+        return agendador.submeter(
+            ("extracao", sha256), sessao,
+            lambda tarefa: extrair_pdf(tarefa, agendador, conteudo_pdf, sha256),
+            tipo="extracao", custo=contar_paginas(conteudo_pdf), fila=fila
+        )
+
+    def _submeter_analise(self, extraido, sha256, parametros, sessao, fila):
+        chave = ("analise", sha256, parametros["threshold"], parametros["valor_recebido"],
+                 parametros["data_referencia"], tuple(parametros["rubricas"]), tuple(parametros["relatorios"]))
+        return self.server.agendador.submeter(
+            chave, sessao,
+            lambda tarefa: analisar(extraido, self.server.glossary, parametros, self.server.cache_rubricas),
+            tipo="relatorio", fila=fila
+        )
+
+    def _analisar(self, conteudo_pdf, parametros, sessao, fila):
+        sha256 = hash_conteudo(conteudo_pdf)
+        extracao = self._submeter_extracao(conteudo_pdf, sha256, sessao, fila)
+        extracao.aguardar()
+        if extracao.estado == ERRO:
+            # Falha na leitura: quase sempre PDF corrompido ou que não é um contracheque legível
+            self._responder_json(422, {"erro": f"não foi possível ler o PDF ({descrever_erro(extracao.erro)})"})
+            return
+        analise = self._submeter_analise(extracao.resultado, sha256, parametros, sessao, fila)
+        analise.aguardar()
+        if analise.estado == ERRO:
+            self._responder_json(500, {"erro": descrever_erro(analise.erro)})
+            return
+        self._responder_json(200, {"sha256": sha256, **analise.resultado})
+
+    def _analisar_em_stream(self, conteudo_pdf, parametros, sessao, fila):
+        """
+        NDJSON em chunks: posição na fila enquanto aguarda, uma linha por página lida
+        (com as rubricas extraídas), uma por desconto final e o resultado (sem as linhas).
+        Se o cliente desconectar, a requisição deixa de aguardar as tarefas. As páginas vêm
+        de extracao.parciais, guardado logo após submeter (a tarefa o libera ao terminar): um PDF
+        cuja leitura já terminou em outra requisição segue direto para o resultado.
+        """
+        agendador = self.server.agendador
+        sha256 = hash_conteudo(conteudo_pdf)
+        self.send_response(200)
+        self.send_header("Content-Type", MIME_NDJSON)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        extracao = self._submeter_extracao(conteudo_pdf, sha256, sessao, fila)
+        parciais = extracao.parciais
+        if parciais is None:
+            parciais = []
+        chave_atual = extracao.chave
+        try:
+            enviados = 0
+            posicao_anterior = None
+            while True:
+                terminada = extracao.aguardar(INTERVALO_STREAM)
+                posicao = agendador.posicao(extracao)
+                if posicao and posicao != posicao_anterior:
+                    self._enviar_evento({"evento": "fila", "posicao": posicao,
+                                         "eta_segundos": round(agendador.eta(extracao), 1)})
+                posicao_anterior = posicao
+                lotes = parciais[enviados:]
+                for lote in lotes:
+                    self._enviar_evento({
+                        "evento": "pagina",
+                        "pagina": lote["pagina"],
+                        "total_paginas": lote["total_paginas"],
+                        "origem": lote["origem"],
+                        "registros": lote["registros"]
+                    })
+                enviados += len(lotes)
+                if terminada:
+                    break
+            if extracao.estado == ERRO:
+                self._enviar_evento({"evento": "erro", "erro": descrever_erro(extracao.erro)})
+            else:
+                analise = self._submeter_analise(extracao.resultado, sha256, parametros, sessao, fila)
+                chave_atual = analise.chave
+                analise.aguardar()
+                if analise.estado == ERRO:
+                    self._enviar_evento({"evento": "erro", "erro": descrever_erro(analise.erro)})
+                else:
+                    resultado = dict(analise.resultado)
+                    for linha in resultado.pop("descontos"):
+                        self._enviar_evento({"evento": "desconto", **linha})
+                    self._enviar_evento({"evento": "resultado", "sha256": sha256, **resultado})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            agendador.cancelar(chave_atual, sessao)
+            self.close_connection = True
+
+    # Respostas ---------------------------------------------------------------
+    def _enviar_evento(self, evento):
+        dados = json.dumps(evento, ensure_ascii=False, default=str).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(dados):x}\r\n".encode("ascii") + dados + b"\r\n")
+        self.wfile.flush()
+
+    def _responder_json(self, status, corpo):
+        dados = json.dumps(corpo, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", MIME_JSON)
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+
+def descrever_erro(erro):
+    return f"{type(erro).__name__}: {erro}"
+
+
+def criar_servidor(host=SERVICO_HOST, porta=SERVICO_PORTA, workers=AGENDADOR_WORKERS,
+                   glossarios=GLOSSARIOS_SERVICO, cache_rubricas_path=CACHE_RUBRICAS_PATH):
+    """
+    Servidor HTTP (uma thread por conexão) com o agendador, o glossário e o cache de rubricas
+    compartilhados pelas requisições. porta=0 escolhe uma porta livre (server_address).
+    Levanta FileNotFoundError se os glossários não tiverem nenhum termo.
+    """
+    termos = ler_glossarios(glossarios)
+    if not any(termos.values()):
+        raise FileNotFoundError(f"nenhum termo nos glossários: {', '.join(glossarios.values())}")
+    servidor = ThreadingHTTPServer((host, porta), ServicoHandler)
+    servidor.daemon_threads = True
+    servidor.agendador = Agendador(workers)
+    servidor.glossary = IndiceGlossario(termos)
+    servidor.cache_rubricas = CacheRubricas(cache_rubricas_path) if cache_rubricas_path else None
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviço HTTP local da análise de contracheques do INSS.")
+    parser.add_argument("--host", default=SERVICO_HOST, help=f"Endereço (padrão: {SERVICO_HOST})")
+    parser.add_argument("--porta", type=int, default=SERVICO_PORTA, help=f"Porta (padrão: {SERVICO_PORTA})")
+    parser.add_argument("--workers", type=int, default=AGENDADOR_WORKERS,
+                        help="Análises simultâneas (padrão: AGENDADOR_WORKERS ou nº de núcleos)")
+    parser.add_argument("--cache-rubricas", default=CACHE_RUBRICAS_PATH,
+                        help="Arquivo SQLite do cache de rubricas ('' desativa)")
+    args = parser.parse_args()
+
+    servidor = criar_servidor(args.host, args.porta, args.workers, cache_rubricas_path=args.cache_rubricas)
+    print(f"Serviço em http://{servidor.server_address[0]}:{servidor.server_address[1]} "
+          f"({servidor.agendador.workers} análise(s) simultânea(s)).")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,7 @@
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+# benchmarks/gerar_contracheque gera os contracheques sintéticos dos testes de extração
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
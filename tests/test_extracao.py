@@ -0,0 +1,176 @@
+from collections import Counter
+
+import pandas as pd
+import pytest
+
+import ocr
+import extracao
+from extracao import (
+    COL_CENTAVOS,
+    ORIGEM_OCR,
+    ORIGEM_RAPIDA,
+    ORIGEM_SEM_TEXTO,
+    ORIGEM_TEXTO,
+    extrair_contracheque_em_lotes,
+    juntar_lotes,
+    montar_df_dados,
+    montar_df_informacoes,
+    paginas_com_ocr,
+    texto_tem_ancoras,
+    valor_para_centavos
+)
+from gerar_contracheque import gerar_contracheque
+from leitores import LeitorPyPDF2
+
+
+@pytest.mark.parametrize("valor, centavos", [
+    ("1.234,56", 123456),
+    ("R$ 1.234,56", 123456),
+    ("1,234.56", 123456),
+    ("0,05", 5),
+    ("1234,5", 123450),
+    ("1234", 123400),
+    ("-12,30", -1230),
+    ("-", None),
+    ("", None),
+    ("Valor", None),
+])
+def test_valor_para_centavos(valor, centavos):
+    assert valor_para_centavos(valor) == centavos
+
+
+def test_coluna_centavos_acompanha_valor():
+    registros = [
+        {"Código": "Rubrica", "Descrição Rubrica": "Descrição Rubrica", "Valor": "Valor", "Página": 1},
+        {"Código": "101", "Descrição Rubrica": "MR", "Valor": "1.234,56", "Página": 1},
+        {"Código": "217", "Descrição Rubrica": "BMG CARTAO", "Valor": "0,05", "Página": 1},
+        {"Código": "299", "Descrição Rubrica": "SUSPENSO", "Valor": "-", "Página": 1},
+    ]
+    df = montar_df_dados(registros)
+    assert str(df[COL_CENTAVOS].dtype) == "Int64"
+    assert df[COL_CENTAVOS].tolist() == [pd.NA, 123456, 5, pd.NA]
+    assert df["Intervalos"].tolist() == ["", "Competência 1", "Competência 1", "Competência 1"]
+
+
+def extrair(pdf_path, **kwargs):
+    nome, nb, df_competencias, df_dados = juntar_lotes(extrair_contracheque_em_lotes(pdf_path, **kwargs))
+    return nome, nb, df_competencias, montar_df_informacoes(df_dados, df_competencias).reset_index(drop=True)
+
+
+@pytest.fixture(scope="module")
+def pdf_em_colunas(tmp_path_factory):
+    pdf_path = str(tmp_path_factory.mktemp("pdfs") / "colunas.pdf")
+    esperado = gerar_contracheque(pdf_path, competencias=30, rubricas=4)
+    return pdf_path, esperado
+
+
+@pytest.mark.parametrize("leitor", ["rapido", "pdfplumber"])
+def test_extracao_paralela_igual_a_sequencial(pdf_em_colunas, monkeypatch, leitor):
+    pdf_path, esperado = pdf_em_colunas
+    assert esperado["paginas"] >= 4
+    # O PDF de teste é pequeno: o pool entra a partir de 2 páginas
+    monkeypatch.setattr(extracao, "MIN_PAGINAS_PARALELO", 2)
+    nome, nb, df_competencias, df_informacoes = extrair(pdf_path, workers=1, leitor=leitor, ocr_workers=0)
+    paralelo = extrair(pdf_path, workers=2, leitor=leitor, ocr_workers=0)
+    assert paralelo[:2] == (nome, nb)
+    pd.testing.assert_frame_equal(paralelo[2], df_competencias)
+    pd.testing.assert_frame_equal(paralelo[3], df_informacoes)
+    assert len(df_competencias) == esperado["competencias"]
+    assert len(df_informacoes) == esperado["linhas"]
+
+
+def test_falha_no_ocr_deixa_a_pagina_sem_texto(pdf_em_colunas, monkeypatch, tmp_path):
+    pdf_path, _ = pdf_em_colunas
+    chamadas = []
+
+    def ocr_com_falha(pdf_path, indice, *args):
+        chamadas.append(indice)
+        if indice == 1:
+            raise RuntimeError("tesseract falhou")
+        return "texto reconhecido", 2.0
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(extracao, "ocr_disponivel", lambda: True)
+    monkeypatch.setattr(ocr, "ocr_pagina", ocr_com_falha)
+    paginas = [
+        (1, ORIGEM_RAPIDA, "texto da camada", 0.5),
+        (2, ORIGEM_SEM_TEXTO, None, 0.5),
+        (3, ORIGEM_SEM_TEXTO, None, 0.5),
+    ]
+    assert list(paginas_com_ocr(paginas, pdf_path, workers=0)) == [
+        (1, ORIGEM_RAPIDA, "texto da camada", 0.5),
+        (2, ORIGEM_SEM_TEXTO, None, 0.5),
+        (3, ORIGEM_OCR, "texto reconhecido", 2.5),
+    ]
+    assert chamadas == [1, 2]
+
+
+@pytest.fixture(scope="module")
+def pdf_em_linhas(tmp_path_factory):
+    pdf_path = str(tmp_path_factory.mktemp("pdfs") / "linhas.pdf")
+    esperado = gerar_contracheque(pdf_path, competencias=30, rubricas=4, linhas_inteiras=True)
+    return pdf_path, esperado
+
+
+def extrair_com_origens(pdf_path, leitor):
+    origens = Counter()
+
+    def lotes():
+        for lote in extrair_contracheque_em_lotes(pdf_path, workers=1, leitor=leitor, ocr_workers=0):
+            origens[lote["origem"]] += 1
+            yield lote
+
+    nome, nb, df_competencias, df_dados = juntar_lotes(lotes())
+    df_informacoes = montar_df_informacoes(df_dados, df_competencias).reset_index(drop=True)
+    return (nome, nb, df_competencias, df_informacoes), origens
+
+
+def assert_mesma_extracao(obtido, esperado):
+    assert obtido[:2] == esperado[:2]
+    pd.testing.assert_frame_equal(obtido[2], esperado[2])
+    pd.testing.assert_frame_equal(obtido[3], esperado[3])
+
+
+def test_texto_tem_ancoras():
+    cabecalho = [
+        "Data de Início do Pagamento (DIP): 01/01/2015 MR: R$ 1.412,00",
+        "Competência Período Situação",
+        "01/2018 01/01/2018 a 28/01/2018 Pago",
+        "RUBRICA DESCRIÇÃO VALOR",
+        "101 VALOR TOTAL DE MR DO PERIODO R$ 1.412,00",
+    ]
+    assert texto_tem_ancoras("\n".join(cabecalho))
+    assert not texto_tem_ancoras("")
+    # Colunas fora de ordem (camada de texto sem as linhas): DIP, competência ou rubrica quebrados
+    assert not texto_tem_ancoras("Data de Início do Pagamento (DIP):\n01/01/2015 MR: R$ 1.412,00")
+    assert not texto_tem_ancoras("Competência\nPeríodo\n01/2018")
+    assert not texto_tem_ancoras("RUBRICA\nDESCRIÇÃO\nVALOR\n101\nVALOR TOTAL DE MR DO PERIODO")
+    assert not texto_tem_ancoras("\n".join(cabecalho[:3] + ["RUBRICA DESCRIÇÃO VALOR", "101 VALOR TOTAL"]))
+
+
+@pytest.mark.parametrize("layout", ["pdf_em_linhas", "pdf_em_colunas"])
+def test_leitor_rapido_igual_ao_pdfplumber(request, layout):
+    pdf_path, esperado = request.getfixturevalue(layout)
+    completo, origens_completo = extrair_com_origens(pdf_path, "pdfplumber")
+    rapido, origens = extrair_com_origens(pdf_path, "rapido")
+    assert_mesma_extracao(rapido, completo)
+    assert len(completo[3]) == esperado["linhas"]
+    assert set(origens_completo) == {ORIGEM_TEXTO}
+    if layout == "pdf_em_linhas":
+        # Camada de texto já em linhas: nenhuma página precisa do pdfplumber
+        assert set(origens) == {ORIGEM_RAPIDA}
+    else:
+        # Colunas desenhadas em separado: todas as páginas reprovam nas âncoras
+        assert set(origens) == {ORIGEM_TEXTO}
+
+
+def test_leitor_rapido_rele_so_as_paginas_reprovadas(pdf_em_linhas, monkeypatch):
+    pdf_path, _ = pdf_em_linhas
+    completo, _ = extrair_com_origens(pdf_path, "pdfplumber")
+    texto = LeitorPyPDF2.texto
+    # Páginas pares sem camada de texto: só elas vão para o pdfplumber
+    monkeypatch.setattr(LeitorPyPDF2, "texto", lambda self, indice: "" if indice % 2 == 1 else texto(self, indice))
+    misto, origens = extrair_com_origens(pdf_path, "rapido")
+    assert_mesma_extracao(misto, completo)
+    paginas = sum(origens.values())
+    assert origens == Counter({ORIGEM_RAPIDA: (paginas + 1) // 2, ORIGEM_TEXTO: paginas // 2})
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+from glossario import IndiceGlossario, PONTUACAO_EXATA, cruzar_descontos_com_rubricas
+
+GLOSSARIOS = {
+    "Cartão/RMC": ["CAR", "CART", "BMG CARTAO", "EMPRESTIMO SOBRE A RMC"],
+    "Tarifas/Seguros": ["EMPRÉSTIMO", "EMP", "VIDA", "ACE", "TITULO", "CHUBB"],
+}
+
+
+@pytest.fixture(scope="module")
+def indice():
+    return IndiceGlossario(GLOSSARIOS)
+
+
+@pytest.mark.parametrize("descricao", [
+    "CONSIGNACAO EMPRESTIMO BANCARIO",
+    "EMPRESTIMO BANCO BMG",
+    "DESC CAR ALUGUEL",
+    "EMP CONSIGNADO 12",
+    "SEGURO VIDA TITULO ACE",
+])
+def test_termos_curtos_genericos_nao_valem_como_substring(indice, descricao):
+    pontuacoes, _ = indice.buscar([descricao])
+    assert pontuacoes[0] < 85
+
+
+def test_termos_especificos_valem_como_substring(indice):
+    pontuacoes, termos = indice.buscar(["DESC BMG CARTAO 12", "EMPRESTIMO SOBRE A RMC 03"])
+    assert list(pontuacoes) == [PONTUACAO_EXATA, PONTUACAO_EXATA]
+    assert termos == ["BMG CARTAO", "EMPRESTIMO SOBRE A RMC"]
+
+
+def test_termo_curto_ainda_vale_por_correspondencia_exata(indice):
+    pontuacoes, termos = indice.buscar(["Chubb", "car"])
+    assert list(pontuacoes) == [PONTUACAO_EXATA, PONTUACAO_EXATA]
+    assert termos == ["CHUBB", "CAR"]
+
+
+def test_cruzamento_nao_inclui_descricoes_genericas(indice):
+    df = pd.DataFrame({"DESCRIÇÃO": ["CONSIGNACAO EMPRESTIMO BANCARIO", "BMG CARTAO"],
+                       "DESCONTOS": ["R$ 10,00", "R$ 20,00"]})
+    filtrado = cruzar_descontos_com_rubricas(df, indice, threshold=85)
+    assert list(filtrado["DESCRIÇÃO"]) == ["BMG CARTAO"]
@@ -0,0 +1,173 @@
+import io
+from datetime import date
+
+import pandas as pd
+import pdfplumber
+import pytest
+from fpdf import FPDF
+
+from relatorios import (
+    MESES_PRESCRICAO, ConteudoPaginaFPDF, PDFRelatorio, calcular_resumo, pdf_basico_bytes,
+    pdf_descontos_finais_bytes
+)
+
+
+def descontos(competencias, centavos):
+    return pd.DataFrame({
+        "DESCRIÇÃO": ["BMG CARTAO"] * len(competencias),
+        "DESCONTOS": ["x"] * len(competencias),
+        "Data": competencias,
+        "Centavos": pd.array(centavos, dtype="Int64"),
+    })
+
+
+def test_nao_prescrito_cobre_60_competencias_ate_a_referencia():
+    # Referência 06/2024: entram 07/2019 a 06/2024 (60 meses); 06/2019 fica de fora
+    df = descontos(["06/2019", "07/2019", "06/2024", "07/2024"], [1, 10, 100, 1000])
+    resumo = calcular_resumo(df, data_referencia=date(2024, 6, 15))
+    assert resumo["nao_prescrito"] == 110
+
+
+def test_nao_prescrito_igual_a_janela_movel_na_referencia():
+    meses = pd.period_range("01/2015", "12/2024", freq="M")
+    df = descontos([p.strftime("%m/%Y") for p in meses], [100] * len(meses))
+    resumo = calcular_resumo(df, data_referencia=date(2024, 12, 1))
+    janela = resumo["janelas_prescricao"].iloc[-1]
+    assert resumo["nao_prescrito"] == MESES_PRESCRICAO * 100 == janela["Centavos"]
+
+
+def test_pdf_basico_le_de_volta_linhas_cabecalho_e_rodape():
+    qtd = 60
+    dados = pd.DataFrame({
+        "Código": [str(200 + i) for i in range(qtd)],
+        "Descrição Rubrica": [f"CONSIGNAÇÃO (CARTÃO) {i}" for i in range(qtd)],
+        "Valor": [f"{i},50" for i in range(qtd)],
+        "Data": ["01/2020"] * qtd,
+        "Página": [str(i // 20 + 1) for i in range(qtd)],
+    })
+    with pdfplumber.open(io.BytesIO(pdf_basico_bytes(dados, "JOSÉ DA SILVA", "123.456.789-0"))) as pdf:
+        textos = [p.extract_text() for p in pdf.pages]
+    assert len(textos) > 1
+    for numero, texto in enumerate(textos, start=1):
+        assert "Contracheque ISS - JOSÉ DA SILVA - 123.456.789-0" in texto
+        assert f"Página {numero}" in texto
+    linhas = "\n".join(textos).splitlines()
+    for i in (0, 31, qtd - 1):
+        assert f"{200 + i} CONSIGNAÇÃO (CARTÃO) {i} {i},50 01/2020 {i // 20 + 1}" in linhas
+
+
+def test_pdf_descontos_finais_le_de_volta_linhas_e_totais():
+    df = descontos(["01/2020", "02/2020"], [12345, 67])
+    df["Código"] = ["217", "254"]
+    df["DESCONTOS"] = ["123,45", "0,67"]
+    df = df[["Código", "DESCRIÇÃO", "DESCONTOS", "Data", "Centavos"]]
+    dados = pdf_descontos_finais_bytes(df, "Descontos Finais (Cronológico) - NOME - 1", "10,00")
+    with pdfplumber.open(io.BytesIO(dados)) as pdf:
+        texto = "\n".join(p.extract_text() for p in pdf.pages)
+    assert "Descontos Finais (Cronológico) - NOME - 1" in texto
+    assert "217 BMG CARTAO 123,45 01/2020" in texto
+    assert "254 BMG CARTAO 0,67 02/2020" in texto
+    assert "124,12" in texto and "114,12" in texto
+
+
+def test_conteudo_pagina_com_o_fpdf2_instalado():
+    # Falha aqui (e não em PDFs com texto faltando) se a API interna do fpdf2 mudar
+    pdf = FPDF(format="A4")
+    pdf.add_page()
+    conteudo = ConteudoPaginaFPDF(pdf)
+    indice, larguras = conteudo.fonte(("helvetica", "B", 10))
+    pdf.set_font("helvetica", "B", 10)
+    texto = "Total (R$) á"
+    assert sum(larguras[c] for c in texto) * 10 / 1000 / pdf.k == pytest.approx(pdf.get_string_width(texto))
+    assert conteudo.escapar("a(b)\\") == "a\\(b\\)\\\\"
+    conteudo.usar_fonte(indice)
+    conteudo.escrever(f"BT /F{indice} 10.00 Tf 100.00 700.00 Td ({conteudo.escapar(texto)}) Tj ET")
+    with pdfplumber.open(io.BytesIO(bytes(pdf.output()))) as lido:
+        chars = lido.pages[0].chars
+    assert "".join(c["text"] for c in chars) == texto
+    assert chars[0]["fontname"] == "Helvetica-Bold" and chars[0]["x0"] == pytest.approx(100, abs=0.01)
+
+
+def test_conteudo_pagina_sem_a_api_interna_falha_na_criacao():
+    with pytest.raises(RuntimeError, match="fpdf2"):
+        ConteudoPaginaFPDF(object())
+
+
+def _layout(dados):
+    """Por página: caracteres (texto, posição, fonte, cor) e posições das bordas."""
+    def cor(c):
+        return tuple(round(v, 3) for v in (tuple(c) * 3 if len(c) == 1 else c))
+
+    with pdfplumber.open(io.BytesIO(dados)) as pdf:
+        return [(
+            [(c["text"], round(c["x0"], 1), round(c["top"], 1), c["fontname"], c["size"],
+              cor(c["non_stroking_color"])) for c in p.chars],
+            sorted({round(e["top"], 1) for e in p.edges if e["orientation"] == "h"}),
+            sorted({round(e["x0"], 1) for e in p.edges if e["orientation"] == "v"}),
+        ) for p in pdf.pages]
+
+
+def test_tabela_com_o_mesmo_layout_de_cell():
+    qtd = 40
+    colunas = ["Código", "Descrição", "Valor"]
+    valores = [[str(200 + i) for i in range(qtd)], [f"CONSIGNAÇÃO (CARTÃO) {i}" for i in range(qtd)],
+               [f"{i},50" for i in range(qtd)]]
+    larguras, alinhamentos = [25, 110, 40], ["C", "L", "R"]
+    destaques = [i % 13 == 5 for i in range(qtd)]
+
+    # Referência pela API pública: cell() por valor, cabeçalho repetido na quebra de página
+    ref = FPDF(format="A4")
+    ref.set_auto_page_break(False, margin=20)
+    ref.add_page()
+
+    def linha(textos, fonte, cor, fundo=None):
+        if ref.y + 8 > ref.page_break_trigger and ref.y > ref.t_margin + 1:
+            ref.add_page()
+            cabecalho()
+        ref.set_font(*fonte)
+        ref.set_text_color(*cor)
+        if fundo:
+            ref.set_fill_color(*fundo)
+        for texto, largura, alinhamento in zip(textos, larguras, alinhamentos):
+            ref.cell(largura, 8, texto, border=1, align=alinhamento, fill=fundo is not None)
+        ref.ln(8)
+
+    def cabecalho():
+        linha(colunas, ("helvetica", "B", 10), (0, 0, 0), (200, 220, 255))
+
+    cabecalho()
+    for i in range(qtd):
+        textos = [coluna[i] for coluna in valores]
+        if destaques[i]:
+            linha(textos, ("helvetica", "B", 12), (255, 0, 0))
+        else:
+            linha(textos, ("helvetica", "", 9), (0, 0, 0))
+
+    pdf = PDFRelatorio(format="A4")
+    pdf.add_page()
+    pdf.tabela(colunas, valores, larguras, alinhamentos=alinhamentos, destaques=destaques)
+
+    esperado, obtido = _layout(bytes(ref.output())), _layout(bytes(pdf.output()))
+    assert len(obtido) == len(esperado) == 2
+    assert obtido == esperado
+
+
+def test_tabela_quebra_texto_longo_dentro_da_coluna():
+    texto = "EMPRESTIMO CONSIGNADO BANCO " * 6 + "X" * 80
+    pdf = PDFRelatorio(format="A4")
+    pdf.add_page()
+    pdf.tabela(["Descrição", "Valor"], [[texto, "curto"], ["1,00", "2,00"]], [60, 30], alinhamentos=["L", "R"])
+    with pdfplumber.open(io.BytesIO(bytes(pdf.output()))) as lido:
+        pagina = lido.pages[0]
+        k = 72 / 25.4
+        x0, x1 = (pdf.l_margin + 1) * k, (pdf.l_margin + 59) * k
+        celula = [c for c in pagina.chars if c["size"] == 9 and c["x0"] < (pdf.l_margin + 60) * k]
+        *linhas, linha_curto = sorted({round(c["top"], 1) for c in celula})
+        assert len(linhas) > 3
+        assert all(x0 - 0.01 <= c["x0"] and c["x1"] <= x1 + 0.01 for c in celula)
+        assert "".join(c["text"] for c in celula).replace(" ", "") == (texto + "curto").replace(" ", "")
+        # Valor da mesma linha centralizado na vertical; a linha seguinte da tabela começa
+        # abaixo do texto quebrado (mais de uma entrelinha)
+        topo_valor = min(c["top"] for c in pagina.chars if c["text"] == "1")
+        assert linhas[0] < topo_valor < linhas[-1]
+        assert linha_curto - linhas[-1] > 9 * 1.25
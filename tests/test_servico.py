@@ -0,0 +1,51 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from extracao import COL_CENTAVOS
+from gerar_contracheque import gerar_contracheque
+from servico import criar_servidor
+
+
+@pytest.fixture(scope="module")
+def url():
+    servidor = criar_servidor("127.0.0.1", 0, 1, cache_rubricas_path="")
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{servidor.server_address[1]}"
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def enviar(url, corpo):
+    requisicao = urllib.request.Request(f"{url}/analisar", data=corpo, method="POST",
+                                        headers={"Content-Type": "application/pdf"})
+    try:
+        with urllib.request.urlopen(requisicao, timeout=120) as resposta:
+            return resposta.status, json.load(resposta)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_corpo_que_nao_e_pdf(url):
+    status, corpo = enviar(url, b"isto nao e um pdf")
+    assert status == 400
+    assert "não é um PDF" in corpo["erro"]
+
+
+def test_pdf_corrompido_e_erro_do_cliente(url):
+    status, corpo = enviar(url, b"%PDF-1.4\n" + bytes(range(256)) * 8)
+    assert status == 422
+    assert corpo["erro"].startswith("não foi possível ler o PDF")
+
+
+def test_descontos_sem_a_coluna_interna_de_centavos(url, tmp_path):
+    pdf_path = tmp_path / "sintetico.pdf"
+    gerar_contracheque(str(pdf_path), competencias=3, rubricas=4)
+    status, corpo = enviar(url, pdf_path.read_bytes())
+    assert status == 200
+    assert corpo["descontos"]
+    assert all(COL_CENTAVOS not in linha for linha in corpo["descontos"])
+    assert {"DESCRIÇÃO", "DESCONTOS"} <= set(corpo["descontos"][0])